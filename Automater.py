@@ -24,12 +24,63 @@ Optional Parameters are:
     -r, --refreshxml -- This option refreshes the sites.xml file from the remote GitHub site.
                             Default (no -r) is False.
     -v, --verbose -- This option prints messages to the screen. Default (no -v) is False.
+    --serve -- Starts the HTTP/JSON enrichment server on [host:]port instead of running a target.
+    --workers -- Size of the enrichment server worker pool. Default is 8.
+    --clientlimit -- Maximum number of concurrent requests per client of the enrichment server. Default is 2.
+    --shard -- Only processes the I/N shard of the work, selected by a stable hash of the normalised target.
+    --shardkey -- Hashes the target alone (target) or the site name and the target (site). Default is target.
+    -j, --journal -- This option will output the complete site results to a journal file.
+    --merge -- Merges the journal files of sharded runs and writes the requested outputs.
+    --ioworkers -- Number of threads retrieving site content. Default is 1.
+    --parseworkers -- Number of processes running the site regexs. Default is 0 (parse in the main process).
+    --deadline -- Time budget in seconds. Sources not completed in time are reported as timed out.
+    --hedge -- Sends a second request to sources slower than their observed 95th percentile latency.
+    --hedgeratio -- Maximum ratio of hedged requests per source. Default is 0.1.
+    --hedgeproxy -- Alternate proxy used for hedged requests.
+    --htmlreport -- This option will output the results to a multi-page HTML report in the given directory.
+    --pagesize -- Maximum number of rows of each HTML report page. Default is 5000.
+    --syslog -- Sends the results in CEF format to a [udp|tcp://]host[:port] syslog server while the run progresses.
+    --jsonl -- This option will output one JSON object per result to a JSON lines file (gzip if it ends in .gz).
+    --db -- This option will store every result in an SQLite database.
+    --query -- Lists the targets of the --db database for which a source returned the given value.
+    --pivot -- Lists the targets of the --db database sharing a result with the given target.
+    --diff-against -- Only outputs the results added, changed or removed since the latest run of the given --db database.
+    --stream, --unsorted -- Writes each site to the outputs as soon as it completes, in completion order.
+    --bytarget -- Makes --stream write each target as one block, sources in config order, once it completes.
+    --sortbuffer -- Maximum number of sites kept in memory while sorting the outputs, sorted runs beyond that
+                        are spilled to temporary files and merged. Default is 0 (every site kept in memory).
+    --stats -- Prints the request, latency, volume, parse time and error statistics of each site at the end of the run.
+    --statsfile -- Writes the statistics of each site to a JSON file.
+    --metrics -- Serves Prometheus metrics of the run on [host:]port/metrics.
+    --metricsfile -- Writes Prometheus metrics of the run to a node-exporter textfile every flush interval.
+    --profile -- Profiles the config load, target expansion, fetch, parse and output phases separately,
+                    writing cProfile statistics and the top memory allocations of each phase to a directory.
+    --profilerate -- Ratio of the site fetches and parses profiled, without tracing memory allocations,
+                        so --profile can stay enabled at low overhead. Default is 1.0.
+    --trace -- Writes timed spans of every site fetch and request, split into DNS, connect, TLS, time to first byte
+                and body transfer, to a Chrome trace JSON file viewable in Perfetto.
+    --record -- Records every request made and the response returned, credentials redacted, to a zip archive.
+    --replay -- Answers every request with the response recorded in an archive by --record,
+                without network access and without the retrieve delay.
+    --health -- Keeps the success rate, latencies and regex hit rates of each source in a file from one run
+                to the next. Failing sources are run last and chronically failing ones skipped.
+    --includefailing -- Runs the sources that --health found chronically failing anyway.
+    --budget -- Maximum number of requests made for each target, to the sources that returned results most often
+                for its type according to --health. Sources named with -s always run.
+    --ratecontrol -- Adapts the request rate of each host instead of using a fixed delay, raising it while responses
+                        are healthy and cutting it on 429, 503, timeouts or latency spikes. The learned rates are
+                        kept in a file for the next runs and the delay only sets the initial rate.
+    --flushinterval -- Seconds between output flushes when streaming, writing JSON lines, committing
+                        to the --db database or writing the --metricsfile. Default is 5.
 
 Class(es):
     Automater -- Main module
 
 Function(s):
     main -- Provides the instantiation point for Automater.
+    printStatistics -- Prints or saves the statistics of each site collected during the run.
+    startMetricsExporters -- Starts exposing the metrics on the requested port and textfile.
+    stopMetricsExporters -- Stops the metrics exporters.
 
 Exception(s):
     No exceptions exported.
@@ -38,10 +89,17 @@ Fork of https://github.com/1aN0rmus/TekDefense-Automater
     By ian.ahl@tekdefense.com
 """
 import sys
+from contextlib import nullcontext
 from siteinfo import SiteFacade, Site
-from utilities import Parser, IPWrapper, VersionChecker
-from outputs import SiteDetailOutput
-from inputs import TargetFile
+from pipeline import LatencyTracker, HedgePolicy, SiteStatistics, SiteHealth, RateController, SitePipeline
+from metrics import SiteMetrics, MetricsHTTPServer, MetricsTextfile
+from utilities import Parser, IPWrapper, VersionChecker, Sharder
+from outputs import SiteDetailOutput, StreamingOutput, SpillSortOutput, TargetBarrier, RecordStore, SiteRecord, QueryOutput\
+                    , StatisticsOutput
+from inputs import TargetFile, JournalFile, ResultDatabase
+from profiling import PhaseProfiler
+from tracing import RequestTracer
+from cassette import Cassette
 
 __VERSION__ = "0.1.1"
 __GITLOCATION__ = "https://github.com/madrang/MadDefense-Automater"
@@ -57,8 +115,27 @@ class Automater():
         self.hasBotOut = True
         self.RefreshRemoteXML = False
         self.Delay = 2                          # Delay used for accessing sites.
+        self.ResponseCache = None               # ResponseCache shared between calls.
+        self.IOWorkers = 1                      # Threads retrieving site content.
+        self.ParseWorkers = 0                   # Processes running the site regexs, 0 parses in process.
+        self.ParsePool = None                   # Process pool shared between calls, None starts one per call.
+        self.Deadline = None                    # Time budget of a call in seconds.
+        self.LatencyTracker = LatencyTracker()  # Latencies shared between calls to schedule sources.
+        self.HedgePolicy = None                 # HedgePolicy built on LatencyTracker, None disables hedging.
+        self.Metrics = None                     # SiteMetrics recording every call, None disables metrics.
 
-    def GetResults(self, targets):
+    def GetResults(self, targets, sourcelist = None, deadline = None):
+        """ Runs every requested source against the targets and returns the flattened results.
+            Sources that did not complete within the time budget are returned with a "Timed out" result.
+
+        Argument(s):
+            targets -- list of strings representing targets to be investigated.
+            sourcelist -- list of site names to use instead of the sourcelist instance variable. by default = None
+            deadline -- time budget in seconds to use instead of the Deadline instance variable. by default = None
+
+        Return value(s):
+            list -- of [target, type, source, result] lists.
+        """
         targetlist = []
         for tgt in targets:
             tgt = tgt.replace("[.]", ".").replace("{.}", ".").replace("(.)", ".")
@@ -68,58 +145,17 @@ class Automater():
             else:
                 targetlist.append(tgt)
 
-        sitefac = SiteFacade(self.Verbose)
-        sitefac.runSiteAutomation(self.Delay, self.Proxy, targetlist, self.sourcelist, self.UserAgent, self.hasBotOut
-                                , self.RefreshRemoteXML, __GITLOCATION__)
-
-        sites = sorted(sitefac.Sites, key=attrgetter("Target"))
-        if sites is None:
-            return []
-
-        resultList = []
-        for site in sites:
-            if not isinstance(site._regex, str): # this is a multisite:
-                for index in range(len(site.RegEx)): # the regexs will ensure we have the exact number of lookups
-                    site_importantProperty = site.getImportantProperty(index)
-                    if site_importantProperty is None or len(site_importantProperty) == 0:
-                        continue
-                    if site_importantProperty[index] is None or len(site_importantProperty[index]) == 0:
-                        continue
-                    # if it's just a string we don't want it to output like a list
-                    if isinstance(site_importantProperty, str):
-                        typ = site.TargetType
-                        source = site.FriendlyName
-                        res = site_importantProperty
-                        resultList.append([ site.Target, typ, site.FriendlyName, res ])
-                    else: # must be a list since it failed the isinstance check on string
-                        laststring = ""
-                        for siteresult in site_importantProperty[index]:
-                            typ = site.TargetType
-                            source = site.FriendlyName[index]
-                            res = siteresult
-                            if "" + site.Target + typ + source + str(res) != laststring:
-                                resultList.append([ site.Target, typ, source, res ])
-                                laststring = "" + site.Target + typ + source + str(res)
-            else: # this is a singlesite
-                site_importantProperty = site.getImportantProperty()
-                if site_importantProperty is None or len(site_importantProperty) == 0:
-                    continue
-                # if it's just a string we don't want it output like a list
-                if isinstance(site_importantProperty, str):
-                    typ = site.TargetType
-                    source = site.FriendlyName
-                    res = site_importantProperty
-                    resultList.append([ site.Target, typ, source, res ])
-                else:
-                    laststring = ""
-                    for siteresult in site_importantProperty:
-                        typ = site.TargetType
-                        source = site.FriendlyName
-                        res = siteresult
-                        if "" + site.Target + typ + source + str(res) != laststring:
-                            resultList.append([ site.Target, typ, source, res ])
-                            laststring = "" + site.Target + typ + source + str(res)
-        return resultList
+        sitefac = SiteFacade(self.Verbose, self.ResponseCache, ioworkers = self.IOWorkers
+                            , parseworkers = self.ParseWorkers, latencytracker = self.LatencyTracker
+                            , hedgepolicy = self.HedgePolicy, metrics = self.Metrics, parsepool = self.ParsePool)
+        sitefac.runSiteAutomation(self.Delay, self.Proxy, targetlist, sourcelist or self.sourcelist, self.UserAgent
+                                , self.hasBotOut, self.RefreshRemoteXML, __GITLOCATION__
+                                , deadline if deadline is not None else self.Deadline)
+
+        # no-result records are only written by the file and screen outputs
+        return [[ record.target, record.targettype, record.source, record.result ]
+                    for record in RecordStore(sitefac.Sites).Records
+                    if record.status in (SiteRecord.RESULT, SiteRecord.TIMEDOUT)]
 
 def main():
     """ Serves as the instantiation point to start Automater.
@@ -134,6 +170,75 @@ def main():
     sites = []
     parser = Parser("IP, URL, and Hash Passive Analysis tool", __VERSION__)
 
+    if parser.Serve:
+        from server import EnrichmentServer
+        automater = Automater(parser.Proxy)
+        automater.Verbose = parser.Verbose
+        automater.UserAgent = parser.UserAgent
+        automater.Delay = parser.Delay
+        automater.IOWorkers = parser.IOWorkers
+        automater.ParseWorkers = parser.ParseWorkers
+        automater.Deadline = parser.Deadline
+        if parser.ParseWorkers > 0:
+            # a pool per served target would start the parse processes again for every request
+            automater.ParsePool = SitePipeline.createParsePool(parser.ParseWorkers)
+        if parser.Hedge:
+            # every server worker runs its own fetcher threads, each racing a request and its hedge
+            automater.HedgePolicy = HedgePolicy(automater.LatencyTracker, maxratio = parser.HedgeRatio
+                                                , alternateproxy = parser.HedgeProxy
+                                                , workers = 2 * parser.IOWorkers * parser.Workers)
+        # the enrichment server always exposes its metrics on /metrics
+        automater.Metrics = SiteMetrics()
+        exporters = startMetricsExporters(parser, automater.Metrics)
+        try:
+            EnrichmentServer.serve(parser.Serve, automater, parser.Workers, parser.ClientLimit, parser.Verbose)
+        finally:
+            stopMetricsExporters(exporters)
+            if automater.ParsePool is not None:
+                automater.ParsePool.shutdown(cancel_futures = True)
+        return
+
+    # reverse lookups and pivots only read the result database
+    if parser.Query or parser.Pivot:
+        if not parser.DatabaseOutFile:
+            print("[!] --query and --pivot require the --db database to search.")
+            sys.exit(1)
+        if parser.Query:
+            QueryOutput.PrintTargetsWithResult(parser.Query
+                                , ResultDatabase.TargetsWithResult(parser.DatabaseOutFile, parser.Query, parser.Verbose))
+        if parser.Pivot:
+            QueryOutput.PrintSharedResults(parser.Pivot
+                                , ResultDatabase.SharedResults(parser.DatabaseOutFile, parser.Pivot, parser.Verbose))
+        return
+
+    # journals of sharded runs are merged in the order a single run builds its sites
+    # a journal that cannot be read is a lost shard and fails the merge
+    if parser.Merge:
+        if parser.SortBuffer:
+            output = SpillSortOutput(SiteDetailOutput.createWriters(parser), parser.SortBuffer)
+            output.open()
+            try:
+                for journal in parser.Merge:
+                    for sitedict in JournalFile.SiteList(journal):
+                        output.writeSite(Site.buildSiteFromDict(sitedict, parser.hasBotOut, parser.Verbose))
+            except ValueError as ve:
+                print(f"[!] {ve} The merged outputs are incomplete.")
+                sys.exit(1)
+            finally:
+                output.close()
+            return
+        try:
+            for journal in parser.Merge:
+                sites.extend(Site.buildSiteFromDict(sitedict, parser.hasBotOut, parser.Verbose)
+                                for sitedict in JournalFile.SiteList(journal))
+        except ValueError as ve:
+            print(f"[!] {ve}")
+            sys.exit(1)
+        sites.sort(key = lambda site: site.Sequence or ())
+        if sites:
+            SiteDetailOutput(sites).createOutputInfo(parser)
+        return
+
     # if no target run and print help
     if not parser.Target:
         print("[!] No argument given.")
@@ -149,32 +254,205 @@ def main():
     if parser.Source:
         sourcelist = parser.Source.split(";")
 
+    profiler = None
+    if parser.ProfileDirectory:
+        profiler = PhaseProfiler(parser.ProfileDirectory, parser.ProfileRate)
+
     # a file input capability provides a possibility of
     # multiple lines of targets
-    targetlist = []
-    if parser.hasInputFile:
-        for tgtstr in TargetFile.TargetList(parser.InputFile, parser.Verbose):
-            tgtstrstripped = tgtstr.replace("[.]", ".").replace("{.}", ".").replace("(.)", ".")
+    with nullcontext() if profiler is None else profiler.phase("targets"):
+        targetlist = []
+        if parser.hasInputFile:
+            for tgtstr in TargetFile.TargetList(parser.InputFile, parser.Verbose):
+                tgtstrstripped = tgtstr.replace("[.]", ".").replace("{.}", ".").replace("(.)", ".")
+                if IPWrapper.isIPorIPList(tgtstrstripped):
+                    for targ in IPWrapper.getTarget(tgtstrstripped):
+                        targetlist.append(targ)
+                else:
+                    targetlist.append(tgtstrstripped)
+        else:  # one target or list of range of targets added on console
+            target = parser.Target
+            tgtstrstripped = target.replace("[.]", ".").replace("{.}", ".").replace("(.)", ".")
             if IPWrapper.isIPorIPList(tgtstrstripped):
                 for targ in IPWrapper.getTarget(tgtstrstripped):
                     targetlist.append(targ)
             else:
                 targetlist.append(tgtstrstripped)
-    else:  # one target or list of range of targets added on console
-        target = parser.Target
-        tgtstrstripped = target.replace("[.]", ".").replace("{.}", ".").replace("(.)", ".")
-        if IPWrapper.isIPorIPList(tgtstrstripped):
-            for targ in IPWrapper.getTarget(tgtstrstripped):
-                targetlist.append(targ)
+
+    sharder = None
+    if parser.Shard:
+        try:
+            sharder = Sharder.fromString(parser.Shard, parser.ShardBySite)
+        except ValueError as ve:
+            print(f"[!] {ve}")
+            sys.exit(1)
+
+    latencytracker = LatencyTracker()
+    hedgepolicy = None
+    if parser.Hedge:
+        hedgepolicy = HedgePolicy(latencytracker, maxratio = parser.HedgeRatio, alternateproxy = parser.HedgeProxy
+                                , workers = 2 * parser.IOWorkers)
+
+    statistics = None
+    if parser.Stats or parser.StatsFile:
+        statistics = SiteStatistics()
+
+    metrics = None
+    if parser.MetricsAddress or parser.MetricsFile:
+        metrics = SiteMetrics()
+        if hedgepolicy is not None:
+            metrics.watchHedgePolicy(hedgepolicy)
+    exporters = startMetricsExporters(parser, metrics)
+
+    tracer = RequestTracer() if parser.TraceFile else None
+
+    health = None
+    if parser.HealthFile:
+        health = SiteHealth.load(parser.HealthFile, skipfailing = not parser.IncludeFailing)
+    if parser.Budget is not None and health is None:
+        print("[!] --budget requires the hit rates kept by --health.")
+        sys.exit(1)
+    # replayed responses say nothing about the health of the sources
+    savehealth = health is not None and not parser.ReplayArchive
+
+    # replayed requests are not paced
+    ratecontroller = None
+    if parser.RateControlFile and not parser.ReplayArchive:
+        ratecontroller = RateController.load(parser.RateControlFile
+                                            , 1.0 / parser.Delay if parser.Delay else RateController.MAXRATE)
+
+    if parser.RecordArchive and parser.ReplayArchive:
+        print("[!] --record and --replay cannot be used together.")
+        sys.exit(1)
+    cassette = None
+    if parser.RecordArchive or parser.ReplayArchive:
+        cassette = Cassette(parser.ReplayArchive or parser.RecordArchive, replaying = bool(parser.ReplayArchive))
+        cassette.open()
+
+    sitefac = SiteFacade(parser.Verbose, sharder = sharder, ioworkers = parser.IOWorkers
+                        , parseworkers = parser.ParseWorkers, latencytracker = latencytracker
+                        , hedgepolicy = hedgepolicy, statistics = statistics, metrics = metrics
+                        , profiler = profiler, tracer = tracer, cassette = cassette, health = health
+                        , budget = parser.Budget, ratecontroller = ratecontroller)
+    # streamed sites are written in completion order, or sorted through spill files,
+    # and are not kept by the facade
+    if parser.Stream or parser.SortBuffer:
+        buildcallback = None
+        if parser.Stream and parser.ByTarget:
+            output = TargetBarrier(SiteDetailOutput.createWriters(parser), parser.FlushInterval)
+            buildcallback = output.expect
+        elif parser.Stream:
+            output = StreamingOutput(SiteDetailOutput.createWriters(parser), parser.FlushInterval)
         else:
-            targetlist.append(tgtstrstripped)
+            output = SpillSortOutput(SiteDetailOutput.createWriters(parser), parser.SortBuffer)
+        output.open()
+        writesite = output.writeSite if profiler is None else profiler.wrap("output", output.writeSite, sampled = True)
+        try:
+            sitefac.runSiteAutomation(parser.Delay, parser.Proxy, targetlist, sourcelist, parser.UserAgent, parser.hasBotOut,
+                                      parser.RefreshRemoteXML, __GITLOCATION__, parser.Deadline, writesite
+                                      , buildcallback)
+        finally:
+            with nullcontext() if profiler is None else profiler.phase("output"):
+                output.close()
+            stopMetricsExporters(exporters)
+            if cassette is not None:
+                cassette.close()
+            if savehealth:
+                health.save()
+            if ratecontroller is not None:
+                ratecontroller.save()
+        printStatistics(parser, statistics)
+        if tracer is not None:
+            tracer.export(parser.TraceFile)
+        if profiler is not None:
+            profiler.close()
+        return
 
-    sitefac = SiteFacade(parser.Verbose)
-    sitefac.runSiteAutomation(parser.Delay, parser.Proxy, targetlist, sourcelist, parser.UserAgent, parser.hasBotOut,
-                              parser.RefreshRemoteXML, __GITLOCATION__)
+    # the live outputs, like the syslog sink, receive each site as soon as it completes
+    # while the other outputs are written sorted once the run is done
+    live = SiteDetailOutput.createWriters(parser, live = True)
+    output = StreamingOutput(live, parser.FlushInterval) if live else None
+    writesite = None
+    if output:
+        output.open()
+        writesite = output.writeSite if profiler is None else profiler.wrap("output", output.writeSite, sampled = True)
+    try:
+        sitefac.runSiteAutomation(parser.Delay, parser.Proxy, targetlist, sourcelist, parser.UserAgent, parser.hasBotOut,
+                                  parser.RefreshRemoteXML, __GITLOCATION__, parser.Deadline
+                                  , writesite, keepsites = True)
+    finally:
+        if output:
+            output.close()
+        stopMetricsExporters(exporters)
+        if cassette is not None:
+            cassette.close()
+        if savehealth:
+            health.save()
+        if ratecontroller is not None:
+            ratecontroller.save()
     sites = sitefac.Sites
-    if sites:
-        SiteDetailOutput(sites).createOutputInfo(parser)
+    with nullcontext() if profiler is None else profiler.phase("output"):
+        if sites:
+            SiteDetailOutput(sites).createOutputInfo(parser, live = False)
+        elif parser.JournalOutFile:
+            # an empty journal tells a shard that had no sites from a missing one when merging
+            SiteDetailOutput(sites).PrintToJournalFile(parser.JournalOutFile)
+    printStatistics(parser, statistics)
+    if tracer is not None:
+        tracer.export(parser.TraceFile)
+    if profiler is not None:
+        profiler.close()
+
+def startMetricsExporters(parser, metrics):
+    """ Starts exposing the metrics on the requested port and textfile.
+
+    Argument(s):
+        parser -- Parser object storing program input parameters used when program was run.
+        metrics -- SiteMetrics of the run or None if no metrics were requested.
+
+    Return value(s):
+        list -- of MetricsHTTPServer and MetricsTextfile objects to stop once the run is done.
+    """
+    exporters = []
+    if metrics is None:
+        return exporters
+    if parser.MetricsAddress:
+        exporters.append(MetricsHTTPServer.start(parser.MetricsAddress, metrics.Registry))
+    if parser.MetricsFile:
+        textfile = MetricsTextfile(metrics.Registry, parser.MetricsFile, parser.FlushInterval)
+        textfile.start()
+        exporters.append(textfile)
+    return exporters
+
+def stopMetricsExporters(exporters):
+    """ Stops the metrics exporters, writing the textfile a last time.
+
+    Argument(s):
+        exporters -- list returned by startMetricsExporters.
+
+    Return value(s):
+        Nothing is returned from this Method.
+    """
+    for exporter in exporters:
+        exporter.stop()
+
+def printStatistics(parser, statistics):
+    """ Prints or saves the statistics of each site collected during the run, as requested.
+
+    Argument(s):
+        parser -- Parser object storing program input parameters used when program was run.
+        statistics -- SiteStatistics of the run or None if no statistics were requested.
+
+    Return value(s):
+        Nothing is returned from this Method.
+    """
+    if statistics is None:
+        return
+    summaries = statistics.summary()
+    if parser.Stats:
+        StatisticsOutput.PrintStatistics(summaries)
+    if parser.StatsFile:
+        StatisticsOutput.WriteStatistics(summaries, parser.StatsFile)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,731 @@
+#!/usr/bin/python3
+"""
+The benchmark.py module measures the throughput of Automater offline, against a local mock upstream
+server replaying canned responses for every site of the xml configuration files, so that no
+third-party site is queried.
+
+Usage:
+    python benchmark.py [--sizes 1000 10000 100000] [--scenarios facade getresults]
+                        [--latency 0.005] [--latencysigma 0.5] [--errorrate 0.01] [--errorstatus 500 503]
+                        [--corpus DIRECTORY] [--ioworkers 32] [--workers 8]
+                        [--baseline benchmark-baseline.json] [--save] [--tolerance 0.1]
+
+    Every scenario runs in its own process so its peak RSS is measured separately.
+    The facade scenario runs SiteFacade.runSiteAutomation over every target at once and reports the
+        latency of the requests made to the mock upstream.
+    The getresults scenario runs Automater.GetResults on one target at a time from a pool of threads,
+        as the enrichment server does, and reports the latency of each call.
+    When a baseline file exists the results are compared with it and the command exits with 1 if
+        the throughput, the p99 latency or the peak RSS regressed by more than the tolerance;
+        --save stores the results as the new baseline.
+
+Class(es):
+    ResponseCorpus -- Recorded response bodies of each site, stored as files in a directory.
+    MockUpstream -- HTTP server replaying canned responses with a configurable latency and error rate.
+    MockUpstreamHandler -- Request handler of the MockUpstream.
+    LatencyRecorder -- Pipeline recorder keeping the latency of every request.
+    Benchmark -- Runs the benchmark scenarios and compares them with a stored baseline.
+
+Function(s):
+    main -- Provides the instantiation point for the benchmark.
+
+Exception(s):
+    No exceptions exported.
+"""
+import argparse
+import hashlib
+import json
+import math
+import multiprocessing
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import quote, unquote, urlsplit, urlunsplit
+from xml.etree.ElementTree import ElementTree
+
+from pipeline import LatencyTracker
+
+__SETTINGSXML__ = "settings.xml"
+__SITESXML__ = "sites.xml"
+
+class ResponseCorpus:
+    """ ResponseCorpus holds recorded response bodies of each site.
+            The bodies of a site are the files of a sub directory named after the quoted site name,
+            each file named after the quoted target it was recorded for and a digest of the body.
+
+    Public Method(s):
+        bodies
+        entries
+        add
+        (Class Method) directoryName
+        (Property) Names
+
+    Instance variable(s):
+        _directory
+        _bodies
+    """
+
+    def __init__(self, directory = None):
+        """ Class constructor.
+
+        Argument(s):
+            directory -- string path of the corpus directory. by default = None, an empty corpus
+        """
+        self._directory = directory
+        self._bodies = {}
+        if directory and os.path.isdir(directory):
+            for entry in sorted(os.listdir(directory)):
+                path = os.path.join(directory, entry)
+                if os.path.isdir(path):
+                    self._bodies[unquote(entry)] = [(unquote(name.rsplit(".", 2)[0]) if name.count(".") >= 2 else None
+                                                    , open(os.path.join(path, name), "rb").read())
+                                                    for name in sorted(os.listdir(path))]
+
+    @classmethod
+    def directoryName(cls, name):
+        """ Returns the name of the sub directory storing the bodies of a site.
+
+        Argument(s):
+            name -- string name of the site.
+
+        Return value(s):
+            string
+        """
+        return quote(name, safe = "")
+
+    @property
+    def Names(self):
+        """ Returns the site names having at least one body.
+
+        Return value(s):
+            list -- of string site names.
+        """
+        return [name for name, bodies in self._bodies.items() if bodies]
+
+    def bodies(self, name):
+        """ Returns the recorded bodies of a site.
+
+        Argument(s):
+            name -- string name of the site.
+
+        Return value(s):
+            list -- of bytes bodies, empty if none was recorded.
+        """
+        return [body for _, body in self._bodies.get(name, [])]
+
+    def entries(self, name):
+        """ Returns the recorded bodies of a site with the target each one was recorded for.
+
+        Argument(s):
+            name -- string name of the site.
+
+        Return value(s):
+            list -- of (string target or None, bytes body) tuples, empty if none was recorded.
+        """
+        return list(self._bodies.get(name, []))
+
+    def add(self, name, body, target = None):
+        """ Records a body for a site, writing it to the corpus directory.
+
+        Argument(s):
+            name -- string name of the site.
+            body -- bytes body of a response of the site.
+            target -- string target the body was recorded for. by default = None
+
+        Return value(s):
+            string -- path of the file written.
+        """
+        bodies = self._bodies.setdefault(name, [])
+        bodies.append((target, body))
+        directory = os.path.join(self._directory, self.directoryName(name))
+        os.makedirs(directory, exist_ok = True)
+        prefix = f"{quote(target, safe = "")}." if target else ""
+        path = os.path.join(directory, f"{prefix}{hashlib.sha1(body).hexdigest()[:16]}.body")
+        with open(path, "wb") as f:
+            f.write(body)
+        return path
+
+class MockUpstreamHandler(BaseHTTPRequestHandler):
+    """ MockUpstreamHandler answers every GET and POST request with a canned body of the site named by
+            the first path segment, after the latency drawn by its server.
+
+    Public Method(s):
+        do_GET
+        do_POST
+        respond
+
+    Instance variable(s):
+        No instance variables.
+    """
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.respond()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.respond()
+
+    def respond(self):
+        """ Sleeps for the drawn latency then sends the canned body or an error status.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        name = unquote(self.path.lstrip("/").split("/", 1)[0].split("?", 1)[0])
+        latency, status = self.server.draw()
+        time.sleep(latency)
+        body = self.server.body(name, self.path) if status == 200 else b"error"
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+class MockUpstream(ThreadingHTTPServer):
+    """ MockUpstream replays canned responses for every site of the xml configuration files.
+            Latencies are drawn from a log-normal distribution around the median latency, and a ratio
+            of the requests is answered with one of the error statuses.
+            Sites without recorded bodies in the corpus get a synthetic page echoing the request.
+
+    Public Method(s):
+        start
+        stop
+        draw
+        body
+        rewriteConfig
+
+    Instance variable(s):
+        _corpus
+        _latency
+        _latencysigma
+        _errorrate
+        _errorstatus
+        _bodysize
+        _random
+        _lock
+        _thread
+    """
+    daemon_threads = True
+    request_queue_size = 256
+
+    def __init__(self, corpus = None, latency = 0.005, latencysigma = 0.5, errorrate = 0.0, errorstatus = (500,)
+                , bodysize = 16384, seed = 0):
+        """ Class constructor.
+
+        Argument(s):
+            corpus -- ResponseCorpus replayed for the sites it holds bodies of. by default = None
+            latency -- median number of seconds before a response is sent. by default = 0.005
+            latencysigma -- sigma of the log-normal latency distribution, 0 for a constant latency.
+                            by default = 0.5
+            errorrate -- ratio of the requests answered with an error status. by default = 0.0
+            errorstatus -- tuple of the HTTP error statuses drawn from. by default = (500,)
+            bodysize -- approximate size in bytes of the synthetic pages. by default = 16384
+            seed -- seed of the latency and error draws. by default = 0
+        """
+        super().__init__(("127.0.0.1", 0), MockUpstreamHandler)
+        self._corpus = corpus if corpus is not None else ResponseCorpus()
+        self._latency = latency
+        self._latencysigma = latencysigma
+        self._errorrate = errorrate
+        self._errorstatus = tuple(errorstatus)
+        self._bodysize = bodysize
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """ Serves requests from a daemon thread.
+
+        Return value(s):
+            string -- base URL of the server.
+        """
+        self._thread = threading.Thread(target = self.serve_forever, daemon = True)
+        self._thread.start()
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def stop(self):
+        """ Stops serving requests.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self.shutdown()
+        self.server_close()
+
+    def draw(self):
+        """ Draws the latency and the status of a response.
+
+        Return value(s):
+            tuple -- (seconds, HTTP status)
+        """
+        with self._lock:
+            latency = self._latency
+            if self._latencysigma and latency > 0:
+                latency = self._random.lognormvariate(math.log(latency), self._latencysigma)
+            status = 200
+            if self._errorrate and self._random.random() < self._errorrate:
+                status = self._random.choice(self._errorstatus)
+        return latency, status
+
+    def body(self, name, path):
+        """ Returns the body sent for a request to a site.
+
+        Argument(s):
+            name -- string name of the site.
+            path -- string path and query of the request.
+
+        Return value(s):
+            bytes
+        """
+        bodies = self._corpus.bodies(name)
+        if bodies:
+            with self._lock:
+                return self._random.choice(bodies)
+        line = f"<p>{path}</p>\n".encode("utf-8")
+        return b"<html><body>\n" + line * max(1, self._bodysize // len(line)) + b"</body></html>\n"
+
+    def rewriteConfig(self, sourcedirectory, directory):
+        """ Writes copies of the xml configuration files pointing the fullurl and domainurl of every site
+                at the server, under a first path segment naming the site.
+
+        Argument(s):
+            sourcedirectory -- string directory holding the sites.xml and settings.xml files.
+            directory -- string directory the rewritten files are written to.
+
+        Return value(s):
+            integer -- number of sites rewritten.
+        """
+        base = f"{self.server_address[0]}:{self.server_address[1]}"
+        count = 0
+        for filename in (__SITESXML__, __SETTINGSXML__):
+            source = os.path.join(sourcedirectory, filename)
+            if not os.path.isfile(source):
+                continue
+            tree = ElementTree()
+            tree.parse(source)
+            for site in tree.iter(tag = "site"):
+                for tag in ("fullurl", "domainurl"):
+                    element = site.find(tag)
+                    if element is None or not element.text:
+                        continue
+                    url = urlsplit(element.text.strip())
+                    element.text = urlunsplit(("http", base, f"/{ResponseCorpus.directoryName(site.get("name"))}"
+                                                f"{url.path or "/"}", url.query, ""))
+                count += 1
+            tree.write(os.path.join(directory, filename))
+        return count
+
+class LatencyRecorder:
+    """ LatencyRecorder keeps the latency of every request made by a SitePipeline.
+            It is given to the pipeline in place of a SiteStatistics.
+
+    Public Method(s):
+        recordFetch
+        recordCompleted
+        (Property) Latencies
+        (Property) Errors
+        (Property) Sites
+
+    Instance variable(s):
+        _latencies
+        _errors
+        _sites
+        _lock
+    """
+
+    def __init__(self):
+        """ Class constructor.
+        """
+        self._latencies = []
+        self._errors = 0
+        self._sites = 0
+        self._lock = threading.Lock()
+
+    @property
+    def Latencies(self):
+        """ Returns the recorded latencies.
+
+        Return value(s):
+            list -- of float seconds.
+        """
+        return self._latencies
+
+    @property
+    def Errors(self):
+        """ Returns the number of requests that failed.
+
+        Return value(s):
+            integer
+        """
+        return self._errors
+
+    @property
+    def Sites(self):
+        """ Returns the number of completed or timed out sites.
+
+        Return value(s):
+            integer
+        """
+        return self._sites
+
+    def recordFetch(self, site, error = None):
+        """ Records the latency of the request made for site.
+
+        Argument(s):
+            site -- Site object whose content was retrieved.
+            error -- string name of an exception raised while retrieving the content. by default = None
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        with self._lock:
+            if site.Latency is not None:
+                self._latencies.append(site.Latency)
+            if error or site.ErrorType:
+                self._errors += 1
+
+    def recordCompleted(self, site):
+        """ Counts a completed or timed out site.
+
+        Argument(s):
+            site -- Site object completed or timed out.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._sites += 1
+
+class Benchmark:
+    """ Benchmark runs the scenarios over synthetic target sets against a MockUpstream and compares the
+            results with a stored baseline.
+
+    Public Method(s):
+        run
+        compare
+        report
+        (Class Method) buildTargets
+        (Class Method) runScenario
+        (Class Method) runFacade
+        (Class Method) runGetResults
+        (Class Method) peakRSS
+        (Class Method) loadBaseline
+        (Class Method) saveBaseline
+        (Property) Results
+
+    Instance variable(s):
+        _options
+        _results
+    """
+    SCENARIOS = ("facade", "getresults")
+    TARGETTYPES = ("ip", "hostname", "md5")
+
+    def __init__(self, options):
+        """ Class constructor.
+
+        Argument(s):
+            options -- argparse.Namespace of the benchmark command line.
+        """
+        self._options = options
+        self._results = []
+
+    @property
+    def Results(self):
+        """ Returns the results of the runs done so far.
+
+        Return value(s):
+            list -- of result dictionaries.
+        """
+        return self._results
+
+    @classmethod
+    def buildTargets(cls, size, targettypes = TARGETTYPES):
+        """ Builds a synthetic target set cycling through the target types.
+
+        Argument(s):
+            size -- number of targets.
+            targettypes -- tuple of the target types to cycle through. by default = Benchmark.TARGETTYPES
+
+        Return value(s):
+            list -- of string targets.
+        """
+        targets = []
+        for index in range(size):
+            targettype = targettypes[index % len(targettypes)]
+            if targettype == "ip":
+                targets.append(f"10.{(index >> 16) & 255}.{(index >> 8) & 255}.{index & 255}")
+            elif targettype == "md5":
+                targets.append(hashlib.md5(str(index).encode("ascii")).hexdigest())
+            else:
+                targets.append(f"host{index}.example.com")
+        return targets
+
+    @classmethod
+    def peakRSS(cls):
+        """ Returns the peak resident set size of the current process.
+
+        Return value(s):
+            integer -- bytes.
+        """
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    @classmethod
+    def runFacade(cls, targets, ioworkers, parseworkers):
+        """ Runs SiteFacade.runSiteAutomation over every target.
+
+        Argument(s):
+            targets -- list of string targets.
+            ioworkers -- number of threads retrieving site content.
+            parseworkers -- number of processes running the site regexs.
+
+        Return value(s):
+            tuple -- (list of request latencies, number of errors, number of sites)
+        """
+        from siteinfo import SiteFacade
+        recorder = LatencyRecorder()
+        sitefac = SiteFacade(False, ioworkers = ioworkers, parseworkers = parseworkers, statistics = recorder)
+        sitefac.runSiteAutomation(0, None, targets, ["allsources"], "Automater/benchmark", False, False, "")
+        return recorder.Latencies, recorder.Errors, recorder.Sites
+
+    @classmethod
+    def runGetResults(cls, targets, ioworkers, parseworkers, workers):
+        """ Runs Automater.GetResults on one target at a time from a pool of threads.
+
+        Argument(s):
+            targets -- list of string targets.
+            ioworkers -- number of threads retrieving site content in each call.
+            parseworkers -- number of processes running the site regexs in each call.
+            workers -- number of concurrent calls.
+
+        Return value(s):
+            tuple -- (list of call latencies, number of errors, number of result rows)
+        """
+        from Automater import Automater
+        automater = Automater()
+        automater.Delay = 0
+        automater.IOWorkers = ioworkers
+        automater.ParseWorkers = parseworkers
+
+        def call(target):
+            started = time.monotonic()
+            try:
+                rows = len(automater.GetResults([target]))
+                return time.monotonic() - started, 0, rows
+            except Exception:
+                return time.monotonic() - started, 1, 0
+
+        with ThreadPoolExecutor(max_workers = workers) as pool:
+            calls = list(pool.map(call, targets))
+        return [latency for latency, _, _ in calls], sum(error for _, error, _ in calls), sum(rows for _, _, rows in calls)
+
+    @classmethod
+    def runScenario(cls, scenario, size, configdirectory, ioworkers, parseworkers, workers):
+        """ Runs a scenario in the current process, from the directory holding the rewritten configuration.
+            Called in a fresh process by run.
+
+        Argument(s):
+            scenario -- one of Benchmark.SCENARIOS.
+            size -- number of targets.
+            configdirectory -- string directory holding the rewritten xml configuration files.
+            ioworkers -- number of threads retrieving site content.
+            parseworkers -- number of processes running the site regexs.
+            workers -- number of concurrent GetResults calls.
+
+        Return value(s):
+            dict -- results of the scenario.
+        """
+        os.chdir(configdirectory)
+        targets = cls.buildTargets(size)
+        started = time.monotonic()
+        if scenario == "facade":
+            latencies, errors, count = cls.runFacade(targets, ioworkers, parseworkers)
+        else:
+            latencies, errors, count = cls.runGetResults(targets, ioworkers, parseworkers, workers)
+        elapsed = time.monotonic() - started
+        ordered = sorted(latencies)
+        return {
+            "scenario": scenario
+            , "targets": size
+            , "count": count
+            , "seconds": elapsed
+            , "targetspersecond": size / elapsed if elapsed else None
+            , "p50": LatencyTracker.nearestRank(ordered, 50) if ordered else None
+            , "p99": LatencyTracker.nearestRank(ordered, 99) if ordered else None
+            , "errors": errors
+            , "peakrss": cls.peakRSS()
+        }
+
+    def run(self):
+        """ Starts the mock upstream and runs every scenario over every target set size.
+
+        Return value(s):
+            list -- of dictionaries holding the results of each run.
+        """
+        options = self._options
+        upstream = MockUpstream(ResponseCorpus(options.corpus), options.latency, options.latencysigma
+                                , options.errorrate, options.errorstatus, options.bodysize, options.seed)
+        url = upstream.start()
+        try:
+            with tempfile.TemporaryDirectory(prefix = "automater-benchmark-") as configdirectory:
+                sites = upstream.rewriteConfig(options.config, configdirectory)
+                print(f"[+] Mock upstream serving {sites} sites on {url}")
+                for size in options.sizes:
+                    for scenario in options.scenarios:
+                        # a fresh process per run so the peak RSS only covers that run
+                        with ProcessPoolExecutor(1, mp_context = multiprocessing.get_context("spawn")) as pool:
+                            result = pool.submit(Benchmark.runScenario, scenario, size, configdirectory
+                                                , options.ioworkers, options.parseworkers, options.workers).result()
+                        self._results.append(result)
+                        print(f"[*] {scenario} {size} targets: {result["seconds"]:.2f}s")
+        finally:
+            upstream.stop()
+        return self._results
+
+    @classmethod
+    def loadBaseline(cls, filename):
+        """ Loads the results stored in a baseline file.
+
+        Argument(s):
+            filename -- string name of the baseline file.
+
+        Return value(s):
+            dict -- of (scenario, targets) tuples to result dictionaries, empty if the file does not exist.
+        """
+        if not filename or not os.path.isfile(filename):
+            return {}
+        with open(filename) as f:
+            return {(result["scenario"], result["targets"]): result for result in json.load(f)["results"]}
+
+    @classmethod
+    def saveBaseline(cls, filename, results):
+        """ Stores results as the baseline of the next runs.
+
+        Argument(s):
+            filename -- string name of the baseline file.
+            results -- list of result dictionaries.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        with open(filename, "w") as f:
+            json.dump({"created": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}, f, indent = 2)
+
+    def compare(self, baseline, tolerance):
+        """ Lists the regressions of the results compared with a baseline.
+
+        Argument(s):
+            baseline -- dictionary returned by loadBaseline.
+            tolerance -- ratio a figure may worsen by before it is a regression.
+
+        Return value(s):
+            list -- of strings describing each regression.
+        """
+        regressions = []
+        for result in self._results:
+            previous = baseline.get((result["scenario"], result["targets"]))
+            if previous is None:
+                continue
+            name = f"{result["scenario"]} {result["targets"]}"
+            if previous["targetspersecond"] and result["targetspersecond"] is not None \
+                    and result["targetspersecond"] < previous["targetspersecond"] * (1 - tolerance):
+                regressions.append(f"{name}: {result["targetspersecond"]:.1f} targets/s"
+                                    f" down from {previous["targetspersecond"]:.1f}")
+            for key in ("p99", "peakrss"):
+                if previous[key] and result[key] is not None and result[key] > previous[key] * (1 + tolerance):
+                    regressions.append(f"{name}: {key} {result[key]:.4g} up from {previous[key]:.4g}")
+        return regressions
+
+    def report(self, baseline):
+        """ Prints the results, next to the baseline figures when there are some.
+
+        Argument(s):
+            baseline -- dictionary returned by loadBaseline.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        def change(value, previous):
+            if not previous or value is None:
+                return ""
+            return f" ({(value - previous) / previous:+.0%})"
+
+        print("\n____________________     Benchmark Results     ____________________")
+        for result in self._results:
+            previous = baseline.get((result["scenario"], result["targets"]), {})
+            p50 = "-" if result["p50"] is None else f"{result["p50"] * 1000:.1f}ms"
+            p99 = "-" if result["p99"] is None else f"{result["p99"] * 1000:.1f}ms"
+            print(f"{result["scenario"]:<12} {result["targets"]:>7} targets  "
+                  f"{result["targetspersecond"]:.1f} targets/s{change(result["targetspersecond"], previous.get("targetspersecond"))}  "
+                  f"p50 {p50}  p99 {p99}{change(result["p99"], previous.get("p99"))}  "
+                  f"errors {result["errors"]}  "
+                  f"peak RSS {result["peakrss"] / (1 << 20):.1f}MB{change(result["peakrss"], previous.get("peakrss"))}")
+
+def main():
+    """ Serves as the instantiation point to start the benchmark.
+
+    Argument(s):
+        No arguments are required.
+
+    Return value(s):
+        Nothing is returned from this Method.
+    """
+    parser = argparse.ArgumentParser(description = "Offline throughput benchmark of Automater against a mock upstream.")
+    parser.add_argument("--sizes", type = int, nargs = "+", default = [1000, 10000, 100000]
+        , help = "Sizes of the synthetic target sets. Default is 1000 10000 100000.")
+    parser.add_argument("--scenarios", nargs = "+", choices = Benchmark.SCENARIOS, default = list(Benchmark.SCENARIOS)
+        , help = "Scenarios to run. Default is every scenario.")
+    parser.add_argument("--config", default = os.path.dirname(os.path.abspath(__file__))
+        , help = "Directory holding the sites.xml and settings.xml files to benchmark. Default is the program directory.")
+    parser.add_argument("--corpus"
+        , help = "Directory of recorded response bodies replayed by the mock upstream.")
+    parser.add_argument("--latency", type = float, default = 0.005
+        , help = "Median latency of the mock upstream in seconds. Default is 0.005.")
+    parser.add_argument("--latencysigma", type = float, default = 0.5
+        , help = "Sigma of the log-normal latency distribution, 0 for a constant latency. Default is 0.5.")
+    parser.add_argument("--errorrate", type = float, default = 0.0
+        , help = "Ratio of the requests answered with an error status. Default is 0.")
+    parser.add_argument("--errorstatus", type = int, nargs = "+", default = [500, 503]
+        , help = "HTTP statuses of the error responses. Default is 500 503.")
+    parser.add_argument("--bodysize", type = int, default = 16384
+        , help = "Size in bytes of the synthetic pages of sites missing from the corpus. Default is 16384.")
+    parser.add_argument("--seed", type = int, default = 0
+        , help = "Seed of the latency and error draws. Default is 0.")
+    parser.add_argument("--ioworkers", type = int, default = 32
+        , help = "Threads retrieving site content. Default is 32.")
+    parser.add_argument("--parseworkers", type = int, default = 0
+        , help = "Processes running the site regexs. Default is 0.")
+    parser.add_argument("--workers", type = int, default = 8
+        , help = "Concurrent GetResults calls of the getresults scenario. Default is 8.")
+    parser.add_argument("--baseline", default = "benchmark-baseline.json"
+        , help = "Baseline file the results are compared with. Default is benchmark-baseline.json.")
+    parser.add_argument("--save", action = "store_true"
+        , help = "Stores the results as the new baseline.")
+    parser.add_argument("--tolerance", type = float, default = 0.1
+        , help = "Ratio a figure may worsen by before it is reported as a regression. Default is 0.1.")
+    options = parser.parse_args()
+
+    benchmark = Benchmark(options)
+    benchmark.run()
+    baseline = Benchmark.loadBaseline(options.baseline)
+    benchmark.report(baseline)
+    regressions = benchmark.compare(baseline, options.tolerance)
+    for regression in regressions:
+        print(f"[!] Regression {regression}")
+    if options.save:
+        Benchmark.saveBaseline(options.baseline, benchmark.Results)
+        print(f"[+] Baseline saved to {options.baseline}")
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
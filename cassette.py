@@ -0,0 +1,243 @@
+"""
+The cassette.py module records the HTTP requests made to the sites and the responses they
+returned to an archive, and replays them later without reaching the network, so a whole run
+can be reproduced offline at CPU speed.
+
+An archive is a zip file holding an index.jsonl file, one line per request, and the response
+bodies under objects/, named after the SHA-256 of their content so that identical bodies are
+stored once. Values that look like credentials, in the headers, parameters, post data or query
+string of a request, are redacted before being written, and requests are matched on their
+redacted form, so an archive recorded with API keys replays without them.
+
+Class(es):
+    Cassette -- Records requests and their responses to an archive or replays them from it.
+
+Function(s):
+    No global exportable functions are defined.
+
+Exception(s):
+    No exceptions exported.
+"""
+import hashlib
+import json
+import re
+import threading
+import zipfile
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+import requests
+from requests.structures import CaseInsensitiveDict
+
+class Cassette:
+    """ Cassette records the requests made by the sites and their responses or errors to an archive,
+            or, when replaying, answers each request with the recorded response without any network access.
+        Requests are identified by their method, URL, parameters and post data once redacted;
+            request headers are stored for reference only.
+        Requests and responses are recorded from the fetcher threads; the index is written when closed.
+
+    Public Method(s):
+        open
+        record
+        replay
+        close
+        (Class Method) redact
+        (Class Method) redactURL
+        (Class Method) requestId
+        (Property) Replaying
+        (Property) FileName
+
+    Instance variable(s):
+        _filename
+        _replaying
+        _zip
+        _index
+        _objects
+        _lock
+        _recorded
+        _replayed
+        _missing
+    """
+    INDEX = "index.jsonl"
+    SECRET = re.compile(r"key|token|secret|pass|auth|cookie|session|signature", re.IGNORECASE)
+    REDACTED = "REDACTED"
+
+    def __init__(self, filename, replaying = False):
+        """ Class constructor.
+
+        Argument(s):
+            filename -- string name of the archive.
+            replaying -- true to replay the archive, false to record a new one. by default = False
+        """
+        self._filename = filename
+        self._replaying = replaying
+        self._zip = None
+        self._index = {}
+        self._objects = set()
+        self._lock = threading.Lock()
+        self._recorded = 0
+        self._replayed = 0
+        self._missing = 0
+
+    @property
+    def FileName(self):
+        """ Returns the name of the archive.
+
+        Return value(s):
+            string
+        """
+        return self._filename
+
+    @property
+    def Replaying(self):
+        """ Checks if the cassette replays an archive instead of recording one.
+
+        Return value(s):
+            bool
+        """
+        return self._replaying
+
+    @classmethod
+    def redact(cls, values):
+        """ Returns a copy of a dictionary where the values of the names looking like credentials are replaced.
+
+        Argument(s):
+            values -- dictionary of names to values or None.
+
+        Return value(s):
+            dictionary -- or None if values is None.
+        """
+        if values is None:
+            return None
+        return {name: cls.REDACTED if cls.SECRET.search(str(name)) else value for name, value in values.items()}
+
+    @classmethod
+    def redactURL(cls, url):
+        """ Returns url with the values of the query string names looking like credentials replaced.
+
+        Argument(s):
+            url -- string URL.
+
+        Return value(s):
+            string
+        """
+        parts = urlsplit(url)
+        if not parts.query:
+            return url
+        query = [(name, cls.REDACTED if cls.SECRET.search(name) else value)
+                    for name, value in parse_qsl(parts.query, keep_blank_values = True)]
+        return urlunsplit(parts._replace(query = urlencode(query, safe = "%")))
+
+    @classmethod
+    def requestId(cls, method, url, params = None, data = None):
+        """ Returns the identifier a request is recorded and replayed under.
+
+        Argument(s):
+            method -- string HTTP method.
+            url -- string URL requested.
+            params -- dictionary of the query parameters. by default = None
+            data -- dictionary of the post data. by default = None
+
+        Return value(s):
+            string -- hexadecimal SHA-256 of the redacted request.
+        """
+        request = [method, cls.redactURL(url), cls.redact(params), cls.redact(data)]
+        return hashlib.sha256(json.dumps(request, sort_keys = True, default = str).encode("utf-8")).hexdigest()
+
+    def open(self):
+        """ Opens the archive, reading its index when replaying.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if not self._replaying:
+            self._zip = zipfile.ZipFile(self._filename, "w", zipfile.ZIP_DEFLATED)
+            return
+        self._zip = zipfile.ZipFile(self._filename, "r")
+        with self._zip.open(self.INDEX) as f:
+            for line in f:
+                entry = json.loads(line)
+                self._index[entry["id"]] = entry
+
+    def record(self, method, url, kwargs, response = None, error = None):
+        """ Records a request with the response or the error it got.
+            A request already recorded, like a hedged one, keeps its first record.
+
+        Argument(s):
+            method -- string HTTP method.
+            url -- string URL requested.
+            kwargs -- dictionary of the keyword arguments given to requests.request.
+            response -- requests.Response received. by default = None
+            error -- exception raised instead of a response. by default = None
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        params, data = kwargs.get("params"), kwargs.get("data")
+        entry = {"id": self.requestId(method, url, params, data), "method": method, "url": self.redactURL(url)
+                , "params": self.redact(params), "data": self.redact(data), "headers": self.redact(kwargs.get("headers"))}
+        body = None
+        if response is not None:
+            body = response.content
+            entry["status"] = response.status_code
+            entry["reason"] = response.reason
+            entry["responseheaders"] = self.redact(dict(response.headers))
+            entry["body"] = hashlib.sha256(body).hexdigest()
+        else:
+            entry["error"] = type(error).__name__
+            entry["message"] = str(error)
+        with self._lock:
+            if entry["id"] in self._index:
+                return
+            self._index[entry["id"]] = entry
+            self._recorded += 1
+            if body is not None and entry["body"] not in self._objects:
+                self._objects.add(entry["body"])
+                self._zip.writestr(f"objects/{entry['body']}", body)
+
+    def replay(self, method, url, kwargs):
+        """ Answers a request with its recorded response, or raises its recorded error.
+
+        Argument(s):
+            method -- string HTTP method.
+            url -- string URL requested.
+            kwargs -- dictionary of the keyword arguments given to requests.request.
+
+        Return value(s):
+            requests.Response
+
+        Restriction(s):
+            Raises requests.exceptions.ConnectionError if the request was not recorded.
+        """
+        entry = self._index.get(self.requestId(method, url, kwargs.get("params"), kwargs.get("data")))
+        if entry is None:
+            with self._lock:
+                self._missing += 1
+            raise requests.exceptions.ConnectionError(f"{method} {self.redactURL(url)} is not in {self._filename}")
+        with self._lock:
+            self._replayed += 1
+            body = self._zip.read(f"objects/{entry['body']}") if "body" in entry else None
+        if body is None:
+            raise getattr(requests.exceptions, entry["error"], requests.exceptions.RequestException)(entry["message"])
+        response = requests.Response()
+        response.status_code = entry["status"]
+        response.reason = entry["reason"]
+        response.headers = CaseInsensitiveDict(entry["responseheaders"])
+        response.url = url
+        response._content = body
+        return response
+
+    def close(self):
+        """ Writes the index of a recorded archive and closes it.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if self._zip is None:
+            return
+        with self._lock:
+            if not self._replaying:
+                self._zip.writestr(self.INDEX, "".join(json.dumps(entry) + "\n" for entry in self._index.values()))
+                print(f"\n[+] {self._recorded} requests recorded to {self._filename}, {len(self._objects)} distinct bodies")
+            else:
+                print(f"\n[+] {self._replayed} requests replayed from {self._filename}, {self._missing} not recorded")
+            self._zip.close()
+            self._zip = None
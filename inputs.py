@@ -10,6 +10,10 @@ TargetFile -- Provides a representation of a file containing target
               strings for Automater to utilize.
 SitesFile -- Provides a representation of the sites.xml
              configuration file.
+JournalFile -- Provides a representation of a journal file
+               written by a previous, possibly sharded, run.
+ResultDatabase -- Provides reverse lookups and pivots over the SQLite
+                  result database written by previous runs.
 
 Function(s):
 No global exportable functions are defined.
@@ -18,6 +22,8 @@ Exception(s):
 No exceptions exported.
 """
 import os
+import json
+import sqlite3
 import hashlib
 import requests
 from requests.exceptions import ConnectionError
@@ -171,3 +177,153 @@ class SitesFile(object):
             Boolean
         """
         return os.path.exists(filename) and os.path.isfile(filename)
+
+class JournalFile(object):
+    """ JournalFile provides a Class Method to read the site results stored in a journal file.
+        A journal holds one JSON document per line, each produced by Site.toDict.
+
+    Public Method(s):
+        (Class Method) SiteList
+
+    Instance variable(s):
+        No instance variables.
+    """
+
+    @classmethod
+    def SiteList(cls, filename):
+        """ Opens a journal file for reading.
+                Returns each site dictionary stored in the file.
+            A journal that cannot be read whole is an error, as merging it would silently drop the sites of a shard.
+
+        Argument(s):
+            filename -- string based name of the journal file.
+
+        Return value(s):
+            Iterator of dictionaries produced by Site.toDict.
+
+        Restriction(s):
+            Raises ValueError if the journal file cannot be read or is not correctly formatted.
+        """
+        number = 0
+        try:
+            with open(filename) as file:
+                for number, line in enumerate(file, 1):
+                    if line.strip():
+                        yield json.loads(line)
+        except IOError as ioe:
+            raise ValueError(f"There was an error reading from the journal file {filename}: {ioe.strerror}.")
+        except ValueError:
+            raise ValueError(f"The journal file {filename} is not correctly formatted at line {number}.")
+
+class ResultDatabase(object):
+    """ ResultDatabase provides Class Methods to query the SQLite database written with the --db option.
+        Only results actually returned by a source are considered, not the "No results found" or time out rows.
+
+    Public Method(s):
+        (Class Method) query
+        (Class Method) TargetsWithResult
+        (Class Method) SharedResults
+        (Class Method) LatestRun
+        (Class Method) RunRows
+
+    Instance variable(s):
+        No instance variables.
+    """
+
+    @classmethod
+    def query(cls, filename, sql, parameters, verbose = False):
+        """ Runs a query against a result database opened read only.
+
+        Argument(s):
+            filename -- string based name of the database file.
+            sql -- string SQL query to run.
+            parameters -- tuple of the query parameters.
+            verbose -- boolean value representing whether output will be printed to stdout
+
+        Return value(s):
+            list -- of row tuples, empty if the database cannot be read.
+        """
+        try:
+            connection = sqlite3.connect(f"file:{filename}?mode=ro", uri = True)
+            try:
+                return connection.execute(sql, parameters).fetchall()
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            Utils.PrintStandardOutput(f"There was an error reading from the result database {filename}: {e}"
+                                        , verbose = verbose)
+            return []
+
+    @classmethod
+    def TargetsWithResult(cls, filename, value, verbose = False):
+        """ Reverse lookup of the targets for which a source returned value, in every stored run.
+
+        Argument(s):
+            filename -- string based name of the database file.
+            value -- string result value, such as an IP address, a hash or an ASN.
+            verbose -- boolean value representing whether output will be printed to stdout
+
+        Return value(s):
+            list -- of (target, targettype, source) tuples sorted by target.
+        """
+        return cls.query(filename, "SELECT DISTINCT target, targettype, source FROM results"
+                                    " WHERE status = 'result' AND result = ? ORDER BY target, source"
+                        , (value,), verbose)
+
+    @classmethod
+    def SharedResults(cls, filename, target, verbose = False):
+        """ Pivots on target: lists the other targets for which a source returned one of the results of target.
+
+        Argument(s):
+            filename -- string based name of the database file.
+            target -- string target to pivot on.
+            verbose -- boolean value representing whether output will be printed to stdout
+
+        Return value(s):
+            list -- of (source, result, other target) tuples sorted by source and result.
+        """
+        return cls.query(filename, "SELECT DISTINCT other.source, other.result, other.target"
+                                    " FROM results AS mine JOIN results AS other"
+                                    " ON other.result = mine.result AND other.source = mine.source"
+                                    " WHERE mine.target = ? AND mine.status = 'result' AND other.status = 'result'"
+                                    " AND other.target != mine.target"
+                                    " ORDER BY other.source, other.result, other.target"
+                        , (target,), verbose)
+
+    @classmethod
+    def LatestRun(cls, filename, verbose = False):
+        """ Returns the id of the most recent run stored in the database.
+
+        Argument(s):
+            filename -- string based name of the database file.
+            verbose -- boolean value representing whether output will be printed to stdout
+
+        Return value(s):
+            integer -- run id.
+            None -- if the database holds no run or cannot be read.
+        """
+        rows = cls.query(filename, "SELECT MAX(id) FROM runs", (), verbose)
+        return rows[0][0] if rows else None
+
+    @classmethod
+    def RunRows(cls, filename, run, verbose = False):
+        """ Reads the rows of a run in the order they were stored, without loading the whole run in memory.
+
+        Argument(s):
+            filename -- string based name of the database file.
+            run -- integer id of the run.
+            verbose -- boolean value representing whether output will be printed to stdout
+
+        Return value(s):
+            Iterator of (target, targettype, site, source, regexindex, status, result) tuples.
+        """
+        try:
+            connection = sqlite3.connect(f"file:{filename}?mode=ro", uri = True)
+            try:
+                yield from connection.execute("SELECT target, targettype, site, source, regexindex, status, result"
+                                                " FROM results WHERE run = ? ORDER BY rowid", (run,))
+            finally:
+                connection.close()
+        except sqlite3.Error as e:
+            Utils.PrintStandardOutput(f"There was an error reading from the result database {filename}: {e}"
+                                        , verbose = verbose)
@@ -0,0 +1,570 @@
+"""
+The metrics.py module keeps counters, gauges and histograms describing a running Automater,
+labelled by site name, and exposes them in the Prometheus text format, either on a local
+HTTP port or as a node-exporter textfile.
+
+Values that the program already counts elsewhere, such as the ResponseCache hits or the hedged
+requests of the HedgePolicy, are read by collectors when the metrics are rendered, so they
+cost nothing while sites are being fetched.
+
+Class(es):
+    MetricsRegistry -- Holds the metrics of a process and renders them in the Prometheus text format.
+    Metric -- A counter, gauge or histogram of a MetricsRegistry.
+    SiteMetrics -- Records the sites fetched and completed by the pipeline in a MetricsRegistry.
+    MetricsHTTPServer -- Serves a MetricsRegistry on /metrics from a background thread.
+    MetricsRequestHandler -- Request handler of the MetricsHTTPServer.
+    MetricsTextfile -- Periodically rewrites a node-exporter textfile from a MetricsRegistry.
+
+Function(s):
+    No global exportable functions are defined.
+
+Exception(s):
+    No exceptions exported.
+"""
+import bisect
+import os
+import tempfile
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlsplit
+
+class Metric:
+    """ Metric is a counter, gauge or histogram whose values are kept for each combination of label values.
+        Updates only take the registry lock for the time of a dictionary update.
+
+    Public Method(s):
+        inc
+        set
+        observe
+        render
+        (Class Method) formatLabels
+        (Class Method) formatValue
+
+    Instance variable(s):
+        _name
+        _kind
+        _help
+        _labelnames
+        _buckets
+        _values
+        _lock
+    """
+    COUNTER = "counter"
+    GAUGE = "gauge"
+    HISTOGRAM = "histogram"
+
+    def __init__(self, name, kind, help, labelnames, lock, buckets = None):
+        """ Class constructor.
+
+        Argument(s):
+            name -- string name of the metric.
+            kind -- one of Metric.COUNTER, Metric.GAUGE or Metric.HISTOGRAM.
+            help -- string describing the metric.
+            labelnames -- tuple of label names, the label values are given in the same order.
+            lock -- threading.Lock of the registry.
+            buckets -- sorted tuple of the upper bounds of the histogram buckets. by default = None
+        """
+        self._name = name
+        self._kind = kind
+        self._help = help
+        self._labelnames = labelnames
+        self._buckets = buckets
+        self._values = {}
+        self._lock = lock
+
+    def inc(self, labels = (), amount = 1):
+        """ Adds amount to the value of labels.
+
+        Argument(s):
+            labels -- tuple of label values. by default = ()
+            amount -- number added to the value. by default = 1
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def set(self, labels = (), value = 0):
+        """ Sets the value of labels.
+
+        Argument(s):
+            labels -- tuple of label values. by default = ()
+            value -- new value. by default = 0
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        with self._lock:
+            self._values[labels] = value
+
+    def observe(self, labels, value):
+        """ Counts value in the histogram bucket of labels it falls in.
+
+        Argument(s):
+            labels -- tuple of label values.
+            value -- observed number.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        index = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            counts = self._values.get(labels)
+            if counts is None:
+                # one count per bucket, the +Inf bucket, then the sum of the observations
+                counts = self._values[labels] = [0] * (len(self._buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    @classmethod
+    def formatLabels(cls, names, values, extra = None):
+        """ Formats label names and values as a Prometheus label set.
+
+        Argument(s):
+            names -- tuple of label names.
+            values -- tuple of label values.
+            extra -- (name, value) tuple of an additional label. by default = None
+
+        Return value(s):
+            string -- empty when there is no label.
+        """
+        pairs = list(zip(names, values))
+        if extra is not None:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in pairs)
+        return "{" + ",".join(f"{name}=\"{value}\"" for (name, _), value in zip(pairs, escaped)) + "}"
+
+    @classmethod
+    def formatValue(cls, value):
+        """ Formats a sample value.
+
+        Argument(s):
+            value -- integer or float.
+
+        Return value(s):
+            string
+        """
+        if isinstance(value, float):
+            if value == float("inf"):
+                return "+Inf"
+            return repr(value)
+        return str(value)
+
+    def render(self):
+        """ Renders the metric in the Prometheus text format.
+
+        Return value(s):
+            list -- of string lines.
+        """
+        with self._lock:
+            values = sorted((labels, list(value) if isinstance(value, list) else value)
+                            for labels, value in self._values.items())
+        lines = [f"# HELP {self._name} {self._help}", f"# TYPE {self._name} {self._kind}"]
+        for labels, value in values:
+            if self._kind != Metric.HISTOGRAM:
+                lines.append(f"{self._name}{self.formatLabels(self._labelnames, labels)} {self.formatValue(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(self._buckets + (float("inf"),), value):
+                cumulative += count
+                lines.append(f"{self._name}_bucket"
+                            f"{self.formatLabels(self._labelnames, labels, ("le", self.formatValue(float(bound))))}"
+                            f" {cumulative}")
+            lines.append(f"{self._name}_sum{self.formatLabels(self._labelnames, labels)} {self.formatValue(value[-1])}")
+            lines.append(f"{self._name}_count{self.formatLabels(self._labelnames, labels)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """ MetricsRegistry holds the metrics of a process and renders them in the Prometheus text format.
+        Collectors registered with addCollector are called before every rendering to refresh
+            the metrics mirroring values counted elsewhere.
+
+    Public Method(s):
+        counter
+        gauge
+        histogram
+        addCollector
+        render
+
+    Instance variable(s):
+        _metrics
+        _collectors
+        _lock
+    """
+    LATENCYBUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        """ Class constructor.
+        """
+        self._metrics = []
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, help, labelnames = ()):
+        """ Adds a counter to the registry.
+
+        Argument(s):
+            name -- string name of the metric, ending in _total.
+            help -- string describing the metric.
+            labelnames -- tuple of label names. by default = ()
+
+        Return value(s):
+            Metric
+        """
+        metric = Metric(name, Metric.COUNTER, help, labelnames, self._lock)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name, help, labelnames = ()):
+        """ Adds a gauge to the registry.
+
+        Argument(s):
+            name -- string name of the metric.
+            help -- string describing the metric.
+            labelnames -- tuple of label names. by default = ()
+
+        Return value(s):
+            Metric
+        """
+        metric = Metric(name, Metric.GAUGE, help, labelnames, self._lock)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, help, labelnames = (), buckets = LATENCYBUCKETS):
+        """ Adds a histogram to the registry.
+
+        Argument(s):
+            name -- string name of the metric.
+            help -- string describing the metric.
+            labelnames -- tuple of label names. by default = ()
+            buckets -- sorted tuple of bucket upper bounds. by default = MetricsRegistry.LATENCYBUCKETS
+
+        Return value(s):
+            Metric
+        """
+        metric = Metric(name, Metric.HISTOGRAM, help, labelnames, self._lock, tuple(buckets))
+        self._metrics.append(metric)
+        return metric
+
+    def addCollector(self, collector):
+        """ Registers a callable refreshing metrics before every rendering.
+
+        Argument(s):
+            collector -- callable taking no argument.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._collectors.append(collector)
+
+    def render(self):
+        """ Renders every metric in the Prometheus text format.
+
+        Return value(s):
+            string
+        """
+        for collector in self._collectors:
+            collector()
+        return "".join(f"{line}\n" for metric in self._metrics for line in metric.render())
+
+class SiteMetrics:
+    """ SiteMetrics records the sites fetched and completed by the SitePipeline and the depth of its queues
+            in a MetricsRegistry, labelled by site name.
+
+    Public Method(s):
+        recordFetch
+        recordCompleted
+        setQueueDepth
+        watchResponseCache
+        watchHedgePolicy
+        (Property) Registry
+
+    Instance variable(s):
+        _registry
+        _requests
+        _errors
+        _cache
+        _latency
+        _bytes
+        _parse
+        _sites
+        _hedges
+        _queues
+    """
+
+    def __init__(self, registry = None):
+        """ Class constructor.
+
+        Argument(s):
+            registry -- MetricsRegistry the metrics are added to. by default = None, a new registry
+        """
+        self._registry = registry if registry is not None else MetricsRegistry()
+        self._requests = self._registry.counter("automater_requests_total"
+                            , "Requests sent to each site.", ("site",))
+        self._errors = self._registry.counter("automater_request_errors_total"
+                            , "Requests to each site that failed, by exception type.", ("site", "error"))
+        self._cache = self._registry.counter("automater_cache_lookups_total"
+                            , "Response cache lookups of each site, by result.", ("site", "result"))
+        self._latency = self._registry.histogram("automater_request_duration_seconds"
+                            , "Duration of the requests sent to each site.", ("site",))
+        self._bytes = self._registry.counter("automater_response_bytes_total"
+                            , "Bytes received from each site.", ("site",))
+        self._parse = self._registry.counter("automater_parse_seconds_total"
+                            , "Seconds spent running the regexs of each site.", ("site",))
+        self._sites = self._registry.counter("automater_sites_total"
+                            , "Sites completed or timed out, by status.", ("site", "status"))
+        self._hedges = self._registry.counter("automater_hedged_requests_total"
+                            , "Second requests sent to slow sites by the hedge policy.", ("site",))
+        self._queues = self._registry.gauge("automater_queue_depth"
+                            , "Number of items waiting in each queue.", ("queue",))
+
+    @property
+    def Registry(self):
+        """ Returns the MetricsRegistry holding the metrics.
+
+        Return value(s):
+            MetricsRegistry
+        """
+        return self._registry
+
+    def recordFetch(self, site, error = None):
+        """ Records the request made to retrieve the content of a site.
+
+        Argument(s):
+            site -- Site object whose content was retrieved.
+            error -- string name of an exception raised while retrieving the content. by default = None,
+                        the ErrorType of the site
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        labels = (site.Name,)
+        error = error or site.ErrorType
+        if site.CacheStatus is not None:
+            self._cache.inc((site.Name, site.CacheStatus))
+        if site.CacheStatus != "hit":
+            self._requests.inc(labels)
+        if site.Latency is not None:
+            self._latency.observe(labels, site.Latency)
+        if site.BytesReceived:
+            self._bytes.inc(labels, site.BytesReceived)
+        if error:
+            self._errors.inc((site.Name, error))
+
+    def recordCompleted(self, site):
+        """ Records a completed or timed out site.
+
+        Argument(s):
+            site -- Site object completed or timed out.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._sites.inc((site.Name, "timedout" if site.TimedOut else "completed"))
+        if site.ParseTimes:
+            self._parse.inc((site.Name,), sum(site.ParseTimes))
+
+    def setQueueDepth(self, queue, depth):
+        """ Records the number of items waiting in a queue.
+
+        Argument(s):
+            queue -- string name of the queue.
+            depth -- integer number of items.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._queues.set((queue,), depth)
+
+    def watchResponseCache(self, responsecache):
+        """ Exposes the size and the counters of a ResponseCache.
+
+        Argument(s):
+            responsecache -- ResponseCache to watch.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        lookups = self._registry.counter("automater_response_cache_lookups_total"
+                            , "Lookups of the shared response cache, by result.", ("result",))
+
+        def collect():
+            lookups.set(("hit",), responsecache.Hits)
+            lookups.set(("miss",), responsecache.Misses)
+        self._registry.addCollector(collect)
+
+    def watchHedgePolicy(self, hedgepolicy):
+        """ Exposes the hedged requests counted by a HedgePolicy.
+
+        Argument(s):
+            hedgepolicy -- HedgePolicy to watch.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        def collect():
+            for name, count in hedgepolicy.Hedges.items():
+                self._hedges.set((name,), count)
+        self._registry.addCollector(collect)
+
+class MetricsRequestHandler(BaseHTTPRequestHandler):
+    """ MetricsRequestHandler answers GET /metrics with the rendered registry of its server.
+
+    Public Method(s):
+        do_GET
+
+    Instance variable(s):
+        No instance variables.
+    """
+    server_version = "Automater"
+    CONTENTTYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if urlsplit(self.path).path != "/metrics":
+            self.send_error(404)
+            return
+        data = self.server.Registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", self.CONTENTTYPE)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class MetricsHTTPServer(ThreadingHTTPServer):
+    """ MetricsHTTPServer serves a MetricsRegistry on /metrics from a daemon thread.
+
+    Public Method(s):
+        (Class Method) start
+        stop
+        (Property) Registry
+
+    Instance variable(s):
+        _registry
+        _thread
+    """
+    daemon_threads = True
+
+    def __init__(self, address, registry):
+        """ Class constructor.
+
+        Argument(s):
+            address -- (host, port) tuple the server will listen on.
+            registry -- MetricsRegistry to serve.
+        """
+        super().__init__(address, MetricsRequestHandler)
+        self._registry = registry
+        self._thread = None
+
+    @classmethod
+    def start(cls, hostport, registry):
+        """ Starts serving a registry in the background.
+
+        Argument(s):
+            hostport -- string in the [host:]port format. Host defaults to 127.0.0.1.
+            registry -- MetricsRegistry to serve.
+
+        Return value(s):
+            MetricsHTTPServer
+        """
+        host, _, port = hostport.rpartition(":")
+        server = cls((host or "127.0.0.1", int(port)), registry)
+        server._thread = threading.Thread(target = server.serve_forever, daemon = True)
+        server._thread.start()
+        print(f"[+] Metrics served on http://{server.server_address[0]}:{server.server_address[1]}/metrics")
+        return server
+
+    @property
+    def Registry(self):
+        """ Returns the MetricsRegistry being served.
+
+        Return value(s):
+            MetricsRegistry
+        """
+        return self._registry
+
+    def stop(self):
+        """ Stops serving and closes the socket.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self.shutdown()
+        self.server_close()
+
+class MetricsTextfile:
+    """ MetricsTextfile rewrites a node-exporter textfile collector file from a MetricsRegistry
+            every interval seconds and once more when stopped.
+        The file is replaced atomically so the exporter never reads a partial file.
+
+    Public Method(s):
+        start
+        write
+        stop
+
+    Instance variable(s):
+        _registry
+        _filename
+        _interval
+        _stopped
+        _thread
+    """
+
+    def __init__(self, registry, filename, interval = 5.0):
+        """ Class constructor.
+
+        Argument(s):
+            registry -- MetricsRegistry to write.
+            filename -- string name of the .prom file.
+            interval -- number of seconds between writes. by default = 5.0
+        """
+        self._registry = registry
+        self._filename = filename
+        self._interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """ Starts rewriting the file in the background.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        def run():
+            while not self._stopped.wait(self._interval):
+                self.write()
+        self._thread = threading.Thread(target = run, daemon = True)
+        self._thread.start()
+
+    def write(self):
+        """ Writes the rendered registry to the file.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        directory = os.path.dirname(os.path.abspath(self._filename))
+        descriptor, temporary = tempfile.mkstemp(prefix = ".metrics-", suffix = ".tmp", dir = directory)
+        try:
+            with os.fdopen(descriptor, "w") as f:
+                f.write(self._registry.render())
+            os.replace(temporary, self._filename)
+        except OSError:
+            os.unlink(temporary)
+            raise
+
+    def stop(self):
+        """ Stops the background writes and writes the file a last time.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write()
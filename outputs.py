@@ -5,6 +5,26 @@ Any addition to the Automater that brings any other output requirement should be
 Class(es):
     SiteDetailOutput -- Wrapper class around all functions that print output from Automater,
                         to include standard output and file system output.
+    SiteRecord -- Compact flattened result row of a site shared by every writer.
+    RecordStore -- Sorts and flattens the sites of a run once for every output.
+    SiteWriter -- Base class of the writers formatting one site at a time for an output.
+    ScreenWriter -- Writes sites to the user's standard output.
+    CEFFileWriter -- Writes sites to a CEF formatted file.
+    CEFSyslogWriter -- Sends the CEF rows of every site to a syslog server while the run progresses.
+    TextFileWriter -- Writes sites to a text file.
+    CSVFileWriter -- Writes sites to a comma-seperated value file.
+    HTMLFileWriter -- Writes sites to an HTML file.
+    HTMLReportWriter -- Writes sites to a multi-page HTML report with summary counts.
+    JSONLFileWriter -- Writes one JSON line per result, optionally gzip compressed.
+    SQLiteFileWriter -- Writes every result to an SQLite database indexed for reverse lookups and pivots.
+    JournalFileWriter -- Writes sites to a journal file.
+    FanOutWriter -- Dispatches every site to a set of writers in a single pass.
+    DiffWriter -- Only passes the results that changed since a baseline run on to a set of writers.
+    StreamingOutput -- Sends each site to a set of writers as soon as it completes.
+    SpillSortOutput -- Sorts the sites of a run by target with bounded memory before writing them.
+    TargetBarrier -- Streams the sites of each target together, in config order, once the target completes.
+    QueryOutput -- Prints the answers of queries run against an SQLite result database.
+    StatisticsOutput -- Prints or saves the per site timing and volume statistics of a run.
 
 Function(s):
     No global exportable functions are defined.
@@ -13,20 +33,2212 @@ Exception(s):
     No exceptions exported.
 """
 import csv
+import gzip
+import hashlib
+import heapq
+import html
+import io
+import json
+import os
+import pickle
+import queue
 import socket
+import sqlite3
 import re
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime
+from itertools import groupby
 from operator import attrgetter
 
+from inputs import ResultDatabase
+
+class SiteRecord:
+    """ SiteRecord is a single flattened result row of a site: one result, or the reason there is none,
+            for one regex of the site. Records are built once per site and shared by every writer.
+
+    Public Method(s):
+        (Class Method) fromSite
+        (Class Method) fromRow
+        (Class Method) toText
+
+    Instance variable(s):
+        target
+        targettype
+        sourceurl
+        name
+        source
+        reportstring
+        index
+        status
+        result
+        latency
+        cachestatus
+        change
+    """
+    __slots__ = ("target", "targettype", "sourceurl", "name", "source", "reportstring", "index", "status", "result"
+                , "latency", "cachestatus", "change")
+
+    RESULT = "result"           # result holds one value found by the site
+    NORESULT = "noresult"       # the regex found nothing
+    NOCATEGORY = "nocategory"   # the multisite property of the regex is empty
+    TIMEDOUT = "timedout"       # the site did not complete within the run's time budget
+
+    ADDED = "added"             # change of a record absent from the --diff-against baseline
+    CHANGED = "changed"         # change of a record whose source returned something else in the baseline
+    REMOVED = "removed"         # change of a baseline record no longer returned by its source
+
+    def __init__(self, site, source, reportstring, index, status, result):
+        """ Class constructor.
+
+        Argument(s):
+            site -- Site object the record was flattened from.
+            source -- friendly name of the source.
+            reportstring -- report string printed in front of the result.
+            index -- index of the regex for a multisite, None for a singlesite.
+            status -- one of RESULT, NORESULT, NOCATEGORY or TIMEDOUT.
+            result -- value found by the site, or the text reported when there is none.
+        """
+        self.target = site.Target
+        self.targettype = site.TargetType
+        self.sourceurl = site.SourceURL
+        self.name = site.Name
+        self.source = source
+        self.reportstring = reportstring
+        self.index = index
+        self.status = status
+        self.result = result
+        self.latency = site.Latency
+        self.cachestatus = site.CacheStatus
+        self.change = None
+
+    @classmethod
+    def fromRow(cls, target, targettype, name, source, index, status, result, change = None):
+        """ Builds a record from a row stored in a result database.
+
+        Argument(s):
+            target -- string target of the row.
+            targettype -- string target type of the row.
+            name -- string name of the site of the row.
+            source -- friendly name of the source.
+            index -- index of the regex for a multisite, None for a singlesite.
+            status -- one of RESULT, NORESULT, NOCATEGORY or TIMEDOUT.
+            result -- text of the result.
+            change -- one of ADDED, CHANGED, REMOVED or None. by default = None
+
+        Return value(s):
+            SiteRecord
+        """
+        record = cls.__new__(cls)
+        record.target = target
+        record.targettype = targettype
+        record.sourceurl = None
+        record.name = name
+        record.source = source
+        record.reportstring = f"[-] Removed {source}:" if change == cls.REMOVED else f"[+] {source}:"
+        record.index = index
+        record.status = status
+        record.result = result
+        record.latency = None
+        record.cachestatus = None
+        record.change = change
+        return record
+
+    @classmethod
+    def toText(cls, value):
+        """ Returns the text stored for a source or result value, JSON for the tuples of multi-group regexs.
+
+        Argument(s):
+            value -- string, tuple or list.
+
+        Return value(s):
+            string
+        """
+        return value if isinstance(value, str) else json.dumps(value, default = str)
+
+    @classmethod
+    def fromSite(cls, site):
+        """ Flattens the results of site into records.
+            Consecutive duplicate results of a regex are only recorded once.
+
+        Argument(s):
+            site -- Site object to flatten.
+
+        Return value(s):
+            list -- of SiteRecord objects in the order the writers output them.
+        """
+        records = []
+        multisite = not isinstance(site.RegEx, str)
+        if site.TimedOut:
+            for index, (source, reportstring) in enumerate(SiteWriter.getTimedOutSources(site)):
+                records.append(cls(site, source, reportstring, index if multisite else None, cls.TIMEDOUT, "Timed out"))
+            return records
+        if multisite:
+            for index in range(len(site.RegEx)): # the regexs will ensure we have the exact number of lookups
+                site_importantProperty = site.getImportantProperty(index)
+                if site_importantProperty is None or len(site_importantProperty) == 0:
+                    records.append(cls(site, site.FriendlyName[index], site.ReportStringForResult[index], index
+                                        , cls.NOCATEGORY, "No results found"))
+                elif site_importantProperty[index] is None or len(site_importantProperty[index]) == 0:
+                    records.append(cls(site, site.FriendlyName[index], site.ReportStringForResult[index], index
+                                        , cls.NORESULT, "No results found"))
+                elif isinstance(site_importantProperty, str): # if it's just a string we don't want it to output like a list
+                    records.append(cls(site, site.FriendlyName, site.ReportStringForResult[index], index
+                                        , cls.RESULT, site_importantProperty))
+                else:
+                    cls.extendResults(records, site, site.FriendlyName[index], site.ReportStringForResult[index]
+                                        , index, site_importantProperty[index])
+        else: # this is a singlesite
+            site_importantProperty = site.getImportantProperty()
+            if site_importantProperty is None or len(site_importantProperty) == 0:
+                records.append(cls(site, site.FriendlyName, site.ReportStringForResult, None
+                                    , cls.NORESULT, "No results found"))
+            elif isinstance(site_importantProperty, str): # if it's just a string we don't want it output like a list
+                records.append(cls(site, site.FriendlyName, site.ReportStringForResult, None
+                                    , cls.RESULT, site_importantProperty))
+            else:
+                cls.extendResults(records, site, site.FriendlyName, site.ReportStringForResult, None
+                                    , site_importantProperty)
+        return records
+
+    @classmethod
+    def extendResults(cls, records, site, source, reportstring, index, results):
+        """ Appends a RESULT record for each result, skipping consecutive duplicates.
+
+        Argument(s):
+            records -- list the records are appended to.
+            site -- Site object the results belong to.
+            source -- friendly name of the source.
+            reportstring -- report string printed in front of the results.
+            index -- index of the regex for a multisite, None for a singlesite.
+            results -- list of the values found by the regex.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        laststring = None
+        for siteresult in results:
+            if str(siteresult) != laststring:
+                records.append(cls(site, source, reportstring, index, cls.RESULT, siteresult))
+                laststring = str(siteresult)
+
+class RecordStore:
+    """ RecordStore sorts a list of sites by target and flattens them into SiteRecord objects once,
+            so every requested output reads the same records instead of walking the sites again.
+
+    Public Method(s):
+        (Property) Sites
+        (Property) Records
+
+    Instance variable(s):
+        _sites
+    """
+
+    def __init__(self, sitelist):
+        """ Class constructor.
+
+        Argument(s):
+            sitelist -- list of Site objects to flatten.
+        """
+        self._sites = [SiteRecord.fromSite(site) for site in sorted(sitelist or [], key = attrgetter("Target"))]
+
+    def __len__(self):
+        return len(self._sites)
+
+    @property
+    def Sites(self):
+        """ Returns the records of each site, sites sorted by target.
+
+        Return value(s):
+            list -- of lists of SiteRecord objects, one list per site.
+        """
+        return self._sites
+
+    @property
+    def Records(self):
+        """ Returns every record of the store, sites sorted by target.
+
+        Return value(s):
+            Iterator of SiteRecord objects.
+        """
+        return (record for records in self._sites for record in records)
+
+class SiteWriter:
+    """ SiteWriter is the base class of the output writers.
+            A writer is opened once, receives every site through writeSite and is closed once done.
+            Consecutive sites of the same target are grouped under a single target header.
+            The lines of a site are formatted first and written with a single call to a buffered file.
+
+    Public Method(s):
+        open
+        writeSite
+        writeRecords
+        isNewTarget
+        flush
+        close
+        (Class Method) getTimedOutSources
+
+    Instance variable(s):
+        _target
+        _file
+    """
+    BUFFERSIZE = 1 << 20    # bytes the output files buffer before writing to disk
+    ORDERED = True          # whether the output needs the sites sorted by target
+    BASELINE = False        # whether the output stores complete results a later run can be compared with
+    LIVE = False            # whether the output receives the sites while the run progresses
+
+    def __init__(self):
+        """ Class constructor.
+        """
+        self._target = ""
+        self._file = None
+
+    @classmethod
+    def getTimedOutSources(cls, site):
+        """ Lists the sources of a site that did not complete within the run's time budget.
+
+        Argument(s):
+            site -- Site object marked as timed out.
+
+        Return value(s):
+            list -- of (friendly name, report string) tuples, one per regex of the site.
+        """
+        if isinstance(site.FriendlyName, str) or site.FriendlyName is None:
+            return [(site.FriendlyName, site.ReportStringForResult)]
+        return list(zip(site.FriendlyName, site.ReportStringForResult))
+
+    def open(self):
+        """ Prepares the output before the first site is written.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        pass
+
+    def writeSite(self, site, records = None):
+        """ Writes the results of a single site.
+
+        Argument(s):
+            site -- Site object to write.
+            records -- list of SiteRecord objects already flattened from site. by default = None
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self.writeRecords(SiteRecord.fromSite(site) if records is None else records)
+
+    def writeRecords(self, records):
+        """ Writes the records of a single site.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        raise NotImplementedError
+
+    def isNewTarget(self, records):
+        """ Checks if records start a new target, in which case a target header is written first.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            Boolean.
+        """
+        if records and self._target != records[0].target:
+            self._target = records[0].target
+            return True
+        return False
+
+    def flush(self):
+        """ Flushes the sites written so far to the output.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """ Completes the output once every site was written.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if self._file is not None:
+            self._file.flush()
+            self._file.close()
+            self._file = None
+
+class ScreenWriter(SiteWriter):
+    """ ScreenWriter prints site information to the user's standard output, minimized or not.
+
+    Public Method(s):
+        writeRecords
+        writeRecordsBot
+        writeRecordsNormal
+        (Class Method) defang
+
+    Instance variable(s):
+        _bot
+    """
+
+    def __init__(self, printinbotformat):
+        """ Class constructor.
+
+        Argument(s):
+            printinbotformat -- True or False argument representing minimized output. True if minimized requested.
+        """
+        super().__init__()
+        self._bot = printinbotformat
+
+    def flush(self):
+        """ Flushes the user's standard output.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        sys.stdout.flush()
+
+    def writeRecords(self, records):
+        """ Prints the records of a site to the user's standard output.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if self._bot:
+            self.writeRecordsBot(records)
+        else:
+            self.writeRecordsNormal(records)
+
+    @classmethod
+    def defang(cls, result):
+        """ Prevents URLs of a result from being clickable.
+
+        Argument(s):
+            result -- value found by a site.
+
+        Return value(s):
+            string
+        """
+        return str(result).replace("www.", "www[.]").replace("http", "hxxp")
+
+    def writeRecordsBot(self, records):
+        """ Formats the records of a site minimized and prints them to the user's standard output.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        lines = []
+        if self.isNewTarget(records):
+            lines.append(f"\n**_ Results found for: {self._target} _**")
+        # a multisite where no regex returned anything is reported once by its url
+        if records and records[0].index is not None and records[0].status != SiteRecord.TIMEDOUT \
+                and not any(record.status == SiteRecord.RESULT for record in records):
+            lines.append(f"[+] {records[0].sourceurl} No results found")
+        else:
+            for record in records:
+                if record.status == SiteRecord.TIMEDOUT:
+                    lines.append(f"{record.reportstring} Timed out")
+                elif record.status == SiteRecord.NOCATEGORY:
+                    lines.append(f"No results in the {record.source} category")
+                elif record.status == SiteRecord.NORESULT:
+                    if record.index is None:
+                        lines.append(f"[+] {record.source} No results found")
+                    else:
+                        lines.append(f"{record.reportstring} No results found")
+                else:
+                    lines.append(f"{record.reportstring} {self.defang(record.result)}")
+        if lines:
+            print("\n".join(lines))
+
+    def writeRecordsNormal(self, records):
+        """ Formats the records of a site correctly and prints them to the user's standard output.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        lines = []
+        if self.isNewTarget(records):
+            lines.append(f"\n____________________     Results found for: {self._target}     ____________________")
+        for record in records:
+            if record.status == SiteRecord.TIMEDOUT:
+                lines.append(f"{record.reportstring} Timed out")
+            elif record.status == SiteRecord.NOCATEGORY:
+                lines.append(f"No results in the {record.source} category")
+            elif record.status == SiteRecord.NORESULT:
+                if record.index is None:
+                    lines.append(f"No results found in the {record.source}")
+                else:
+                    lines.append(f"{record.reportstring} No results found")
+            else:
+                lines.append(f"{record.reportstring} {self.defang(record.result)}")
+        if lines:
+            print("\n".join(lines))
+
+class CEFFileWriter(SiteWriter):
+    """ CEFFileWriter formats site information correctly and prints it to an output file in CEF format.
+            CEF format specification from http://mita-tac.wikispaces.com/file/view/CEF+White+Paper+071709.pdf
+            "Jan 18 11:07:53 host message"
+        where message:
+            "CEF:Version|Device Vendor|Device Product|Device Version|Signature ID|Name|Severity|Extension"
+            The fields shared by the rows of a site are formatted once per site.
+
+    Public Method(s):
+        open
+        writeRecords
+        close
+        formatRecords
+        stripReportString
+
+    Instance variable(s):
+        _filename
+        _writer
+        _ceffields
+        _cefseverity
+        _hostname
+        _reportstrings
+    """
+    CEFFIELDS = [
+        "CEF:Version1.1"                        # CEF Version
+        , "TekDefense"                          # Vendor
+        , "Automater"                           # Product
+        , "2.1"                                 # Version
+        , "0"                                   # SignatureID
+    ]
+    PATTERN = re.compile(r"^\[\+\]\s+")
+
+    def __init__(self, cefoutfile):
+        """ Class constructor.
+
+        Argument(s):
+            cefoutfile -- A string representation of a file that will store the output.
+        """
+        super().__init__()
+        self._filename = cefoutfile
+        self._writer = None
+        self._ceffields = None
+        self._cefseverity = "2"
+        self._hostname = None
+        self._reportstrings = {}
+
+    def open(self):
+        """ Opens the CEF file and computes the header fields shared by every row.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._hostname = socket.gethostname()
+        self._ceffields = [
+            " ".join([
+                datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+              , self._hostname
+               ])                               # Prefix
+        ] + self.CEFFIELDS
+        print(f"\n[+] Generating CEF output: {self._filename}")
+        self._file = open(self._filename, "w", buffering = self.BUFFERSIZE)
+        csv.register_dialect("escaped", delimiter="|", escapechar="\\", doublequote=False, quoting=csv.QUOTE_NONE)
+        self._writer = csv.writer(self._file, "escaped")
+
+    def close(self):
+        """ Closes the CEF file.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        super().close()
+        print(f"{self._filename} Generated")
+
+    def stripReportString(self, reportstring):
+        """ Returns reportstring without its leading [+] marker, stripping every report string only once.
+
+        Argument(s):
+            reportstring -- report string of a site source.
+
+        Return value(s):
+            string
+        """
+        stripped = self._reportstrings.get(reportstring)
+        if stripped is None:
+            stripped = self._reportstrings[reportstring] = self.PATTERN.sub("", reportstring)
+        return stripped
+
+    def formatRecords(self, records):
+        """ Formats the records of a site as CEF rows.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            list -- of lists of CEF fields, one per record.
+        """
+        if not records:
+            return []
+        # the records of a site share their target and target type
+        extension = f"[tgt={records[0].target},typ={records[0].targettype},src="
+        rows = []
+        for record in records:
+            change = "" if record.change is None else f",chg={record.change}"
+            message = f"{extension}{record.source},res={record.result}{change}]"
+            if record.status == SiteRecord.RESULT:
+                rows.append(self._ceffields + [
+                    f"{message} {self.stripReportString(record.reportstring)}{record.result}"
+                    , self._cefseverity
+                    , record.target
+                ])
+            else:
+                rows.append(self._ceffields + [message, "1", record.target])
+        return rows
+
+    def writeRecords(self, records):
+        """ Formats the records of a site in CEF format and writes them to the CEF file.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._writer.writerows(self.formatRecords(records))
+
+class CEFSyslogWriter(CEFFileWriter):
+    """ CEFSyslogWriter sends the CEF rows of every site to a syslog server as soon as the site is written,
+            so the results reach the SIEM while the run progresses.
+            Messages are handed to a sender thread through a bounded queue, which blocks the writer when
+            the server falls behind, and the sender batches every message queued since its last send.
+            UDP sends one datagram per message and TCP frames the messages with their octet count (RFC 6587).
+
+    Public Method(s):
+        open
+        writeRecords
+        flush
+        close
+        send
+        sendMessages
+        (Class Method) parseDestination
+
+    Instance variable(s):
+        _destination
+        _protocol
+        _address
+        _batchsize
+        _queue
+        _buffer
+        _socket
+        _sender
+        _sent
+        _dropped
+    """
+    ORDERED = False
+    LIVE = True
+    FACILITY = 16                   # local0
+    SEVERITY = 6                    # informational
+
+    def __init__(self, destination, batchsize = 512, queuesize = 1024):
+        """ Class constructor.
+
+        Argument(s):
+            destination -- string [udp://|tcp://]host[:port] of the syslog server.
+            batchsize -- maximum number of messages sent together. by default = 512
+            queuesize -- maximum number of sites waiting to be sent. by default = 1024
+        """
+        super().__init__(destination)
+        self._destination = destination
+        self._protocol, host, port = self.parseDestination(destination)
+        self._address = (host, port)
+        self._batchsize = batchsize
+        self._queue = queue.Queue(maxsize = queuesize)
+        self._buffer = None
+        self._socket = None
+        self._sender = None
+        self._sent = 0
+        self._dropped = 0
+
+    @classmethod
+    def parseDestination(cls, destination):
+        """ Splits a syslog destination in its protocol, host and port.
+
+        Argument(s):
+            destination -- string [udp://|tcp://]host[:port], UDP and port 514 by default.
+
+        Return value(s):
+            tuple -- (protocol, host, port)
+
+        Restriction(s):
+            Raises ValueError if the protocol or the port is not valid.
+        """
+        protocol, separator, address = destination.partition("://")
+        if not separator:
+            protocol, address = "udp", destination
+        protocol = protocol.lower()
+        if protocol not in ("udp", "tcp"):
+            raise ValueError(f"Unsupported syslog protocol {protocol}, use udp or tcp.")
+        host, separator, port = address.rpartition(":")
+        if not separator:
+            host, port = address, "514"
+        if not port.isdigit():
+            raise ValueError(f"Invalid syslog port {port}.")
+        return protocol, host.strip("[]"), int(port)
+
+    def connect(self):
+        """ Opens the socket to the syslog server.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if self._protocol == "tcp":
+            self._socket = socket.create_connection(self._address, timeout = 10)
+        else:
+            self._socket = socket.socket(socket.getaddrinfo(*self._address, type = socket.SOCK_DGRAM)[0][0]
+                                        , socket.SOCK_DGRAM)
+            self._socket.connect(self._address)
+
+    def open(self):
+        """ Connects to the syslog server and starts the sender thread.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._hostname = socket.gethostname()
+        self._ceffields = list(self.CEFFIELDS)
+        print(f"\n[+] Sending CEF output to syslog: {self._destination}")
+        self.connect()
+        csv.register_dialect("escaped", delimiter="|", escapechar="\\", doublequote=False, quoting=csv.QUOTE_NONE)
+        self._buffer = io.StringIO()
+        self._writer = csv.writer(self._buffer, "escaped", lineterminator = "")
+        self._sender = threading.Thread(target = self.send, daemon = True)
+        self._sender.start()
+
+    def writeRecords(self, records):
+        """ Formats the records of a site as syslog messages and queues them for the sender thread.
+            Blocks while the queue is full.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        rows = self.formatRecords(records)
+        if not rows:
+            return
+        now = datetime.now()
+        header = f"<{self.FACILITY * 8 + self.SEVERITY}>{now:%b} {now.day:2d} {now:%H:%M:%S} {self._hostname} "
+        lengths = [self._writer.writerow(row) for row in rows]
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        messages = []
+        start = 0
+        for length in lengths:
+            messages.append(f"{header}{text[start:start + length]}".encode("utf-8"))
+            start += length
+        self._queue.put(messages)
+
+    def send(self):
+        """ Sender thread loop sending the queued messages in batches until close queues None.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        while True:
+            messages = self._queue.get()
+            if messages is None:
+                self._queue.task_done()
+                return
+            # everything queued meanwhile goes out with the same send
+            done, stop = 1, False
+            while len(messages) < self._batchsize:
+                try:
+                    more = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                done += 1
+                if more is None:
+                    stop = True
+                    break
+                messages.extend(more)
+            self.sendMessages(messages)
+            for _ in range(done):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def sendMessages(self, messages):
+        """ Sends messages to the syslog server, reconnecting once if a TCP connection was lost.
+
+        Argument(s):
+            messages -- list of encoded syslog messages.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        for attempt in range(2):
+            try:
+                if self._protocol == "tcp":
+                    self._socket.sendall(b"".join(b"%d %s" % (len(message), message) for message in messages))
+                else:
+                    for message in messages:
+                        self._socket.send(message)
+                self._sent += len(messages)
+                return
+            except OSError as oe:
+                error = oe
+            if attempt or self._protocol != "tcp":
+                break
+            try:
+                self._socket.close()
+                self.connect()
+            except OSError as oe:
+                error = oe
+                break
+        print(f"[!] Syslog server {self._destination} did not receive {len(messages)} messages: {error}")
+        self._dropped += len(messages)
+
+    def flush(self):
+        """ Waits until every queued message was sent.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if self._sender is not None:
+            self._queue.join()
+
+    def close(self):
+        """ Sends the remaining messages, stops the sender thread and closes the socket.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if self._sender is not None:
+            self._queue.put(None)
+            self._sender.join()
+            self._sender = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+        dropped = f", {self._dropped} dropped" if self._dropped else ""
+        print(f"{self._sent} CEF messages sent to {self._destination}{dropped}")
+
+class TextFileWriter(SiteWriter):
+    """ TextFileWriter formats site information correctly and prints it to an output file in text format.
+
+    Public Method(s):
+        open
+        writeRecords
+        close
+
+    Instance variable(s):
+        _filename
+    """
+
+    def __init__(self, textoutfile):
+        """ Class constructor.
+
+        Argument(s):
+            textoutfile -- A string representation of a file that will store the output.
+        """
+        super().__init__()
+        self._filename = textoutfile
+
+    def open(self):
+        """ Opens the text file.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        print(f"\n[+] Generating text output: {self._filename}")
+        self._file = open(self._filename, "w", buffering = self.BUFFERSIZE)
+
+    def close(self):
+        """ Closes the text file.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        super().close()
+        print(f"{self._filename} Generated")
+
+    def writeRecords(self, records):
+        """ Formats the records of a site and writes them to the text file.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        lines = []
+        if self.isNewTarget(records):
+            lines.append(f"\n____________________     Results found for: {self._target}     ____________________")
+        for record in records:
+            if record.status == SiteRecord.TIMEDOUT:
+                lines.append(f"\n{record.reportstring} Timed out")
+            elif record.status == SiteRecord.NOCATEGORY:
+                lines.append(f"\nNo results in the {record.source} category")
+            elif record.status == SiteRecord.NORESULT:
+                if record.index is None:
+                    lines.append(f"\nNo results found in the {record.source}")
+                else:
+                    lines.append(f"\n{record.reportstring} No results found")
+            else:
+                lines.append(f"\n{record.reportstring} {record.result}")
+        self._file.write("".join(lines))
+
+class CSVFileWriter(SiteWriter):
+    """ CSVFileWriter formats site information correctly and prints it to an output file with comma-seperators.
+
+    Public Method(s):
+        open
+        writeRecords
+        close
+
+    Instance variable(s):
+        _filename
+        _writer
+    """
+
+    def __init__(self, csvoutfile):
+        """ Class constructor.
+
+        Argument(s):
+            csvoutfile -- A string representation of a file that will store the output.
+        """
+        super().__init__()
+        self._filename = csvoutfile
+        self._writer = None
+
+    def open(self):
+        """ Opens the CSV file and writes its header row.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        print(f"\n[+] Generating CSV output: {self._filename}")
+        self._file = open(self._filename, "w", buffering = self.BUFFERSIZE)
+        self._writer = csv.writer(self._file, quoting=csv.QUOTE_ALL)
+        self._writer.writerow(["Target", "Type", "Source", "Result"])
+
+    def close(self):
+        """ Closes the CSV file.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        super().close()
+        print(f"{self._filename} Generated")
+
+    def writeRecords(self, records):
+        """ Writes the records of a site as rows of the CSV file.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._writer.writerows([record.target, record.targettype, record.source
+                                , f"Removed: {record.result}" if record.change == SiteRecord.REMOVED else record.result]
+                                    for record in records)
+
+class HTMLFileWriter(SiteWriter):
+    """ HTMLFileWriter formats site information correctly and prints it to an output file using HTML markup.
+
+    Public Method(s):
+        open
+        writeRecords
+        close
+        (Class Method) getHTMLOpening
+        (Class Method) getHTMLClosing
+
+    Instance variable(s):
+        _filename
+    """
+
+    def __init__(self, htmloutfile):
+        """ Class constructor.
+
+        Argument(s):
+            htmloutfile -- A string representation of a file that will store the output.
+        """
+        super().__init__()
+        self._filename = htmloutfile
+
+    def open(self):
+        """ Opens the HTML file and writes the opening markup.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        print(f"\n[+] Generating HTML output: {self._filename}")
+        self._file = open(self._filename, "w", buffering = self.BUFFERSIZE)
+        self._file.write(self.getHTMLOpening())
+
+    def close(self):
+        """ Writes the closing markup and closes the HTML file.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if self._file is not None:
+            self._file.write(self.getHTMLClosing())
+        super().close()
+        print(f"{self._filename} Generated")
+
+    def writeRecords(self, records):
+        """ Writes the records of a site as HTML table rows.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._file.write("".join(f"<tr><td>{record.target}</td><td>{record.targettype}</td><td>{record.source}</td>"\
+                                    f"<td>{"Removed: " if record.change == SiteRecord.REMOVED else ""}{record.result}"\
+                                    "</td></tr>\n" for record in records))
+
+    @classmethod
+    def getStyleSheet(cls):
+        """ Returns the stylesheet shared by the HTML outputs.
+
+        Return value(s):
+            string -- CSS rules.
+        """
+        return """    #table-3 {
+        border: 1px solid #DFDFDF;
+        background-color: #F9F9F9;
+        width: 100%;
+        -moz-border-radius: 3px;
+        -webkit-border-radius: 3px;
+        border-radius: 3px;
+        font-family: Arial,"Bitstream Vera Sans",Helvetica,Verdana,sans-serif;
+        color: #333;
+    }
+    #table-3 td, #table-3 th {
+        border-top-color: white;
+        border-bottom: 1px solid #DFDFDF;
+        color: #555;
+    }
+    #table-3 th {
+        text-shadow: rgba(255, 255, 255, 0.796875) 0px 1px 0px;
+        font-family: Georgia,"Times New Roman","Bitstream Charter",Times,serif;
+        font-weight: normal;
+        padding: 7px 7px 8px;
+        text-align: left;
+        line-height: 1.3em;
+        font-size: 14px;
+    }
+    #table-3 td {
+        font-size: 12px;
+        padding: 4px 7px 2px;
+        vertical-align: top;
+    }res
+    h1 {
+        text-shadow: rgba(255, 255, 255, 0.796875) 0px 1px 0px;
+        font-family: Georgia,"Times New Roman","Bitstream Charter",Times,serif;
+        font-weight: normal;
+        padding: 7px 7px 8px;
+        text-align: Center;
+        line-height: 1.3em;
+        font-size: 40px;
+    }
+    h2 {
+        text-shadow: rgba(255, 255, 255, 0.796875) 0px 1px 0px;
+        font-family: Georgia,"Times New Roman","Bitstream Charter",Times,serif;
+        font-weight: normal;
+        padding: 7px 7px 8px;
+        text-align: left;
+        line-height: 1.3em;
+        font-size: 16px;
+    }
+    h4 {
+        text-shadow: rgba(255, 255, 255, 0.796875) 0px 1px 0px;
+        font-family: Georgia,"Times New Roman","Bitstream Charter",Times,serif;
+        font-weight: normal;
+        padding: 7px 7px 8px;
+        text-align: left;
+        line-height: 1.3em;
+        font-size: 10px;
+    }
+"""
+
+    @classmethod
+    def getHTMLOpening(cls):
+        """ Creates HTML markup to provide correct formatting for initial HTML file requirements.
+
+        Argument(s):
+            No arguments required.
+
+        Return value(s):
+            string -- contains opening HTML markup information for HTML output file.
+        """
+        return f"""<style type="text/css">
+{cls.getStyleSheet()}</style>
+<html>
+    <body>
+        <title> Automater Results </title>
+        <h1> Automater Results </h1>
+        <table id="table-3">
+            <tr>
+            <th>Target</th>
+            <th>Type</th>
+            <th>Source</th>
+            <th>Result</th>
+            </tr>
+"""
+
+    @classmethod
+    def getHTMLClosing(cls):
+        """ Creates HTML markup to provide correct formatting for closing HTML file requirements.
+
+        Argument(s):
+            No arguments required.
+
+        Return value(s):
+            string -- contains closing HTML markup information for HTML output file.
+        """
+        return """        </table>
+        <br><br>
+        <p>Created using Automater.py <a href="https://github.com/madrang/MadDefense-Automater">https://github.com/madrang/MadDefense-Automater</a></p>
+    </body>
+</html>"""
+
+class HTMLReportWriter(SiteWriter):
+    """ HTMLReportWriter writes a multi-file HTML report that browsers can open whatever the number of results.
+            Result rows are streamed to detail pages of at most pagesize rows each, and the targets to
+            summary pages of the same size. Once every site is written, an index page links the pages and
+            summarizes the result counts of each source. Only the counts and the page list are kept in memory.
+
+    Public Method(s):
+        open
+        writeRecords
+        close
+
+    Instance variable(s):
+        _directory
+        _pagesize
+        _pages
+        _targetpages
+        _page
+        _targetpage
+        _sources
+        _targetrow
+        _rows
+    """
+
+    def __init__(self, directory, pagesize = 5000):
+        """ Class constructor.
+
+        Argument(s):
+            directory -- A string representation of the directory that will store the report.
+            pagesize -- maximum number of rows of each page. by default = 5000
+        """
+        super().__init__()
+        self._directory = directory
+        self._pagesize = max(1, pagesize)
+        self._pages = []
+        self._targetpages = []
+        self._page = None
+        self._targetpage = None
+        self._sources = {}
+        self._targetrow = None
+        self._rows = 0
+
+    def open(self):
+        """ Creates the report directory and its stylesheet.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        print(f"\n[+] Generating HTML report: {self._directory}")
+        os.makedirs(self._directory, exist_ok = True)
+        with open(os.path.join(self._directory, "report.css"), "w") as f:
+            f.write(HTMLFileWriter.getStyleSheet())
+
+    @classmethod
+    def getPageOpening(cls, title, navigation, columns):
+        """ Creates the opening markup of a report page.
+
+        Argument(s):
+            title -- string title of the page.
+            navigation -- string HTML markup of the links to the other pages.
+            columns -- list of the column names of the page table.
+
+        Return value(s):
+            string
+        """
+        headers = "".join(f"<th>{column}</th>" for column in columns)
+        return f"""<!DOCTYPE html>
+<html>
+    <head>
+        <meta charset="utf-8">
+        <title>{html.escape(title)}</title>
+        <link rel="stylesheet" type="text/css" href="report.css">
+    </head>
+    <body>
+        <h1>{html.escape(title)}</h1>
+        <h2>{navigation}</h2>
+        <table id="table-3">
+            <tr>{headers}</tr>
+"""
+
+    @classmethod
+    def getPageClosing(cls, navigation = None):
+        """ Creates the closing markup of a report page.
+
+        Argument(s):
+            navigation -- string HTML markup of the links written below the table. by default = None
+
+        Return value(s):
+            string
+        """
+        return f"""        </table>
+        {f"<h2>{navigation}</h2>" if navigation else "<br>"}<br>
+        <p>Created using Automater.py <a href="https://github.com/madrang/MadDefense-Automater">https://github.com/madrang/MadDefense-Automater</a></p>
+    </body>
+</html>"""
+
+    def startPage(self, pages, prefix, title, columns):
+        """ Opens the next page of a page series.
+
+        Argument(s):
+            pages -- list of the page dictionaries of the series.
+            prefix -- string prefix of the page file names.
+            title -- string title of the series.
+            columns -- list of the column names of the page table.
+
+        Return value(s):
+            dict -- the new page, holding its file, name, number of rows and first and last target.
+        """
+        number = len(pages) + 1
+        name = f"{prefix}-{number:05d}.html"
+        navigation = '<a href="index.html">Index</a>'
+        if number > 1:
+            navigation = f'<a href="{prefix}-{number - 1:05d}.html">Previous</a> | {navigation}'
+        page = {"name": name, "rows": 0, "first": None, "last": None
+                , "file": open(os.path.join(self._directory, name), "w", buffering = self.BUFFERSIZE)}
+        page["file"].write(self.getPageOpening(f"{title} page {number}", navigation, columns))
+        pages.append(page)
+        return page
+
+    def endPage(self, page, nextpage = None):
+        """ Closes a page.
+
+        Argument(s):
+            page -- page dictionary returned by startPage.
+            nextpage -- string name of the page following it in its series. by default = None, the last page
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if page is not None:
+            page["file"].write(self.getPageClosing(None if nextpage is None else f'<a href="{nextpage}">Next</a>'))
+            page["file"].close()
+            page["file"] = None
+
+    def writeRecords(self, records):
+        """ Writes the records of a site to the detail pages and counts them in the summaries.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        for record in records:
+            if self._page is None or self._page["rows"] >= self._pagesize:
+                previous = self._page
+                self._page = self.startPage(self._pages, "page", "Automater Results"
+                                            , ["Target", "Type", "Source", "Result"])
+                self.endPage(previous, self._page["name"])
+            if self._page["first"] is None:
+                self._page["first"] = record.target
+            self._page["last"] = record.target
+            self._page["rows"] += 1
+            self._page["file"].write(f"<tr><td>{html.escape(str(record.target))}</td>"\
+                                        f"<td>{html.escape(str(record.targettype))}</td>"\
+                                        f"<td>{html.escape(str(record.source))}</td>"\
+                                        f"<td>{"Removed: " if record.change == SiteRecord.REMOVED else ""}"\
+                                        f"{html.escape(str(record.result))}</td></tr>\n")
+            counts = self._sources.setdefault(str(record.source), {SiteRecord.RESULT: 0, SiteRecord.NORESULT: 0
+                                                                , SiteRecord.NOCATEGORY: 0, SiteRecord.TIMEDOUT: 0})
+            counts[record.status] += 1
+            if self._targetrow is None or self._targetrow["target"] != record.target:
+                self.writeTargetRow()
+                self._targetrow = {"target": record.target, "targettype": record.targettype
+                                    , "page": self._page["name"], "results": 0, "rows": 0}
+            self._targetrow["rows"] += 1
+            if record.status == SiteRecord.RESULT:
+                self._targetrow["results"] += 1
+            self._rows += 1
+
+    def writeTargetRow(self):
+        """ Writes the summary row of the target just completed to the target pages.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        row = self._targetrow
+        if row is None:
+            return
+        if self._targetpage is None or self._targetpage["rows"] >= self._pagesize:
+            previous = self._targetpage
+            self._targetpage = self.startPage(self._targetpages, "targets", "Automater Targets"
+                                            , ["Target", "Type", "Results", "Rows", "Details"])
+            self.endPage(previous, self._targetpage["name"])
+        if self._targetpage["first"] is None:
+            self._targetpage["first"] = row["target"]
+        self._targetpage["last"] = row["target"]
+        self._targetpage["rows"] += 1
+        self._targetpage["file"].write(f"<tr><td>{html.escape(str(row['target']))}</td>"\
+                                        f"<td>{html.escape(str(row['targettype']))}</td>"\
+                                        f"<td>{row['results']}</td><td>{row['rows']}</td>"\
+                                        f"<td><a href=\"{row['page']}\">{row['page']}</a></td></tr>\n")
+
+    def getPageList(self, pages):
+        """ Creates the table rows linking a page series from the index.
+
+        Argument(s):
+            pages -- list of the page dictionaries of the series.
+
+        Return value(s):
+            string
+        """
+        return "".join(f"<tr><td><a href=\"{page['name']}\">{page['name']}</a></td>"\
+                        f"<td>{html.escape(str(page['first']))}</td><td>{html.escape(str(page['last']))}</td>"\
+                        f"<td>{page['rows']}</td></tr>\n" for page in pages)
+
+    def close(self):
+        """ Closes the last pages and writes the index page.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self.writeTargetRow()
+        self._targetrow = None
+        self.endPage(self._page)
+        self.endPage(self._targetpage)
+        self._page = self._targetpage = None
+        with open(os.path.join(self._directory, "index.html"), "w") as f:
+            f.write(self.getPageOpening("Automater Results", f"{self._rows} rows in {len(self._pages)} pages"
+                                        , ["Source", "Results", "No results", "Timed out"]))
+            for source, counts in sorted(self._sources.items()):
+                f.write(f"<tr><td>{html.escape(source)}</td><td>{counts[SiteRecord.RESULT]}</td>"\
+                        f"<td>{counts[SiteRecord.NORESULT] + counts[SiteRecord.NOCATEGORY]}</td>"\
+                        f"<td>{counts[SiteRecord.TIMEDOUT]}</td></tr>\n")
+            f.write("""        </table>
+        <h2>Targets</h2>
+        <table id="table-3">
+            <tr><th>Page</th><th>First target</th><th>Last target</th><th>Targets</th></tr>
+""")
+            f.write(self.getPageList(self._targetpages))
+            f.write("""        </table>
+        <h2>Results</h2>
+        <table id="table-3">
+            <tr><th>Page</th><th>First target</th><th>Last target</th><th>Rows</th></tr>
+""")
+            f.write(self.getPageList(self._pages))
+            f.write(self.getPageClosing())
+        print(f"{self._directory} Generated")
+
+class JSONLFileWriter(SiteWriter):
+    """ JSONLFileWriter writes one JSON object per line for every record, so log pipelines can ingest
+            the results without parsing CSV quoting or the CEF dialect.
+            Files ending in .gz are written as a gzip stream.
+            The file is flushed every flushinterval seconds so it can be tailed while the run progresses.
+
+    Public Method(s):
+        open
+        writeRecords
+        close
+        (Class Method) toDict
+
+    Instance variable(s):
+        _filename
+        _flushinterval
+        _lastflush
+    """
+    ORDERED = False
+
+    def __init__(self, jsonloutfile, flushinterval = 5.0):
+        """ Class constructor.
+
+        Argument(s):
+            jsonloutfile -- A string representation of a file that will store the output.
+            flushinterval -- number of seconds between flushes of the file. by default = 5.0
+        """
+        super().__init__()
+        self._filename = jsonloutfile
+        self._flushinterval = flushinterval
+        self._lastflush = time.monotonic()
+
+    def open(self):
+        """ Opens the JSON lines file, compressed if its name ends in .gz.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        print(f"\n[+] Generating JSON lines output: {self._filename}")
+        if self._filename.endswith(".gz"):
+            self._file = gzip.open(self._filename, "wt", encoding = "utf-8")
+        else:
+            self._file = open(self._filename, "w", buffering = self.BUFFERSIZE)
+        self._lastflush = time.monotonic()
+
+    def close(self):
+        """ Closes the JSON lines file.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        super().close()
+        print(f"{self._filename} Generated")
+
+    @classmethod
+    def toDict(cls, record):
+        """ Returns the dictionary written for record.
+
+        Argument(s):
+            record -- SiteRecord object to convert.
+
+        Return value(s):
+            dict
+        """
+        return {
+            "target": record.target
+            , "targettype": record.targettype
+            , "site": record.name
+            , "source": record.source
+            , "index": record.index
+            , "status": record.status
+            , "result": record.result
+            , "latency": record.latency
+            , "cache": record.cachestatus
+            , "change": record.change
+        }
+
+    def writeRecords(self, records):
+        """ Writes the records of a site as JSON lines and flushes the file once the flush interval elapsed.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._file.write("".join(f"{json.dumps(self.toDict(record), default = str)}\n" for record in records))
+        if time.monotonic() - self._lastflush >= self._flushinterval:
+            self._file.flush()
+            self._lastflush = time.monotonic()
+
+class SQLiteFileWriter(SiteWriter):
+    """ SQLiteFileWriter writes every record to a local SQLite database so results of many runs can be
+            searched by target, source or result value.
+            Each run is stored under its own run id. The records of a site are inserted in bulk and
+            the transaction is committed every flushinterval seconds and when the writer is closed.
+
+    Public Method(s):
+        open
+        writeRecords
+        flush
+        close
+
+    Instance variable(s):
+        _filename
+        _flushinterval
+        _lastflush
+        _connection
+        _run
+    """
+    ORDERED = False
+    BASELINE = True
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS runs (
+            id INTEGER PRIMARY KEY
+            , started TEXT
+            , host TEXT
+        );
+        CREATE TABLE IF NOT EXISTS results (
+            run INTEGER REFERENCES runs(id)
+            , target TEXT
+            , targettype TEXT
+            , site TEXT
+            , source TEXT
+            , regexindex INTEGER
+            , status TEXT
+            , result TEXT
+            , latency REAL
+            , cache TEXT
+        );
+        CREATE INDEX IF NOT EXISTS results_target ON results (target);
+        CREATE INDEX IF NOT EXISTS results_source ON results (source);
+        CREATE INDEX IF NOT EXISTS results_result ON results (result);
+    """
+
+    def __init__(self, dboutfile, flushinterval = 5.0):
+        """ Class constructor.
+
+        Argument(s):
+            dboutfile -- A string representation of the SQLite database file that will store the output.
+            flushinterval -- number of seconds between commits of the database. by default = 5.0
+        """
+        super().__init__()
+        self._filename = dboutfile
+        self._flushinterval = flushinterval
+        self._lastflush = time.monotonic()
+        self._connection = None
+        self._run = None
+
+    def open(self):
+        """ Opens the database, creates its tables and indexes if needed and registers a new run.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        print(f"\n[+] Generating SQLite output: {self._filename}")
+        self._connection = sqlite3.connect(self._filename, check_same_thread = False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.executescript(self.SCHEMA)
+        self._run = self._connection.execute("INSERT INTO runs (started, host) VALUES (?, ?)"
+                                            , (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), socket.gethostname())
+                                            ).lastrowid
+        self._connection.commit()
+        self._lastflush = time.monotonic()
+
+    def writeRecords(self, records):
+        """ Inserts the records of a site and commits once the flush interval elapsed.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._connection.executemany("INSERT INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+                                    , [(self._run, record.target, record.targettype, record.name
+                                        , SiteRecord.toText(record.source), record.index, record.status
+                                        , SiteRecord.toText(record.result), record.latency, record.cachestatus)
+                                            for record in records])
+        if time.monotonic() - self._lastflush >= self._flushinterval:
+            self.flush()
+
+    def flush(self):
+        """ Commits the records inserted so far.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if self._connection is not None:
+            self._connection.commit()
+        self._lastflush = time.monotonic()
+
+    def close(self):
+        """ Commits the remaining records and closes the database.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if self._connection is not None:
+            self._connection.commit()
+            self._connection.close()
+            self._connection = None
+        print(f"{self._filename} Generated")
+
+class JournalFileWriter(SiteWriter):
+    """ JournalFileWriter writes every site, definition and results included, to a journal file.
+            The journal of each shard of a run can be merged back with the --merge option.
+
+    Public Method(s):
+        open
+        writeSite
+        close
+
+    Instance variable(s):
+        _filename
+    """
+    ORDERED = False
+    BASELINE = True
+
+    def __init__(self, journaloutfile):
+        """ Class constructor.
+
+        Argument(s):
+            journaloutfile -- A string representation of a file that will store the output.
+        """
+        super().__init__()
+        self._filename = journaloutfile
+
+    def open(self):
+        """ Opens the journal file.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        print(f"\n[+] Generating journal output: {self._filename}")
+        self._file = open(self._filename, "w", buffering = self.BUFFERSIZE)
+
+    def close(self):
+        """ Closes the journal file.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        super().close()
+        print(f"{self._filename} Generated")
+
+    def writeSite(self, site, records = None):
+        """ Writes the site as a single JSON line.
+
+        Argument(s):
+            site -- Site object to write.
+            records -- unused, the journal stores the site itself. by default = None
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._file.write(json.dumps(site.toDict()))
+        self._file.write("\n")
+
+class FanOutWriter(SiteWriter):
+    """ FanOutWriter dispatches every site to a set of writers in a single pass.
+            Each site is flattened into records once and the same records are handed to every writer.
+
+    Public Method(s):
+        open
+        writeSite
+        writeRecords
+        flush
+        close
+        (Property) Writers
+
+    Instance variable(s):
+        _writers
+    """
+
+    def __init__(self, writers):
+        """ Class constructor.
+
+        Argument(s):
+            writers -- list of SiteWriter objects receiving the sites.
+        """
+        super().__init__()
+        self._writers = writers
+
+    @property
+    def Writers(self):
+        """ Returns the writers the sites are dispatched to.
+
+        Return value(s):
+            list -- of SiteWriter objects.
+        """
+        return self._writers
+
+    def open(self):
+        """ Opens every writer.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        for writer in self._writers:
+            writer.open()
+
+    def writeSite(self, site, records = None):
+        """ Writes site to every writer.
+
+        Argument(s):
+            site -- Site object to write.
+            records -- list of SiteRecord objects already flattened from site. by default = None
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if records is None:
+            records = SiteRecord.fromSite(site)
+        for writer in self._writers:
+            writer.writeSite(site, records)
+
+    def writeRecords(self, records):
+        """ Writes the records of a single site to every writer.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        for writer in self._writers:
+            writer.writeRecords(records)
+
+    def flush(self):
+        """ Flushes every writer.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        for writer in self._writers:
+            writer.flush()
+
+    def close(self):
+        """ Closes every writer.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        for writer in self._writers:
+            writer.close()
+
+class DiffWriter(FanOutWriter):
+    """ DiffWriter compares the records of the run with the latest run stored in a baseline result database
+            and only passes the added, changed and removed records on to its writers.
+            Records are compared per (target, source, regex index) key through 8 byte fingerprints of
+            the key and of its results, so the baseline is read in a single pass and only the fingerprints
+            are kept in memory. Removed records are read back from the baseline in a second pass and written
+            when the writer is closed, for the targets and sites run again only.
+            Sources that timed out are not compared.
+
+    Public Method(s):
+        open
+        writeSite
+        writeRecords
+        close
+        (Class Method) fingerprint
+
+    Instance variable(s):
+        _baselinefile
+        _run
+        _baseline
+        _seen
+        _seenpairs
+        _verbose
+    """
+
+    def __init__(self, baselinefile, writers, verbose = False):
+        """ Class constructor.
+
+        Argument(s):
+            baselinefile -- string name of the result database written by a previous run with --db.
+            writers -- list of SiteWriter objects receiving the changed records.
+            verbose -- boolean representing whether text will be printed to stdout. by default = False
+        """
+        super().__init__(writers)
+        self.ORDERED = any(writer.ORDERED for writer in writers)
+        self._baselinefile = baselinefile
+        self._run = None
+        self._baseline = {}
+        self._seen = set()
+        self._seenpairs = set()
+        self._verbose = verbose
+
+    @classmethod
+    def fingerprint(cls, *values):
+        """ Returns an 8 byte fingerprint of values.
+
+        Argument(s):
+            values -- values to fingerprint, converted to text.
+
+        Return value(s):
+            bytes
+        """
+        return hashlib.blake2b("\x1f".join(str(value) for value in values).encode("utf-8"), digest_size = 8).digest()
+
+    @classmethod
+    def groupKey(cls, row):
+        return row[0], row[3], row[4]
+
+    def baselineGroups(self):
+        """ Reads the baseline run grouped by (target, source, regex index) key.
+
+        Return value(s):
+            Iterator of (key, rows) tuples, rows being a list of baseline rows.
+        """
+        if self._run is None:
+            return
+        for key, rows in groupby(ResultDatabase.RunRows(self._baselinefile, self._run, self._verbose), key = self.groupKey):
+            yield key, list(rows)
+
+    def open(self):
+        """ Fingerprints the latest run of the baseline database and opens every writer.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._run = ResultDatabase.LatestRun(self._baselinefile, self._verbose)
+        if self._run is None:
+            print(f"[-] No baseline run found in {self._baselinefile}, every result is reported as added.")
+        for key, rows in self.baselineGroups():
+            self._baseline[self.fingerprint(*key)] = self.fingerprint(*((row[5], row[6]) for row in rows))
+        super().open()
+
+    def writeSite(self, site, records = None):
+        """ Writes the changed records of site to every writer.
+
+        Argument(s):
+            site -- Site object to write.
+            records -- list of SiteRecord objects already flattened from site. by default = None
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self.writeRecords(SiteRecord.fromSite(site) if records is None else records)
+
+    def writeRecords(self, records):
+        """ Compares the records of a site with the baseline and writes the changed ones to every writer.
+
+        Argument(s):
+            records -- list of SiteRecord objects of a single site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        changed = []
+        for key, group in groupby(records, key = lambda record: (record.target, SiteRecord.toText(record.source)
+                                                                , record.index)):
+            group = list(group)
+            keyprint = self.fingerprint(*key)
+            self._seen.add(keyprint)
+            self._seenpairs.add(self.fingerprint(group[0].target, group[0].name))
+            if any(record.status == SiteRecord.TIMEDOUT for record in group):
+                continue
+            baseline = self._baseline.get(keyprint)
+            if baseline is None:
+                change = SiteRecord.ADDED
+            elif baseline != self.fingerprint(*((record.status, SiteRecord.toText(record.result))
+                                                    for record in group)):
+                change = SiteRecord.CHANGED
+            else:
+                continue
+            for record in group:
+                record.change = change
+            changed.extend(group)
+        if changed:
+            super().writeRecords(changed)
+
+    def close(self):
+        """ Writes the baseline results no longer returned by the sites run again and closes every writer.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        try:
+            for key, rows in self.baselineGroups():
+                if self.fingerprint(*key) in self._seen or self.fingerprint(rows[0][0], rows[0][2]) not in self._seenpairs:
+                    continue
+                removed = [SiteRecord.fromRow(*row, change = SiteRecord.REMOVED) for row in rows
+                            if row[5] == SiteRecord.RESULT]
+                if removed:
+                    super().writeRecords(removed)
+        finally:
+            self._baseline.clear()
+            super().close()
+
+class StreamingOutput(FanOutWriter):
+    """ StreamingOutput sends each site to every writer as soon as the site completes
+            instead of waiting for the whole run. Sites are written in completion order,
+            and the writers are flushed at most every flushinterval seconds.
+
+    Public Method(s):
+        open
+        writeSite
+
+    Instance variable(s):
+        _flushinterval
+        _lastflush
+    """
+
+    def __init__(self, writers, flushinterval = 5.0):
+        """ Class constructor.
+
+        Argument(s):
+            writers -- list of SiteWriter objects receiving the sites.
+            flushinterval -- number of seconds between flushes of the writers. by default = 5.0
+        """
+        super().__init__(writers)
+        self._flushinterval = flushinterval
+        self._lastflush = time.monotonic()
+
+    def open(self):
+        """ Opens every writer.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        super().open()
+        self._lastflush = time.monotonic()
+
+    def writeSite(self, site, records = None):
+        """ Writes site to every writer and flushes them once the flush interval elapsed.
+
+        Argument(s):
+            site -- Site object to write.
+            records -- list of SiteRecord objects already flattened from site. by default = None
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        super().writeSite(site, records)
+        if time.monotonic() - self._lastflush >= self._flushinterval:
+            self.flush()
+            self._lastflush = time.monotonic()
+
+class TargetBarrier(StreamingOutput):
+    """ TargetBarrier streams the results of a run one target block at a time.
+            Every built site is announced through expect, and completed sites are held until every
+            site of their target has completed. The block of the target is then written with its
+            sources in config order, so the outputs keep one "Results found for" block per target
+            without waiting for the whole run. Only the targets in flight are held in memory.
+
+    Public Method(s):
+        expect
+        writeSite
+        close
+
+    Instance variable(s):
+        _targets
+        _building
+        _lock
+    """
+
+    def __init__(self, writers, flushinterval = 5.0):
+        """ Class constructor.
+
+        Argument(s):
+            writers -- list of SiteWriter objects receiving the sites.
+            flushinterval -- number of seconds between flushes of the writers. by default = 5.0
+        """
+        super().__init__(writers, flushinterval)
+        self._targets = OrderedDict()
+        self._building = None
+        self._lock = threading.Lock()
+
+    def expect(self, site):
+        """ Registers a built site the target block has to wait for.
+            Sites are built one target after the other, so a new target means the previous one
+            has all its sites built. None means every site of the run is built.
+
+        Argument(s):
+            site -- Site object just built or None.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        with self._lock:
+            target = None if site is None else site.Target
+            if self._building is not None and self._building != target:
+                self._targets[self._building]["sealed"] = True
+            self._building = target
+            if site is not None:
+                block = self._targets.setdefault(target, {"expected": 0, "sites": [], "sealed": False})
+                block["expected"] += 1
+
+    def writeSite(self, site, records = None):
+        """ Holds site until its target completes, then writes every completed target block.
+
+        Argument(s):
+            site -- Site object completed or timed out.
+            records -- list of SiteRecord objects already flattened from site. by default = None
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        with self._lock:
+            block = self._targets.setdefault(site.Target, {"expected": 1, "sites": [], "sealed": True})
+            block["sites"].append((site, records))
+            completed = [target for target, block in self._targets.items()
+                            if block["sealed"] and len(block["sites"]) >= block["expected"]]
+            blocks = [self._targets.pop(target) for target in completed]
+        for block in blocks:
+            self.writeBlock(block)
+
+    def writeBlock(self, block):
+        """ Writes the sites of a target block in the order they were built.
+
+        Argument(s):
+            block -- dictionary holding the completed sites of a target.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        for site, records in sorted(block["sites"], key = lambda entry: entry[0].Sequence or ()):
+            super().writeSite(site, records)
+
+    def close(self):
+        """ Writes the blocks still held, complete or not, and closes every writer.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        try:
+            with self._lock:
+                blocks = list(self._targets.values())
+                self._targets.clear()
+            for block in blocks:
+                self.writeBlock(block)
+        finally:
+            super().close()
+
+class SpillSortOutput(FanOutWriter):
+    """ SpillSortOutput writes the sites of a run sorted by target, as a run kept in memory would,
+            while holding at most maxsites sites in memory.
+            Once the limit is reached the sites held are sorted and spilled to a temporary file,
+            and the sorted spill files are merged back when the output is closed.
+            Writers which do not need the sites sorted receive each site as soon as it completes.
+
+    Public Method(s):
+        open
+        writeSite
+        close
+
+    Instance variable(s):
+        _maxsites
+        _sites
+        _spills
+    """
+
+    def __init__(self, writers, maxsites):
+        """ Class constructor.
+
+        Argument(s):
+            writers -- list of SiteWriter objects receiving the sites.
+            maxsites -- maximum number of sites held in memory before spilling them to disk.
+        """
+        super().__init__(writers)
+        self._maxsites = max(1, maxsites)
+        self._sites = []
+        self._spills = []
+
+    def writeSite(self, site, records = None):
+        """ Writes site to the unordered writers and holds its records for the ordered ones.
+
+        Argument(s):
+            site -- Site object to write.
+            records -- list of SiteRecord objects already flattened from site. by default = None
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if records is None:
+            records = SiteRecord.fromSite(site)
+        for writer in self._writers:
+            if not writer.ORDERED:
+                writer.writeSite(site, records)
+        # sites of a target keep the order they were built in, like the stable sort of a run kept in memory
+        self._sites.append((site.Target, site.Sequence or (), records))
+        if len(self._sites) >= self._maxsites:
+            self.spill()
+
+    def spill(self):
+        """ Sorts the sites held in memory and writes them to a temporary file.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._sites.sort(key = self.sortKey)
+        spill = tempfile.TemporaryFile()
+        for entry in self._sites:
+            pickle.dump(entry, spill, pickle.HIGHEST_PROTOCOL)
+        spill.seek(0)
+        self._spills.append(spill)
+        self._sites = []
+
+    @classmethod
+    def sortKey(cls, entry):
+        return entry[0], entry[1]
+
+    @classmethod
+    def readSpill(cls, spill):
+        """ Reads back the sites of a spill file in the order they were written.
+
+        Argument(s):
+            spill -- temporary file written by spill.
+
+        Return value(s):
+            Iterator of (target, sequence, records) tuples.
+        """
+        while True:
+            try:
+                yield pickle.load(spill)
+            except EOFError:
+                return
+
+    def close(self):
+        """ Merges the spilled and remaining sites, writes them to the ordered writers and closes every writer.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        try:
+            self._sites.sort(key = self.sortKey)
+            ordered = [writer for writer in self._writers if writer.ORDERED]
+            for target, sequence, records in heapq.merge(*[self.readSpill(spill) for spill in self._spills]
+                                                        , self._sites, key = self.sortKey):
+                for writer in ordered:
+                    writer.writeRecords(records)
+        finally:
+            for spill in self._spills:
+                spill.close()
+            self._spills = []
+            self._sites = []
+            super().close()
+
+class QueryOutput:
+    """ QueryOutput prints the answers of the reverse lookups and pivots run against an SQLite result database.
+
+    Public Method(s):
+        (Class Method) PrintTargetsWithResult
+        (Class Method) PrintSharedResults
+
+    Instance variable(s):
+        No instance variables.
+    """
+
+    @classmethod
+    def PrintTargetsWithResult(cls, value, rows):
+        """ Prints the targets for which a source returned value.
+
+        Argument(s):
+            value -- string result value that was looked up.
+            rows -- iterator of (target, targettype, source) tuples.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        print(f"\n____________________     Targets with result: {value}     ____________________")
+        found = False
+        for target, targettype, source in rows:
+            print(f"[+] {source}: {target} ({targettype})")
+            found = True
+        if not found:
+            print("No targets found")
+
+    @classmethod
+    def PrintSharedResults(cls, target, rows):
+        """ Prints the other targets sharing a result with target, grouped by source and result.
+
+        Argument(s):
+            target -- string target that was pivoted on.
+            rows -- iterator of (source, result, target) tuples sorted by source and result.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        print(f"\n____________________     Results shared with: {target}     ____________________")
+        shared = None
+        for source, result, other in rows:
+            if shared != (source, result):
+                print(f"\n[+] {source} {result} is shared by:")
+                shared = (source, result)
+            print(f"    {other}")
+        if shared is None:
+            print("No shared results found")
+
+class StatisticsOutput:
+    """ StatisticsOutput prints or saves the per site timing and volume statistics of a run.
+
+    Public Method(s):
+        (Class Method) PrintStatistics
+        (Class Method) WriteStatistics
+        (Class Method) formatSeconds
+
+    Instance variable(s):
+        No instance variables.
+    """
+
+    @classmethod
+    def formatSeconds(cls, seconds):
+        """ Formats a number of seconds for the statistics table.
+
+        Argument(s):
+            seconds -- float number of seconds or None.
+
+        Return value(s):
+            string
+        """
+        if seconds is None:
+            return "-"
+        if seconds < 1:
+            return f"{seconds * 1000:.1f}ms"
+        return f"{seconds:.2f}s"
+
+    @classmethod
+    def PrintStatistics(cls, summaries):
+        """ Prints a table of the statistics of every site name, the ones taking the most time first.
+
+        Argument(s):
+            summaries -- list of dictionaries returned by SiteStatistics.summary.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        print("\n____________________     Site Statistics     ____________________")
+        if not summaries:
+            print("No sites were run")
+            return
+        columns = ["Site", "Total", "Sites", "Requests", "Timed out", "p50", "p90", "p99", "Max", "Bytes"
+                    , "Sleep", "Parse", "Cache hit/miss", "Errors"]
+        rows = []
+        for summary in summaries:
+            latency = summary["latency"]
+            rows.append([summary["name"], cls.formatSeconds(summary["time"]), str(summary["sites"])
+                        , str(summary["requests"]), str(summary["timedout"])
+                        , cls.formatSeconds(latency["p50"]), cls.formatSeconds(latency["p90"])
+                        , cls.formatSeconds(latency["p99"]), cls.formatSeconds(latency["max"])
+                        , str(summary["bytes"]), cls.formatSeconds(summary["sleep"])
+                        , cls.formatSeconds(summary["parse"]), f"{summary["cachehits"]}/{summary["cachemisses"]}"
+                        , ", ".join(f"{error}: {count}" for error, count in summary["errors"].items()) or "-"])
+        widths = [max(len(row[column]) for row in rows + [columns]) for column in range(len(columns))]
+        print("  ".join(column.ljust(width) for column, width in zip(columns, widths)).rstrip())
+        for summary, row in zip(summaries, rows):
+            print("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+            for regex in summary["regexs"]:
+                print(f"    regex {regex["index"]}: {cls.formatSeconds(regex["seconds"])} over {regex["runs"]} runs"
+                        f", {regex["hits"]} hits, {regex["misses"]} misses")
+
+    @classmethod
+    def WriteStatistics(cls, summaries, statsfile):
+        """ Writes the statistics of every site name to a JSON file.
+
+        Argument(s):
+            summaries -- list of dictionaries returned by SiteStatistics.summary.
+            statsfile -- A string representation of a file that will store the statistics.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        print(f"\n[+] Generating statistics output: {statsfile}")
+        with open(statsfile, "w") as f:
+            json.dump({"created": datetime.now().isoformat(timespec = "seconds"), "sites": summaries}, f, indent = 2)
+        print(f"{statsfile} Generated")
+
 class SiteDetailOutput:
     """ SiteDetailOutput provides the capability to output information
             to the screen, a text file, a comma-seperated value file, or an html file.
 
     Public Method(s):
         createOutputInfo
+        (Class Method) createWriters
+        getTimedOutSources
+        writeSites
+        writeSorted
+        (Property) Records
 
     Instance variable(s):
         _listofsites - list storing the list of site results stored.
+        _records - RecordStore flattening _listofsites, built on first use.
     """
 
     def __init__(self,sitelist):
@@ -38,6 +2250,7 @@ class SiteDetailOutput:
         """
         self._listofsites = []
         self._listofsites = sitelist
+        self._records = None
 
     @property
     def ListOfSites(self):
@@ -52,24 +2265,119 @@ class SiteDetailOutput:
             return None
         return self._listofsites
 
-    def createOutputInfo(self,parser):
-        """ Checks parser information calls correct print methods based on parser requirements.
+    @property
+    def Records(self):
+        """ Returns the stored sites sorted by target and flattened into records.
+            The store is built once and shared by every output.
+
+        Return value(s):
+            RecordStore
+        """
+        if self._records is None:
+            self._records = RecordStore(self._listofsites)
+        return self._records
+
+    @classmethod
+    def createWriters(cls, parser, live = None):
+        """ Creates a writer for every output requested in the parser information.
 
         Argument(s):
             parser -- Parser object storing program input parameters used when program was run.
+            live -- True for the writers receiving the sites while the run progresses only,
+                    False for the other writers only or None for every writer. by default = None
 
         Return value(s):
-            Nothing is returned from this Method.
+            list -- of SiteWriter objects, the screen writer first.
         """
-        self.PrintToScreen(parser.hasBotOut)
+        writers = [ScreenWriter(parser.hasBotOut)]
         if parser.CEFOutFile:
-            self.PrintToCEFFile(parser.CEFOutFile)
+            writers.append(CEFFileWriter(parser.CEFOutFile))
+        if parser.SyslogServer:
+            writers.append(CEFSyslogWriter(parser.SyslogServer))
         if parser.TextOutFile:
-            self.PrintToTextFile(parser.TextOutFile)
+            writers.append(TextFileWriter(parser.TextOutFile))
         if parser.HTMLOutFile:
-            self.PrintToHTMLFile(parser.HTMLOutFile)
+            writers.append(HTMLFileWriter(parser.HTMLOutFile))
+        if parser.HTMLReportDir:
+            writers.append(HTMLReportWriter(parser.HTMLReportDir, parser.PageSize))
         if parser.CSVOutFile:
-            self.PrintToCSVFile(parser.CSVOutFile)
+            writers.append(CSVFileWriter(parser.CSVOutFile))
+        if parser.JSONLOutFile:
+            writers.append(JSONLFileWriter(parser.JSONLOutFile, parser.FlushInterval))
+        if parser.DatabaseOutFile:
+            writers.append(SQLiteFileWriter(parser.DatabaseOutFile, parser.FlushInterval))
+        if parser.JournalOutFile:
+            writers.append(JournalFileWriter(parser.JournalOutFile))
+        if live is not None:
+            writers = [writer for writer in writers if writer.LIVE == live]
+        # the result stores keep every result so they can be the baseline of the next comparison
+        if parser.DiffAgainst and any(not writer.BASELINE for writer in writers):
+            writers = [DiffWriter(parser.DiffAgainst, [writer for writer in writers if not writer.BASELINE]
+                                , parser.Verbose)] + [writer for writer in writers if writer.BASELINE]
+        return writers
+
+    def createOutputInfo(self, parser, live = None):
+        """ Checks parser information calls correct print methods based on parser requirements.
+
+        Argument(s):
+            parser -- Parser object storing program input parameters used when program was run.
+            live -- False to skip the writers that already received the sites while the run progressed.
+                    by default = None
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        # the sorted outputs are written together in a single pass over the records,
+        # the journal keeps whole sites in the order they were run
+        writers = self.createWriters(parser, live)
+        self.writeSorted(FanOutWriter([writer for writer in writers if not isinstance(writer, JournalFileWriter)]))
+        for writer in writers:
+            if isinstance(writer, JournalFileWriter):
+                self.writeSites(writer, self.ListOfSites or [])
+
+    def getTimedOutSources(self, site):
+        """ Lists the sources of a site that did not complete within the run's time budget.
+
+        Argument(s):
+            site -- Site object marked as timed out.
+
+        Return value(s):
+            list -- of (friendly name, report string) tuples, one per regex of the site.
+        """
+        return SiteWriter.getTimedOutSources(site)
+
+    def writeSites(self, writer, sites):
+        """ Opens writer, writes every site in the given order and closes it.
+
+        Argument(s):
+            writer -- SiteWriter object receiving the sites.
+            sites -- list of Site objects to write.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        writer.open()
+        try:
+            for site in sites:
+                writer.writeSite(site)
+        finally:
+            writer.close()
+
+    def writeSorted(self, writer):
+        """ Writes the records of the stored sites, sorted by target, with writer.
+
+        Argument(s):
+            writer -- SiteWriter object receiving the records.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        writer.open()
+        try:
+            for records in self.Records.Sites:
+                writer.writeRecords(records)
+        finally:
+            writer.close()
 
     def PrintToScreen(self, printinbotformat):
         """ Calls correct function to ensure site information is printed to the user's standard output correctly.
@@ -80,168 +2388,26 @@ class SiteDetailOutput:
         Return value(s):
             Nothing is returned from this Method.
         """
-        if printinbotformat:
-            self.PrintToScreenBot()
-        else:
-            self.PrintToScreenNormal()
+        self.writeSorted(ScreenWriter(printinbotformat))
 
     def PrintToScreenBot(self):
         """ Formats site information minimized and prints it to the user's standard output.
 
-        Argument(s):
-            No arguments are required.
-
         Return value(s):
             Nothing is returned from this Method.
         """
-        sites = sorted(self.ListOfSites, key=attrgetter("Target"))
-        if sites is None:
-            print("No sites results!")
-            return
-        target = ""
-        for site in sites:
-            if not isinstance(site.RegEx, str):  # this is a multisite
-                for index in range(len(site.RegEx)):  # the regexs will ensure we have the exact number of lookups
-                    site_importantProperty = site.getImportantProperty(index)
-                    if target != site.Target:
-                        print(f"\n**_ Results found for: {site.Target} _**")
-                        target = site.Target
-                        # Check for them ALL to be None or 0 length
-                    sourceurlhasnoreturn = True
-                    for answer in site_importantProperty:
-                        if answer is not None:
-                            if len(answer) > 0:
-                                sourceurlhasnoreturn = False
-
-                    if sourceurlhasnoreturn:
-                        print(f"[+] {site.SourceURL} No results found")
-                        break
-                    else:
-                        if site_importantProperty is None or len(site_importantProperty) == 0:
-                            print(f"No results in the {site.FriendlyName[index]} category")
-                        else:
-                            if site_importantProperty[index] is None or len(site_importantProperty[index]) == 0:
-                                print(f"{site.ReportStringForResult[index]} No results found")
-                            else:
-                                # if it's just a string we don't want it output like a list
-                                if isinstance(site_importantProperty[index], str):
-                                    print(f"{site.ReportStringForResult[index]} {
-                                            str(site_importantProperty)
-                                                .replace("www.", "www[.]")
-                                                .replace("http", "hxxp")
-                                        }")
-                                # must be a list since it failed the isinstance check on string
-                                else:
-                                    laststring = ""
-                                    for siteresult in site_importantProperty[index]:
-                                        if f"{site.ReportStringForResult[index]} {siteresult}" != laststring:
-                                            print(f"{site.ReportStringForResult[index]} {
-                                                    str(siteresult)
-                                                        .replace("www.", "www[.]")
-                                                        .replace("http", "hxxp")
-                                                }")
-                                            laststring = f"{site.ReportStringForResult[index]} {siteresult}"
-            else: # this is a singlesite
-                site_importantProperty = site.getImportantProperty()
-                if target != site.Target:
-                    print(f"\n**_ Results found for: {site.Target} _**")
-                    target = site.Target
-                if site_importantProperty is None or len(site_importantProperty) == 0:
-                    print(f"[+] {site.FriendlyName} No results found")
-                else:
-                    #if it's just a string we don't want it output like a list
-                    if isinstance(site_importantProperty, str):
-                        print(f"{site.ReportStringForResult} {
-                            str(site_importantProperty)
-                                .replace("www.", "www[.]")
-                                .replace("http", "hxxp")
-                            }")
-                    else: # must be a list since it failed the isinstance check on string
-                        laststring = ""
-                        for siteresult in site_importantProperty:
-                            if f"{site.ReportStringForResult} {siteresult}" != laststring:
-                                print(f"{site.ReportStringForResult} {
-                                    str(siteresult)
-                                        .replace("www.", "www[.]")
-                                        .replace("http", "hxxp")
-                                    }")
-                                laststring = f"{site.ReportStringForResult} {siteresult}"
+        self.writeSorted(ScreenWriter(True))
 
     def PrintToScreenNormal(self):
         """ Formats site information correctly and prints it to the user's standard output.
 
-        Argument(s):
-            No arguments are required.
-
         Return value(s):
             Nothing is returned from this Method.
         """
-        sites = sorted(self.ListOfSites, key=attrgetter("Target"))
-        target = ""
-        if sites is not None:
-            for site in sites:
-                if not isinstance(site.RegEx, str):  # this is a multisite
-                    for index in range(len(site.RegEx)):  # the regexs will ensure we have the exact number of lookups
-                        site_importantProperty = site.getImportantProperty(index)
-                        if target != site.Target:
-                            print(f"\n____________________     Results found for: {site.Target}     ____________________")
-                            target = site.Target
-                        if site_importantProperty is None or len(site_importantProperty) == 0:
-                            print(f"No results in the {site.FriendlyName[index]} category")
-                        else:
-                            if site_importantProperty[index] is None or len(site_importantProperty[index]) == 0:
-                                print(f"{site.ReportStringForResult[index]} No results found")
-                            else:
-                                # if it's just a string we don't want it output like a list
-                                if isinstance(site_importantProperty[index], str):
-                                    print(f"{site.ReportStringForResult[index]} {
-                                                str(site_importantProperty)
-                                                    .replace("www.", "www[.]")
-                                                    .replace("http", "hxxp")
-                                            }")
-                                else: # must be a list since it failed the isinstance check on string
-                                    laststring = ""
-                                    for siteresult in site_importantProperty[index]:
-                                        if f"{site.ReportStringForResult[index]} {siteresult}" != laststring:
-                                            print(f"{site.ReportStringForResult[index]} {
-                                                        str(siteresult)
-                                                            .replace("www.", "www[.]")
-                                                            .replace("http", "hxxp")
-                                                    }")
-                                            laststring = f"{site.ReportStringForResult[index]} {siteresult}"
-                else:  # this is a singlesite
-                    site_importantProperty = site.getImportantProperty()
-                    if target != site.Target:
-                        print(f"\n____________________     Results found for: {site.Target}     ____________________")
-                        target = site.Target
-                    if site_importantProperty is None or len(site_importantProperty) == 0:
-                        print(f"No results found in the {site.FriendlyName}")
-                    else:
-                        # if it's just a string we don't want it output like a list
-                        if isinstance(site_importantProperty, str):
-                            print(f"{site.ReportStringForResult} {
-                                        str(site_importantProperty)
-                                            .replace("www.", "www[.]")
-                                            .replace("http", "hxxp")
-                                    }")
-                        # must be a list since it failed the isinstance check on string
-                        else:
-                            laststring = ""
-                            for siteresult in site_importantProperty:
-                                if f"{site.ReportStringForResult} {siteresult}" != laststring:
-                                    print(f"{site.ReportStringForResult} {
-                                            str(siteresult)
-                                                .replace("www.", "www[.]")
-                                                .replace("http", "hxxp")
-                                        }")
-                                    laststring = f"{site.ReportStringForResult} {siteresult}"
+        self.writeSorted(ScreenWriter(False))
 
     def PrintToCEFFile(self, cefoutfile):
         """ Formats site information correctly and prints it to an output file in CEF format.
-            CEF format specification from http://mita-tac.wikispaces.com/file/view/CEF+White+Paper+071709.pdf
-            "Jan 18 11:07:53 host message"
-        where message:
-            "CEF:Version|Device Vendor|Device Product|Device Version|Signature ID|Name|Severity|Extension"
 
         Argument(s):
             cefoutfile -- A string representation of a file that will store the output.
@@ -249,121 +2415,7 @@ class SiteDetailOutput:
         Return value(s):
             Nothing is returned from this Method.
         """
-        sites = sorted(self.ListOfSites, key = attrgetter("Target"))
-        cef_Severity = "2"
-        cef_fields = [
-            " ".join([
-                datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-              , socket.gethostname()
-               ])                               # Prefix
-            , "CEF:Version1.1"                  # CEF Version
-            , "TekDefense"                      # Vendor
-            , "Automater"                       # Product
-            , "2.1"                             # Version
-            , "0"                               # SignatureID
-        ]
-        pattern = r"^\[\+\]\s+"
-        target = ""
-        print(f"\n[+] Generating CEF output: {cefoutfile}")
-        f = open(cefoutfile, "w")
-        csv.register_dialect("escaped", delimiter="|", escapechar="\\", doublequote=False, quoting=csv.QUOTE_NONE)
-        cefRW = csv.writer(f, "escaped")
-        # cefRW.writerow(["Target", "Type", "Source", "Result"])
-        if sites is not None:
-            for site in sites:
-                cef_kwargs = {
-                    "tgt": site.Target
-                    , "typ": site.TargetType
-                }
-                if not isinstance(site.RegEx, str):  # this is a multisite:
-                    for index in range(len(site.RegEx)):  # the regexs will ensure we have the exact number of lookups
-                        site_importantProperty = site.getImportantProperty(index)
-                        if site_importantProperty is None or len(site_importantProperty) == 0:
-                            cef_kwargs["src"] = site.FriendlyName[index]
-                            cef_kwargs["res"] = "No results found"
-                            cefRW.writerow(cef_fields + [f"[{",".join(
-                                            [f"{key}={value}" for key, value in cef_kwargs.items()]
-                                        )}]"
-                                        , 1
-                                        , site.Target
-                                    ]
-                                )
-                        else:
-                            if site_importantProperty[index] is None or len(site_importantProperty[index]) == 0:
-                                cef_kwargs["src"] = site.FriendlyName[index]
-                                cef_kwargs["res"] = "No results found"
-                                cefRW.writerow(cef_fields + [f"[{",".join(
-                                                [f"{key}={value}" for key, value in cef_kwargs.items()]
-                                            )}]"
-                                            , 1
-                                            , site.Target
-                                        ]
-                                    )
-                            else:
-                                # if it's just a string we don't want it to output like a list
-                                if isinstance(site_importantProperty, str):
-                                    cef_kwargs["src"] = site.FriendlyName
-                                    cef_kwargs["res"] = site_importantProperty
-                                    cefRW.writerow(cef_fields + [f"[{",".join(
-                                                    [f"{key}={value}" for key, value in cef_kwargs.items()]
-                                                )}] {re.sub(pattern, "", site.ReportStringForResult[index])}{site_importantProperty}"
-                                                , cef_Severity
-                                                , site.Target
-                                            ]
-                                        )
-
-                                else: # must be a list since it failed the isinstance check on string
-                                    laststring = ""
-                                    for siteresult in site_importantProperty[index]:
-                                        cef_kwargs["src"] = site.FriendlyName[index]
-                                        cef_kwargs["res"] = siteresult
-                                        if f"{site.Target}{site.TargetType}{site.FriendlyName[index]}{siteresult}" != laststring:
-                                            cefRW.writerow(cef_fields + [f"[{",".join(
-                                                            [f"{key}={value}" for key, value in cef_kwargs.items()]
-                                                        )}] {re.sub(pattern, "", site.ReportStringForResult[index])}{siteresult}"
-                                                        , cef_Severity
-                                                        , site.Target
-                                                    ]
-                                                )
-                                            laststring = f"{site.Target}{site.TargetType}{site.FriendlyName[index]}{siteresult}"
-                else: # this is a singlesite
-                    site_importantProperty = site.getImportantProperty()
-                    if site_importantProperty is None or len(site_importantProperty) == 0:
-                        cef_kwargs["src"] = site.FriendlyName
-                        cef_kwargs["res"] = "No results found"
-                        cefRW.writerow(cef_fields + [f"[{",".join(
-                                [f"{key}={value}" for key, value in cef_kwargs.items()])}]"
-                            , "1"
-                            , site.Target
-                        ])
-                    else:
-                        if isinstance(site_importantProperty, str): # if it's just a string we don't want it output like a list
-                            cef_kwargs["src"] = site.FriendlyName
-                            cef_kwargs["res"] = site_importantProperty
-                            cefRW.writerow(cef_fields + [f"[{",".join(
-                                            [f"{key}={value}" for key, value in cef_kwargs.items()]
-                                        )}] {re.sub(pattern, "", site.ReportStringForResult)}{site_importantProperty}"
-                                        , cef_Severity
-                                        , site.Target
-                                    ]
-                                )
-                        else:
-                            laststring = ""
-                            for siteresult in site_importantProperty:
-                                cef_kwargs["src"] = site.FriendlyName
-                                cef_kwargs["res"] = siteresult
-                                if f"{site.Target}{site.TargetType}{site.FriendlyName}{siteresult}" != laststring:
-                                    cefRW.writerow(cef_fields + [f"[{",".join(
-                                                    [f"{key}={value}" for key, value in cef_kwargs.items()]
-                                                )}] {re.sub(pattern, "", site.ReportStringForResult)}{site_importantProperty}"
-                                                , cef_Severity
-                                                , site.Target
-                                            ]
-                                        )
-                                    laststring = f"{site.Target}{site.TargetType}{site.FriendlyName}{siteresult}"
-        f.flush()
-        f.close()
-        print(f"{cefoutfile} Generated")
+        self.writeSorted(CEFFileWriter(cefoutfile))
 
     def PrintToTextFile(self,textoutfile):
         """ Formats site information correctly and prints it to an output file in text format.
@@ -374,52 +2426,7 @@ class SiteDetailOutput:
         Return value(s):
             Nothing is returned from this Method.
         """
-        sites = sorted(self.ListOfSites, key = attrgetter("Target"))
-        target = ""
-        print(f"\n[+] Generating text output: {textoutfile}")
-        f = open(textoutfile, "w")
-        if sites is not None:
-            for site in sites:
-                if not isinstance(site.RegEx, str): # this is a multisite
-                    for index in range(len(site.RegEx)): # the regexs will ensure we have the exact number of lookups
-                        site_importantProperty = site.getImportantProperty(index)
-                        if target != site.Target:
-                            f.write(f"\n____________________     Results found for: {site.Target}     ____________________")
-                            target = site.Target
-                        if site_importantProperty is None or len(site_importantProperty)==0:
-                            f.write(f"\nNo results in the {site.FriendlyName[index]} category")
-                        else:
-                            if site_importantProperty[index] is None or len(site_importantProperty[index]) == 0:
-                                f.write(f"\n{site.ReportStringForResult[index]} No results found")
-                            else:
-                                # if it's just a string we don't want it to output like a list
-                                if isinstance(site_importantProperty[index], str):
-                                    f.write(f"\n{site.ReportStringForResult[index]} {site_importantProperty}")
-                                else: # must be a list since it failed the isinstance check on string
-                                    laststring = ""
-                                    for siteresult in site_importantProperty[index]:
-                                        if f"{site.ReportStringForResult[index]} {siteresult}" != laststring:
-                                            f.write(f"\n{site.ReportStringForResult[index]} {siteresult}")
-                                            laststring = f"{site.ReportStringForResult[index]} {siteresult}"
-                else: # this is a singlesite
-                    site_importantProperty = site.getImportantProperty()
-                    if target != site.Target:
-                        f.write(f"\n____________________     Results found for: {site.Target}     ____________________")
-                        target = site.Target
-                    if site_importantProperty is None or len(site_importantProperty) == 0:
-                        f.write(f"\nNo results found in the {site.FriendlyName}")
-                    else: # if it's just a string we don't want it output like a list
-                        if isinstance(site_importantProperty, str):
-                            f.write(f"\n{site.ReportStringForResult} {site_importantProperty}")
-                        else:
-                            laststring = ""
-                            for siteresult in site_importantProperty:
-                                if f"{site.ReportStringForResult} {siteresult}" != laststring:
-                                    f.write(f"\n{site.ReportStringForResult} {siteresult}")
-                                    laststring = f"{site.ReportStringForResult} {siteresult}"
-        f.flush()
-        f.close()
-        print(f"{textoutfile} Generated")
+        self.writeSorted(TextFileWriter(textoutfile))
 
     def PrintToCSVFile(self,csvoutfile):
         """ Formats site information correctly and prints it to an output file with comma-seperators.
@@ -430,64 +2437,7 @@ class SiteDetailOutput:
         Return value(s):
             Nothing is returned from this Method.
         """
-        sites = sorted(self.ListOfSites, key=attrgetter("Target"))
-        target = ""
-        print(f"\n[+] Generating CSV output: {csvoutfile}")
-        f = open(csvoutfile, "w")
-        csvRW = csv.writer(f, quoting=csv.QUOTE_ALL)
-        csvRW.writerow(["Target", "Type", "Source", "Result"])
-        if sites is not None:
-            for site in sites:
-                data_arr = [ site.Target, site.TargetType, None, None ]
-                if not isinstance(site.RegEx, str): #this is a multisite:
-                    for index in range(len(site.RegEx)): #the regexs will ensure we have the exact number of lookups
-                        site_importantProperty = site.getImportantProperty(index)
-                        if site_importantProperty is None or len(site_importantProperty)==0:
-                            data_arr[2] = site.FriendlyName[index]
-                            data_arr[3] = "No results found"
-                            csvRW.writerow(data_arr)
-                        else:
-                            if site_importantProperty[index] is None or len(site_importantProperty[index])==0:
-                                data_arr[2] = site.FriendlyName[index]
-                                data_arr[3] = "No results found"
-                                csvRW.writerow(data_arr)
-                            else: # if it's just a string we don't want it to output like a list
-                                if isinstance(site_importantProperty, str):
-                                    data_arr[2] = site.FriendlyName
-                                    data_arr[3] = site_importantProperty
-                                    csvRW.writerow(data_arr)
-                                #must be a list since it failed the isinstance check on string
-                                else:
-                                    laststring = ""
-                                    for siteresult in site_importantProperty[index]:
-                                        data_arr[2] = site.FriendlyName[index]
-                                        data_arr[3] = str(siteresult)
-                                        if "".join(data_arr) != laststring:
-                                            csvRW.writerow(data_arr)
-                                            laststring = "".join(data_arr)
-                else: # this is a singlesite
-                    site_importantProperty = site.getImportantProperty()
-                    if site_importantProperty is None or len(site_importantProperty)==0:
-                        data_arr[2] = site.FriendlyName
-                        data_arr[3] = "No results found"
-                        csvRW.writerow(data_arr)
-                    else:
-                        #if it's just a string we don't want it output like a list
-                        if isinstance(site_importantProperty, str):
-                            data_arr[2] = site.FriendlyName
-                            data_arr[3] = site_importantProperty
-                            csvRW.writerow(data_arr)
-                        else:
-                            laststring = ""
-                            for siteresult in site_importantProperty:
-                                data_arr[2] = site.FriendlyName
-                                data_arr[3] = str(siteresult)
-                                if "".join(data_arr) != laststring:
-                                    csvRW.writerow(data_arr)
-                                    laststring = "".join(data_arr)
-        f.flush()
-        f.close()
-        print(f"{csvoutfile} Generated")
+        self.writeSorted(CSVFileWriter(csvoutfile))
 
     def PrintToHTMLFile(self, htmloutfile):
         """ Formats site information correctly and prints it to an output file using HTML markup.
@@ -498,135 +2448,32 @@ class SiteDetailOutput:
         Return value(s):
             Nothing is returned from this Method.
         """
-        sites = sorted(self.ListOfSites, key=attrgetter("Target"))
-        target = ""
-        print(f"\n[+] Generating HTML output: {htmloutfile}")
-        f = open(htmloutfile, "w")
-        f.write(self.getHTMLOpening())
-        if sites is not None:
-            for site in sites:
-                if not isinstance(site.RegEx, str): # this is a multisite:
-                    for index in range(len(site.RegEx)): # the regexs will ensure we have the exact number of lookups
-                        site_importantProperty = site.getImportantProperty(index)
-                        if site_importantProperty is None or len(site_importantProperty) == 0:
-                            f.write(f"<tr><td>{site.Target}</td><td>{site.TargetType}</td><td>{site.FriendlyName[index]}</td><td>No results found</td></tr>\n")
-                        else:
-                            if site_importantProperty[index] is None or len(site_importantProperty[index]) == 0:
-                                f.write(f"<tr><td>{site.Target}</td><td>{site.TargetType}</td><td>{site.FriendlyName[index]}</td><td>No results found</td></tr>\n")
-                            else:
-                                # if it's just a string we don't want it to output like a list
-                                if isinstance(site_importantProperty, str):
-                                    f.write(f"<tr><td>{site.Target}</td><td>{site.TargetType}</td><td>{site.FriendlyName}</td><td>{site_importantProperty}</td></tr>\n")
-                                else:
-                                    for siteresult in site_importantProperty[index]:
-                                        f.write(f"<tr><td>{site.Target}</td><td>{site.TargetType}</td><td>{site.FriendlyName[index]}</td><td>{siteresult}</td></tr>\n")
-                else:  # this is a singlesite
-                    site_importantProperty = site.getImportantProperty()
-                    if site_importantProperty is None or len(site_importantProperty) == 0:
-                        f.write(f"<tr><td>{site.Target}</td><td>{site.TargetType}</td><td>{site.FriendlyName}</td><td>No results found</td></tr>\n")
-                    else:
-                        # if it's just a string we don't want it output like a list
-                        if isinstance(site_importantProperty, str):
-                            f.write(f"<tr><td>{site.Target}</td><td>{site.TargetType}</td><td>{site.FriendlyName}</td><td>{site_importantProperty}</td></tr>\n")
-                        else:
-                            for siteresult in site_importantProperty:
-                                f.write(f"<tr><td>{site.Target}</td><td>{site.TargetType}</td><td>{site.FriendlyName}</td><td>{siteresult}</td></tr>\n")
-        f.write(self.getHTMLClosing())
-        f.flush()
-        f.close()
-        print(f"{htmloutfile} Generated")
+        self.writeSorted(HTMLFileWriter(htmloutfile))
 
-    def getHTMLOpening(self):
-        """ Creates HTML markup to provide correct formatting for initial HTML file requirements.
+    def PrintToJournalFile(self, journaloutfile):
+        """ Writes every site, definition and results included, to a journal file.
+            The journal of each shard of a run can be merged back with the --merge option.
 
         Argument(s):
-            No arguments required.
+            journaloutfile -- A string representation of a file that will store the output.
 
         Return value(s):
-            string -- contains opening HTML markup information for HTML output file.
+            Nothing is returned from this Method.
         """
-        return """<style type="text/css">
-    #table-3 {
-        border: 1px solid #DFDFDF;
-        background-color: #F9F9F9;
-        width: 100%;
-        -moz-border-radius: 3px;
-        -webkit-border-radius: 3px;
-        border-radius: 3px;
-        font-family: Arial,"Bitstream Vera Sans",Helvetica,Verdana,sans-serif;
-        color: #333;
-    }
-    #table-3 td, #table-3 th {
-        border-top-color: white;
-        border-bottom: 1px solid #DFDFDF;
-        color: #555;
-    }
-    #table-3 th {
-        text-shadow: rgba(255, 255, 255, 0.796875) 0px 1px 0px;
-        font-family: Georgia,"Times New Roman","Bitstream Charter",Times,serif;
-        font-weight: normal;
-        padding: 7px 7px 8px;
-        text-align: left;
-        line-height: 1.3em;
-        font-size: 14px;
-    }
-    #table-3 td {
-        font-size: 12px;
-        padding: 4px 7px 2px;
-        vertical-align: top;
-    }res
-    h1 {
-        text-shadow: rgba(255, 255, 255, 0.796875) 0px 1px 0px;
-        font-family: Georgia,"Times New Roman","Bitstream Charter",Times,serif;
-        font-weight: normal;
-        padding: 7px 7px 8px;
-        text-align: Center;
-        line-height: 1.3em;
-        font-size: 40px;
-    }
-    h2 {
-        text-shadow: rgba(255, 255, 255, 0.796875) 0px 1px 0px;
-        font-family: Georgia,"Times New Roman","Bitstream Charter",Times,serif;
-        font-weight: normal;
-        padding: 7px 7px 8px;
-        text-align: left;
-        line-height: 1.3em;
-        font-size: 16px;
-    }
-    h4 {
-        text-shadow: rgba(255, 255, 255, 0.796875) 0px 1px 0px;
-        font-family: Georgia,"Times New Roman","Bitstream Charter",Times,serif;
-        font-weight: normal;
-        padding: 7px 7px 8px;
-        text-align: left;
-        line-height: 1.3em;
-        font-size: 10px;
-    }
-</style>
-<html>
-    <body>
-        <title> Automater Results </title>
-        <h1> Automater Results </h1>
-        <table id="table-3">
-            <tr>
-            <th>Target</th>
-            <th>Type</th>
-            <th>Source</th>
-            <th>Result</th>
-            </tr>
-"""
+        self.writeSites(JournalFileWriter(journaloutfile), self.ListOfSites or [])
+
+    def getHTMLOpening(self):
+        """ Creates HTML markup to provide correct formatting for initial HTML file requirements.
+
+        Return value(s):
+            string -- contains initial HTML markup information for HTML output file.
+        """
+        return HTMLFileWriter.getHTMLOpening()
 
     def getHTMLClosing(self):
         """ Creates HTML markup to provide correct formatting for closing HTML file requirements.
 
-        Argument(s):
-            No arguments required.
-
         Return value(s):
             string -- contains closing HTML markup information for HTML output file.
         """
-        return """        </table>
-        <br><br>
-        <p>Created using Automater.py <a href="https://github.com/madrang/MadDefense-Automater">https://github.com/madrang/MadDefense-Automater</a></p>
-    </body>
-</html>"""
+        return HTMLFileWriter.getHTMLClosing()
@@ -0,0 +1,1311 @@
+"""
+The pipeline.py module runs the retrieval of site content and the extraction of results as two
+separate stages so network I/O and regex parsing can each use their own pool of workers.
+
+Sites are scheduled by the expected latency of their source, fastest first, so that a run
+given a time budget returns as many results as possible before the budget expires.
+
+Class(es):
+    SitePipeline -- Class used to fetch site content on I/O threads and parse it on a process pool.
+    LatencyTracker -- Class used to keep recent request latencies for each site name.
+    HedgePolicy -- Class used to send a second request to sites slower than their usual tail latency.
+    RateController -- Class used to adapt the request rate of each host to what it tolerates, between runs.
+    SiteStatistics -- Class used to aggregate the request, parse and error statistics of each site name.
+    SiteHealth -- Class used to keep, between runs, the success rate, latencies and regex hit rates of each site name.
+
+Function(s):
+    No global exportable functions are defined.
+
+Exception(s):
+    No exceptions exported.
+"""
+import email.utils
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import queue
+import statistics
+import tempfile
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import nullcontext
+
+class LatencyTracker:
+    """ LatencyTracker keeps a window of the most recent request latencies of each site name.
+        A single tracker can be shared by several runs and threads so estimates improve over time.
+
+    Public Method(s):
+        record
+        expected
+        percentile
+        count
+        (Property) Names
+        (Class Method) nearestRank
+
+    Instance variable(s):
+        _window
+        _samples
+        _lock
+    """
+
+    def __init__(self, window = 256):
+        """ Class constructor.
+
+        Argument(s):
+            window -- number of latencies kept for each site name. by default = 256
+        """
+        self._window = window
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    @property
+    def Names(self):
+        """ Returns the site names that have at least one recorded latency.
+
+        Return value(s):
+            list -- of string site names.
+        """
+        with self._lock:
+            return list(self._samples)
+
+    def record(self, name, latency):
+        """ Records the latency of a request made to a site.
+
+        Argument(s):
+            name -- string name of the site.
+            latency -- number of seconds the request took.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen = self._window)
+            samples.append(latency)
+
+    def expected(self, name, default = 0.0):
+        """ Returns the expected latency of a request made to a site, the median of its recent latencies.
+
+        Argument(s):
+            name -- string name of the site.
+            default -- value returned when no latency was recorded for the site. by default = 0.0
+
+        Return value(s):
+            float -- expected number of seconds.
+        """
+        with self._lock:
+            samples = self._samples.get(name)
+            return statistics.median(samples) if samples else default
+
+    def percentile(self, name, percent, default = None):
+        """ Returns the given percentile of the recent latencies of a site, using the nearest rank.
+
+        Argument(s):
+            name -- string name of the site.
+            percent -- percentile to return, between 0 and 100.
+            default -- value returned when no latency was recorded for the site. by default = None
+
+        Return value(s):
+            float -- number of seconds.
+        """
+        with self._lock:
+            samples = self._samples.get(name)
+            if not samples:
+                return default
+            ordered = sorted(samples)
+        return self.nearestRank(ordered, percent)
+
+    @classmethod
+    def nearestRank(cls, ordered, percent):
+        """ Returns the given percentile of a sorted list of values, using the nearest rank.
+
+        Argument(s):
+            ordered -- non empty list of values in ascending order.
+            percent -- percentile to return, between 0 and 100.
+
+        Return value(s):
+            value of ordered at the percentile rank.
+        """
+        return ordered[max(0, min(len(ordered) - 1, int(round(percent / 100.0 * len(ordered) + 0.5)) - 1))]
+
+    def count(self, name):
+        """ Returns the number of recent latencies recorded for a site.
+
+        Argument(s):
+            name -- string name of the site.
+
+        Return value(s):
+            integer
+        """
+        with self._lock:
+            samples = self._samples.get(name)
+            return len(samples) if samples else 0
+
+class HedgePolicy:
+    """ HedgePolicy sends a second, identical request to a site when the first one has not
+            answered by the site's observed tail latency, and keeps whichever answers first.
+        The second request goes through the alternate proxy when one is configured.
+        Hedges are limited to a ratio of the requests made to each site so that a degraded site
+            does not get twice the traffic.
+        Only idempotent GET requests are hedged.
+
+    Public Method(s):
+        hedgeDelay
+        allowHedge
+        race
+        (Property) Hedges
+
+    Instance variable(s):
+        _latencytracker
+        _percent
+        _maxratio
+        _minsamples
+        _alternateproxy
+        _requests
+        _hedges
+        _lock
+        _executor
+    """
+
+    def __init__(self, latencytracker, percent = 95, maxratio = 0.1, minsamples = 20, alternateproxy = None
+                , workers = 16):
+        """ Class constructor.
+
+        Argument(s):
+            latencytracker -- LatencyTracker holding the latencies of each site.
+            percent -- latency percentile after which a request is hedged. by default = 95
+            maxratio -- maximum number of hedges per request made to a site. by default = 0.1
+            minsamples -- number of latencies a site needs before it is hedged. by default = 20
+            alternateproxy -- proxy server address used for the hedged request. by default = None, same proxy
+            workers -- number of threads available to run requests being raced. Each fetcher thread races a request
+                        and its hedge, so it should be twice the number of fetcher threads sharing the policy
+                        for requests not to wait for a thread, which would delay them and inflate the latencies
+                        the hedges are timed on. by default = 16
+        """
+        self._latencytracker = latencytracker
+        self._percent = percent
+        self._maxratio = maxratio
+        self._minsamples = minsamples
+        self._alternateproxy = alternateproxy
+        self._requests = {}
+        self._hedges = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers = workers, thread_name_prefix = "hedge")
+
+    @property
+    def Hedges(self):
+        """ Returns the number of hedged requests sent to each site.
+
+        Return value(s):
+            dict -- of site names to integer counts.
+        """
+        with self._lock:
+            return dict(self._hedges)
+
+    def hedgeDelay(self, name):
+        """ Returns how long a request to a site may run before it is hedged.
+
+        Argument(s):
+            name -- string name of the site.
+
+        Return value(s):
+            float -- number of seconds.
+            None -- if the site does not have enough latency history to be hedged.
+        """
+        if self._latencytracker.count(name) < self._minsamples:
+            return None
+        return self._latencytracker.percentile(name, self._percent)
+
+    def allowHedge(self, name):
+        """ Checks, and reserves, the hedge budget of a site.
+
+        Argument(s):
+            name -- string name of the site.
+
+        Return value(s):
+            Boolean -- True if a hedge may be sent.
+        """
+        with self._lock:
+            if self._hedges.get(name, 0) + 1 > self._maxratio * self._requests.get(name, 0):
+                return False
+            self._hedges[name] = self._hedges.get(name, 0) + 1
+            return True
+
+    def race(self, name, request, proxy, hedge = None):
+        """ Runs request and hedges it if it has not answered by the site's tail latency.
+            Returns the first successful response; raises the error of the last request to fail.
+
+        Argument(s):
+            name -- string name of the site.
+            request -- callable taking a requests proxies dictionary and returning a response.
+                        It should raise for unsuccessful responses so that they do not win the race.
+            proxy -- requests proxies dictionary used by the first request.
+            hedge -- callable like request sending the hedged request, for instance once the host
+                        allows another request. by default = None, request
+
+        Return value(s):
+            requests.Response
+        """
+        with self._lock:
+            self._requests[name] = self._requests.get(name, 0) + 1
+        delay = self.hedgeDelay(name)
+        if delay is None:
+            return request(proxy)
+        running = {self._executor.submit(request, proxy)}
+        done = wait(running, timeout = delay)[0]
+        if not done and self.allowHedge(name):
+            alternate = proxy
+            if self._alternateproxy:
+                alternate = {"https": self._alternateproxy, "http": self._alternateproxy}
+            running.add(self._executor.submit(hedge if hedge is not None else request, alternate))
+        while True:
+            done, running = wait(running, return_when = FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+            if not running:
+                return done.pop().result()
+
+class RateController:
+    """ RateController paces the requests made to each host with an additive increase, multiplicative decrease
+            (AIMD) controller: every healthy response raises the rate of the host by a fixed step, while
+            a 429 or 503 response, a timeout or a latency spike divides it.
+        Requests to a host are spaced by the inverse of its rate, whatever the number of fetcher threads.
+            A Retry-After header holds back the next requests to the host for the time it asks.
+        The rate is cut at most once per request interval or usual latency, so a burst of requests
+            throttled together only counts as one congestion signal.
+        Limits can be set for the host of a site in sites.xml, as entries of a ratelimit element keyed
+            initial, min and max (requests per second), increase (requests per second) and decrease (factor).
+        The learned rates and latencies are saved to a JSON file and resumed by the next run.
+
+    Public Method(s):
+        configure
+        acquire
+        record
+        rate
+        save
+        (Class Method) load
+        (Class Method) parseRetryAfter
+        (Property) FileName
+        (Property) Hosts
+
+    Instance variable(s):
+        _filename
+        _hosts
+        _initialrate
+        _configured
+        _lock
+    """
+    INCREASE = 0.1
+    DECREASE = 0.5
+    MINRATE = 0.05
+    MAXRATE = 10.0
+    SPIKE = 3.0
+    MINSAMPLES = 5
+    THROTTLED = (429, 503)
+
+    def __init__(self, filename, hosts = None, initialrate = 1.0):
+        """ Class constructor.
+
+        Argument(s):
+            filename -- string name of the JSON file the learned rates are saved to.
+            hosts -- dictionary of the learned rate and latency of each host, as loaded from the file.
+                        by default = None
+            initialrate -- requests per second allowed to a host without learned rate or configured limits.
+                            by default = 1.0
+        """
+        self._filename = filename
+        self._hosts = {}
+        self._initialrate = min(self.MAXRATE, max(self.MINRATE, initialrate))
+        self._configured = set()
+        self._lock = threading.Lock()
+        for host, learned in (hosts or {}).items():
+            state = self.getHost(host)
+            state["rate"] = min(state["max"], max(state["min"], learned.get("rate", state["rate"])))
+            state["latency"] = learned.get("latency")
+            state["samples"] = self.MINSAMPLES if state["latency"] is not None else 0
+            state["learned"] = True
+
+    @classmethod
+    def load(cls, filename, initialrate = 1.0):
+        """ Loads the rates learned by a previous run, starting afresh if the file is missing or unreadable.
+
+        Argument(s):
+            filename -- string name of the JSON file.
+            initialrate -- requests per second allowed to a host without learned rate or configured limits.
+                            by default = 1.0
+
+        Return value(s):
+            RateController
+        """
+        hosts = {}
+        if os.path.exists(filename):
+            try:
+                with open(filename) as f:
+                    hosts = json.load(f)["hosts"]
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[!] Cannot read the learned request rates in {filename}, starting afresh: {e}")
+        return cls(filename, hosts, initialrate)
+
+    @property
+    def FileName(self):
+        """ Returns the name of the JSON file the learned rates are saved to.
+
+        Return value(s):
+            string
+        """
+        return self._filename
+
+    @property
+    def Hosts(self):
+        """ Returns the hosts whose rate is controlled.
+
+        Return value(s):
+            list -- of string host names.
+        """
+        with self._lock:
+            return list(self._hosts)
+
+    @classmethod
+    def parseRetryAfter(cls, value):
+        """ Returns the seconds to wait asked by a Retry-After header.
+
+        Argument(s):
+            value -- string value of the header, in seconds or as an HTTP date, or None.
+
+        Return value(s):
+            float -- number of seconds.
+            None -- if there is no header or it cannot be read.
+        """
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+    def getHost(self, host):
+        """ Returns the state of a host, creating it if needed. The lock must be held.
+
+        Argument(s):
+            host -- string host name, with its port if any.
+
+        Return value(s):
+            dict
+        """
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = {"rate": self._initialrate, "min": self.MINRATE, "max": self.MAXRATE
+                                        , "increase": self.INCREASE, "decrease": self.DECREASE, "next": 0.0
+                                        , "calm": 0.0, "latency": None, "samples": 0, "learned": False}
+        return state
+
+    def configure(self, host, limits):
+        """ Applies the limits set in the xml config for a host. The first site giving limits for a host sets them.
+
+        Argument(s):
+            host -- string host name, with its port if any.
+            limits -- dictionary of strings keyed initial, min, max, increase or decrease, or None.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if not limits:
+            return
+        with self._lock:
+            if host in self._configured:
+                return
+            self._configured.add(host)
+            state = self.getHost(host)
+            values = {}
+            for key in ("initial", "min", "max", "increase", "decrease"):
+                if not limits.get(key):
+                    continue
+                try:
+                    value = float(limits[key])
+                except ValueError:
+                    print(f"[!] Ignoring the {key} rate limit {limits[key]} of {host}, it is not a number.")
+                    continue
+                # a rate of 0 never lets a request through and a decrease of 1 or more is not a cut
+                if key == "decrease" and not 0 < value < 1:
+                    print(f"[!] Ignoring the decrease rate limit {limits[key]} of {host}, it must be between 0 and 1.")
+                elif not 0 < value < math.inf:
+                    print(f"[!] Ignoring the {key} rate limit {limits[key]} of {host}, it must be a positive number.")
+                else:
+                    values[key] = value
+            if values.get("min", state["min"]) > values.get("max", state["max"]):
+                print(f"[!] Ignoring the min and max rate limits of {host}, min is above max.")
+                values.pop("min", None)
+                values.pop("max", None)
+            for key in ("min", "max", "increase", "decrease"):
+                state[key] = values.get(key, state[key])
+            if "initial" in values and not state["learned"]:
+                state["rate"] = values["initial"]
+            state["rate"] = min(state["max"], max(state["min"], state["rate"]))
+
+    def acquire(self, host):
+        """ Waits for the next request slot of a host and reserves it.
+
+        Argument(s):
+            host -- string host name, with its port if any.
+
+        Return value(s):
+            float -- number of seconds waited.
+        """
+        with self._lock:
+            state = self.getHost(host)
+            now = time.monotonic()
+            start = max(now, state["next"])
+            state["next"] = start + 1.0 / state["rate"]
+        wait = start - now
+        if wait > 0:
+            time.sleep(wait)
+        return max(0.0, wait)
+
+    def record(self, host, status = None, latency = None, timedout = False, retryafter = None):
+        """ Adapts the rate of a host to the outcome of a request.
+            Requests that failed without a response, other than timeouts, leave the rate unchanged.
+
+        Argument(s):
+            host -- string host name, with its port if any.
+            status -- integer HTTP status of the response, None if there was no response. by default = None
+            latency -- number of seconds the request took. by default = None
+            timedout -- true if the request timed out. by default = False
+            retryafter -- string Retry-After header of the response. by default = None
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        wait = self.parseRetryAfter(retryafter)
+        with self._lock:
+            state = self.getHost(host)
+            now = time.monotonic()
+            spike = (status is not None and latency is not None and state["samples"] >= self.MINSAMPLES
+                        and latency > self.SPIKE * state["latency"])
+            if timedout or status in self.THROTTLED or spike:
+                if now >= state["calm"]:
+                    state["rate"] = max(state["min"], state["rate"] * state["decrease"])
+                    state["calm"] = now + max(1.0 / state["rate"], state["latency"] or 0.0)
+                if wait is not None:
+                    state["next"] = max(state["next"], now + wait)
+            elif status is not None:
+                state["rate"] = min(state["max"], state["rate"] + state["increase"])
+            if status is not None and status not in self.THROTTLED and latency is not None:
+                state["latency"] = latency if state["latency"] is None else state["latency"] * 0.8 + latency * 0.2
+                state["samples"] += 1
+
+    def rate(self, host):
+        """ Returns the requests per second currently allowed to a host.
+
+        Argument(s):
+            host -- string host name, with its port if any.
+
+        Return value(s):
+            float
+        """
+        with self._lock:
+            return self.getHost(host)["rate"]
+
+    def save(self):
+        """ Writes the learned rate and latency of every host to the JSON file, replacing it atomically.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        with self._lock:
+            hosts = {host: {"rate": state["rate"], "latency": state["latency"]} for host, state in self._hosts.items()}
+        directory = os.path.dirname(os.path.abspath(self._filename))
+        descriptor, temporary = tempfile.mkstemp(dir = directory, prefix = ".rates")
+        try:
+            with os.fdopen(descriptor, "w") as f:
+                json.dump({"hosts": hosts, "updated": time.time()}, f, indent = 1, sort_keys = True)
+            os.replace(temporary, self._filename)
+        except OSError:
+            os.unlink(temporary)
+            raise
+
+class SiteStatistics:
+    """ SiteStatistics aggregates, for each site name, the requests made, their latencies and sizes,
+            the time slept on the retrieve delay, the time each regex took, the cache hits and misses
+            and the errors met by type.
+        Sites are recorded once fetched, from the fetcher threads, and once completed or timed out.
+
+    Public Method(s):
+        recordFetch
+        recordCompleted
+        summary
+        (Property) Names
+
+    Instance variable(s):
+        _stats
+        _lock
+    """
+
+    def __init__(self):
+        """ Class constructor.
+        """
+        self._stats = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def Names(self):
+        """ Returns the site names that were recorded.
+
+        Return value(s):
+            list -- of string site names.
+        """
+        with self._lock:
+            return list(self._stats)
+
+    def getStats(self, name):
+        """ Returns the statistics of a site name, creating them if needed. The lock must be held.
+
+        Argument(s):
+            name -- string name of the site.
+
+        Return value(s):
+            dict
+        """
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = {"sites": 0, "requests": 0, "timedout": 0, "latencies": [], "bytes": 0
+                                        , "sleep": 0.0, "cachehits": 0, "cachemisses": 0, "errors": {}
+                                        , "regexs": []}
+        return stats
+
+    def recordFetch(self, site, error = None):
+        """ Records the request made to retrieve the content of a site.
+
+        Argument(s):
+            site -- Site object whose content was retrieved.
+            error -- string name of an exception raised while retrieving the content. by default = None,
+                        the ErrorType of the site
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        error = error or site.ErrorType
+        with self._lock:
+            stats = self.getStats(site.Name)
+            if site.CacheStatus == "hit":
+                stats["cachehits"] += 1
+            else:
+                if site.CacheStatus == "miss":
+                    stats["cachemisses"] += 1
+                stats["requests"] += 1
+                stats["sleep"] += site.SleepTime
+            if site.Latency is not None:
+                stats["latencies"].append(site.Latency)
+            if site.BytesReceived:
+                stats["bytes"] += site.BytesReceived
+            if error:
+                stats["errors"][error] = stats["errors"].get(error, 0) + 1
+
+    def recordCompleted(self, site):
+        """ Records the parsing of a completed or timed out site.
+
+        Argument(s):
+            site -- Site object completed or timed out.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        results = site.Results
+        if isinstance(site.RegEx, str):
+            results = [results]
+        with self._lock:
+            stats = self.getStats(site.Name)
+            stats["sites"] += 1
+            if site.TimedOut:
+                stats["timedout"] += 1
+                return
+            for index, seconds in enumerate(site.ParseTimes or []):
+                if index == len(stats["regexs"]):
+                    stats["regexs"].append({"seconds": 0.0, "runs": 0, "hits": 0, "misses": 0})
+                regex = stats["regexs"][index]
+                regex["seconds"] += seconds
+                regex["runs"] += 1
+                if results and index < len(results) and results[index]:
+                    regex["hits"] += 1
+                else:
+                    regex["misses"] += 1
+
+    def summary(self):
+        """ Returns the aggregated statistics of every site name, the ones taking the most time first.
+
+        Return value(s):
+            list -- of dictionaries holding the statistics of one site name each.
+        """
+        summaries = []
+        with self._lock:
+            for name, stats in self._stats.items():
+                ordered = sorted(stats["latencies"])
+                latency = {"mean": None, "p50": None, "p90": None, "p99": None, "max": None}
+                if ordered:
+                    latency = {"mean": sum(ordered) / len(ordered)
+                                , "p50": LatencyTracker.nearestRank(ordered, 50)
+                                , "p90": LatencyTracker.nearestRank(ordered, 90)
+                                , "p99": LatencyTracker.nearestRank(ordered, 99)
+                                , "max": ordered[-1]}
+                regexs = [dict(regex, index = index) for index, regex in enumerate(stats["regexs"])]
+                parse = sum(regex["seconds"] for regex in regexs)
+                summaries.append({
+                    "name": name
+                    , "time": sum(ordered) + stats["sleep"] + parse
+                    , "sites": stats["sites"]
+                    , "requests": stats["requests"]
+                    , "timedout": stats["timedout"]
+                    , "latency": latency
+                    , "bytes": stats["bytes"]
+                    , "sleep": stats["sleep"]
+                    , "parse": parse
+                    , "cachehits": stats["cachehits"]
+                    , "cachemisses": stats["cachemisses"]
+                    , "errors": dict(stats["errors"])
+                    , "regexs": regexs
+                })
+        summaries.sort(key = lambda summary: summary["time"], reverse = True)
+        return summaries
+
+class SiteHealth:
+    """ SiteHealth keeps, for each site name and from one run to the next, the outcome of its recent requests,
+            their latencies and how often each of its regexs matched, by target type.
+        Counts decay with every new observation, so they describe the recent behaviour of a source and a
+            source that recovers is trusted again after a few runs.
+        Hit rates, the ratio of the lookups of a target type in which at least one regex matched, rank
+            the sources when a request budget per target does not allow running all of them.
+        A source whose requests mostly fail, time out or return empty bodies is chronically failing:
+            it is skipped when every source is run, unless skipping is disabled, except for a single probe
+            lookup per run once PROBEINTERVAL seconds have passed since it was last observed, whose outcome
+            lets the counts of a recovered source climb back. A source that fails
+            sometimes, or whose regexs never match a target type, is scheduled after the healthy ones.
+        It is a pipeline recorder, fed from the fetcher threads and the thread running the pipeline.
+
+    Public Method(s):
+        recordFetch
+        recordCompleted
+        successRate
+        regexHitRate
+        hitRate
+        skips
+        probe
+        priority
+        expectedLatency
+        save
+        (Class Method) load
+        (Property) FileName
+        (Property) SkipFailing
+
+    Instance variable(s):
+        _filename
+        _sites
+        _skipfailing
+        _probed
+        _lock
+    """
+    DECAY = 0.95
+    MINOBSERVATIONS = 8
+    SKIPRATE = 0.2
+    DEGRADEDRATE = 0.8
+    LATENCIES = 64
+    PROBEINTERVAL = 600
+
+    def __init__(self, filename, sites = None, skipfailing = True):
+        """ Class constructor.
+
+        Argument(s):
+            filename -- string name of the JSON file the health is saved to.
+            sites -- dictionary of the health of each site name, as loaded from the file. by default = None
+            skipfailing -- false to run the chronically failing sources anyway. by default = True
+        """
+        self._filename = filename
+        self._sites = sites if sites is not None else {}
+        self._skipfailing = skipfailing
+        self._probed = set()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, filename, skipfailing = True):
+        """ Loads the health saved by a previous run, starting afresh if the file is missing or unreadable.
+
+        Argument(s):
+            filename -- string name of the JSON file.
+            skipfailing -- false to run the chronically failing sources anyway. by default = True
+
+        Return value(s):
+            SiteHealth
+        """
+        sites = {}
+        if os.path.exists(filename):
+            try:
+                with open(filename) as f:
+                    sites = json.load(f)["sites"]
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[!] Cannot read the site health in {filename}, starting afresh: {e}")
+        return cls(filename, sites, skipfailing)
+
+    @property
+    def FileName(self):
+        """ Returns the name of the JSON file the health is saved to.
+
+        Return value(s):
+            string
+        """
+        return self._filename
+
+    @property
+    def SkipFailing(self):
+        """ Checks if the chronically failing sources are skipped.
+
+        Return value(s):
+            bool
+        """
+        return self._skipfailing
+
+    def getHealth(self, name):
+        """ Returns the health of a site name, creating it if needed. The lock must be held.
+
+        Argument(s):
+            name -- string name of the site.
+
+        Return value(s):
+            dict
+        """
+        health = self._sites.get(name)
+        if health is None:
+            health = self._sites[name] = {"observations": 0.0, "successes": 0.0, "errors": 0.0, "empty": 0.0
+                                        , "timeouts": 0.0, "latencies": [], "regexs": {}, "targettypes": {}
+                                        , "updated": None}
+        return health
+
+    def observe(self, health, outcome):
+        """ Decays the outcome counts of a site and counts a new outcome. The lock must be held.
+
+        Argument(s):
+            health -- dictionary returned by getHealth.
+            outcome -- string "successes", "errors", "empty" or "timeouts".
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        for key in ("observations", "successes", "errors", "empty", "timeouts"):
+            health[key] *= self.DECAY
+        health["observations"] += 1
+        health[outcome] += 1
+        health["updated"] = time.time()
+
+    def recordFetch(self, site, error = None):
+        """ Records the outcome and latency of the request made to retrieve the content of a site.
+            Content served by the ResponseCache says nothing about the source and is not recorded.
+
+        Argument(s):
+            site -- Site object whose content was retrieved.
+            error -- string name of an exception raised while retrieving the content. by default = None,
+                        the ErrorType of the site
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if site.CacheStatus == "hit":
+            return
+        error = error or site.ErrorType
+        with self._lock:
+            health = self.getHealth(site.Name)
+            if error:
+                self.observe(health, "errors")
+            elif not site.BytesReceived:
+                self.observe(health, "empty")
+            else:
+                self.observe(health, "successes")
+            if site.Latency is not None:
+                health["latencies"] = (health["latencies"] + [site.Latency])[-self.LATENCIES:]
+
+    def recordCompleted(self, site):
+        """ Records whether each regex of a completed site matched, or the timeout of a site never fetched.
+            A completed site without content counts as a lookup that returned no results.
+
+        Argument(s):
+            site -- Site object completed or timed out.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if site.TimedOut:
+            if site.Latency is None and site.ErrorType is None:
+                with self._lock:
+                    self.observe(self.getHealth(site.Name), "timeouts")
+            return
+        if site.CacheStatus == "hit":
+            return
+        results = site.Results
+        if isinstance(site.RegEx, str):
+            results = [results]
+        with self._lock:
+            health = self.getHealth(site.Name)
+            regexs = health["regexs"].setdefault(site.TargetType, [])
+            hit = False
+            for index in range(len(site.ParseTimes or [])):
+                if index == len(regexs):
+                    regexs.append({"runs": 0.0, "hits": 0.0})
+                regex = regexs[index]
+                matched = bool(results and index < len(results) and results[index])
+                hit = hit or matched
+                regex["runs"] = regex["runs"] * self.DECAY + 1
+                regex["hits"] = regex["hits"] * self.DECAY + (1 if matched else 0)
+            lookups = health.setdefault("targettypes", {}).setdefault(site.TargetType, {"runs": 0.0, "hits": 0.0})
+            lookups["runs"] = lookups["runs"] * self.DECAY + 1
+            lookups["hits"] = lookups["hits"] * self.DECAY + (1 if hit else 0)
+
+    def successRate(self, name):
+        """ Returns the recent ratio of the requests to a site that returned content.
+
+        Argument(s):
+            name -- string name of the site.
+
+        Return value(s):
+            float -- between 0 and 1.
+            None -- if the site has too few recent observations to tell.
+        """
+        with self._lock:
+            health = self._sites.get(name)
+            if health is None or health["observations"] < self.MINOBSERVATIONS:
+                return None
+            return health["successes"] / health["observations"]
+
+    def regexHitRate(self, name, targettype):
+        """ Returns the recent ratio of the parsed contents of a site in which its most successful regex matched,
+                for a target type.
+
+        Argument(s):
+            name -- string name of the site.
+            targettype -- string target type, ip, md5 or hostname.
+
+        Return value(s):
+            float -- between 0 and 1, the best rate of the regexs of the site.
+            None -- if the site has too few recent observations for the target type to tell.
+        """
+        with self._lock:
+            health = self._sites.get(name)
+            regexs = health["regexs"].get(targettype) if health is not None else None
+            if not regexs or max(regex["runs"] for regex in regexs) < self.MINOBSERVATIONS:
+                return None
+            return max(regex["hits"] / regex["runs"] for regex in regexs if regex["runs"])
+
+    def hitRate(self, name, targettype):
+        """ Returns the expected ratio of the lookups of a target type for which a site returns results.
+            The rate is smoothed towards one half, so a site seldom or never run for the target type
+                is ranked above the sites known to rarely return anything and gets measured.
+
+        Argument(s):
+            name -- string name of the site.
+            targettype -- string target type, ip, md5 or hostname.
+
+        Return value(s):
+            float -- between 0 and 1.
+        """
+        with self._lock:
+            health = self._sites.get(name)
+            lookups = health.get("targettypes", {}).get(targettype) if health is not None else None
+            if lookups is None:
+                return 0.5
+            return (lookups["hits"] + 1) / (lookups["runs"] + 2)
+
+    def skips(self, name):
+        """ Checks if a site is chronically failing and should be skipped when every source is run.
+
+        Argument(s):
+            name -- string name of the site.
+
+        Return value(s):
+            bool
+        """
+        rate = self.successRate(name)
+        return self._skipfailing and rate is not None and rate < self.SKIPRATE
+
+    def probe(self, name):
+        """ Reserves the probe of a chronically failing site: a single lookup per run, once PROBEINTERVAL seconds
+                have passed since the site was last observed, so its counts can recover with the source.
+
+        Argument(s):
+            name -- string name of the site.
+
+        Return value(s):
+            bool -- True if a lookup of the site may run as its probe.
+        """
+        with self._lock:
+            if name in self._probed:
+                return False
+            health = self._sites.get(name)
+            updated = health.get("updated") if health is not None else None
+            if updated is not None and time.time() - updated < self.PROBEINTERVAL:
+                return False
+            self._probed.add(name)
+            return True
+
+    def priority(self, name, targettype = None):
+        """ Returns the scheduling priority of a site, sites with a lower priority being fetched first.
+
+        Argument(s):
+            name -- string name of the site.
+            targettype -- string target type the site is run for. by default = None
+
+        Return value(s):
+            integer -- 0 for a healthy site, 1 for a site failing sometimes or never matching the target type.
+        """
+        rate = self.successRate(name)
+        if rate is not None and rate < self.DEGRADEDRATE:
+            return 1
+        return 1 if targettype is not None and self.regexHitRate(name, targettype) == 0 else 0
+
+    def expectedLatency(self, name, default = 0.0):
+        """ Returns the median latency of the recent requests made to a site, in this run or the previous ones.
+
+        Argument(s):
+            name -- string name of the site.
+            default -- value returned when no latency was recorded for the site. by default = 0.0
+
+        Return value(s):
+            float -- expected number of seconds.
+        """
+        with self._lock:
+            health = self._sites.get(name)
+            return statistics.median(health["latencies"]) if health and health["latencies"] else default
+
+    def save(self):
+        """ Writes the health of every site name to the JSON file, replacing it atomically.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        with self._lock:
+            data = json.dumps({"sites": self._sites}, indent = 1, sort_keys = True)
+        directory = os.path.dirname(os.path.abspath(self._filename))
+        descriptor, temporary = tempfile.mkstemp(dir = directory, prefix = ".health")
+        try:
+            with os.fdopen(descriptor, "w") as f:
+                f.write(data)
+            os.replace(temporary, self._filename)
+        except OSError:
+            os.unlink(temporary)
+            raise
+
+class SitePipeline:
+    """ SitePipeline fetches the content of each site on a pool of I/O threads and hands the retrieved
+            bodies to a pool of parse processes that run the site regexs over them.
+        Bounded queues between the stages provide backpressure: fetchers block once the parse stage
+            falls behind and the parse stage never holds more than a fixed number of bodies in flight.
+        Site objects are only modified by the thread calling run.
+
+    Public Method(s):
+        run
+        nextSite
+        applyParsed
+        profiled
+        (Class Method) createParsePool
+        (Property) IOWorkers
+        (Property) ParseWorkers
+        (Property) LatencyTracker
+
+    Instance variable(s):
+        _ioworkers
+        _parseworkers
+        _queuesize
+        _latencytracker
+        _hedgepolicy
+        _lookahead
+        _recorders
+        _metrics
+        _profiler
+        _health
+        _parsepool
+    """
+
+    def __init__(self, ioworkers = 1, parseworkers = 0, queuesize = None, latencytracker = None, hedgepolicy = None
+                , lookahead = None, statistics = None, metrics = None, profiler = None, health = None
+                , parsepool = None):
+        """ Class constructor.
+
+        Argument(s):
+            ioworkers -- number of threads retrieving site content. by default = 1
+            parseworkers -- number of processes running the regexs. 0 parses in the calling thread. by default = 0
+            queuesize -- number of retrieved bodies waiting for the parse stage before fetchers block.
+                            by default = twice the number of I/O workers
+            latencytracker -- LatencyTracker used to schedule sites and record their latencies.
+                                by default = a tracker private to this pipeline
+            hedgepolicy -- HedgePolicy used to hedge requests to slow sites. by default = None, no hedging
+            lookahead -- number of sites pulled ahead of the fetchers to choose the fastest source from.
+                            by default = 16 per I/O worker, at least 256
+            statistics -- SiteStatistics recording every fetched and completed site. by default = None
+            metrics -- SiteMetrics recording every fetched and completed site and the queue depths.
+                        by default = None
+            profiler -- PhaseProfiler sampling the fetch and parse of the sites. by default = None
+            health -- SiteHealth recording every fetched and completed site, and scheduling the failing
+                        sources last. by default = None
+            parsepool -- process pool returned by createParsePool, shared between runs and left running once
+                            they complete. by default = None, each run with parse workers starts its own pool
+        """
+        self._ioworkers = max(1, ioworkers)
+        self._parseworkers = max(0, parseworkers)
+        self._queuesize = queuesize if queuesize else self._ioworkers * 2
+        self._latencytracker = latencytracker if latencytracker is not None else LatencyTracker()
+        self._hedgepolicy = hedgepolicy
+        self._lookahead = lookahead if lookahead else max(256, self._ioworkers * 16)
+        self._recorders = [recorder for recorder in (statistics, metrics, health) if recorder is not None]
+        self._metrics = metrics
+        self._profiler = profiler
+        self._health = health
+        self._parsepool = parsepool
+
+    @classmethod
+    def createParsePool(cls, parseworkers):
+        """ Starts a pool of processes running the regexs, which can be shared by the pipelines of several runs.
+
+        Argument(s):
+            parseworkers -- number of processes.
+
+        Return value(s):
+            concurrent.futures.ProcessPoolExecutor
+        """
+        # spawn, as forking a process that already runs fetcher threads is unsafe
+        return ProcessPoolExecutor(parseworkers, mp_context = multiprocessing.get_context("spawn"))
+
+    @property
+    def IOWorkers(self):
+        """ Returns the number of threads retrieving site content.
+
+        Return value(s):
+            integer
+        """
+        return self._ioworkers
+
+    @property
+    def ParseWorkers(self):
+        """ Returns the number of processes running the regexs, 0 when parsing in process.
+
+        Return value(s):
+            integer
+        """
+        return self._parseworkers
+
+    @property
+    def LatencyTracker(self):
+        """ Returns the LatencyTracker used to schedule sites.
+
+        Return value(s):
+            LatencyTracker
+        """
+        return self._latencytracker
+
+    def profiled(self, name):
+        """ Returns a context manager profiling its with block as one entry of a per site phase.
+
+        Argument(s):
+            name -- string name of the phase.
+
+        Return value(s):
+            context manager -- doing nothing if no profiler is set.
+        """
+        return nullcontext() if self._profiler is None else self._profiler.phase(name, sampled = True)
+
+    def nextSite(self, pending):
+        """ Removes and returns the next site to fetch: the first pending site of the
+                site name with the lowest expected latency. Names without latency history go first
+                so they are measured early.
+            With a SiteHealth, failing sources go after the healthy ones and names without latency
+                history in this run are expected to answer as fast as they did in previous runs.
+
+        Argument(s):
+            pending -- OrderedDict of site names to deques of sites not yet fetched.
+
+        Return value(s):
+            Site -- next site to fetch.
+            None -- if no site is pending.
+        """
+        if not pending:
+            return None
+        if self._health is None:
+            name = min(pending, key = self._latencytracker.expected)
+        else:
+            name = min(pending, key = lambda name: (self._health.priority(name, pending[name][0].TargetType)
+                            , self._latencytracker.expected(name, self._health.expectedLatency(name))))
+        sites = pending[name]
+        site = sites.popleft()
+        if not sites:
+            del pending[name]
+        return site
+
+    def run(self, sites, deadline = None, callback = None):
+        """ Fetches and parses every site, storing the results in each Site object.
+            Sites are pulled from the iterable as fetchers need them, so it may be a generator;
+                only a bounded window of sites is held at any time.
+            Returns once all sites have completed or, when a deadline is given, once it has passed.
+            Sites that did not complete before the deadline are marked as timed out; requests
+                still running are abandoned and their content discarded.
+
+        Argument(s):
+            sites -- iterable of Site objects to run.
+            deadline -- time.monotonic() value after which the run stops. by default = None, no time budget
+            callback -- callable receiving each Site once it is completed or timed out,
+                        always from the thread calling run. by default = None
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        source = iter(sites)
+        pending = OrderedDict()
+        outstanding = {}
+        lock = threading.Lock()
+        bodies = queue.Queue(maxsize = self._queuesize)
+        stopped = threading.Event()
+        window = 0
+        exhausted = False
+
+        def remaining():
+            return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+        def take():
+            nonlocal window, exhausted
+            with lock:
+                while not exhausted and window < self._lookahead:
+                    site = next(source, None)
+                    if site is None:
+                        exhausted = True
+                        break
+                    pending.setdefault(site.Name, deque()).append(site)
+                    outstanding[id(site)] = site
+                    window += 1
+                site = self.nextSite(pending)
+                if site is not None:
+                    window -= 1
+                return site
+
+        def complete(site):
+            with lock:
+                outstanding.pop(id(site), None)
+            for recorder in self._recorders:
+                recorder.recordCompleted(site)
+            if callback is not None:
+                callback(site)
+
+        def deliver(item):
+            while not stopped.is_set():
+                try:
+                    bodies.put(item, timeout = 0.1)
+                    return
+                except queue.Full:
+                    pass
+
+        def fetch():
+            while not stopped.is_set():
+                site = take()
+                if site is None:
+                    break
+                timeout = None
+                if deadline is not None:
+                    timeout = remaining() - site.WebRetrieveDelay
+                    if timeout <= 0:
+                        continue
+                error = None
+                try:
+                    with self.profiled("fetch"):
+                        content = site.fetchContent(timeout, self._hedgepolicy)
+                except Exception as e:
+                    site.postErrorMessage(f"[-] Cannot retrieve {site.FullURL}: {e}")
+                    content = None
+                    error = type(e).__name__
+                if site.Latency is not None:
+                    self._latencytracker.record(site.Name, site.Latency)
+                for recorder in self._recorders:
+                    recorder.recordFetch(site, error)
+                deliver((site, content))
+            deliver(None)
+
+        fetchers = [threading.Thread(target = fetch, daemon = True) for x in range(self._ioworkers)]
+        parsepool = None
+        if self._parseworkers > 0:
+            parsepool = self._parsepool if self._parsepool is not None else self.createParsePool(self._parseworkers)
+        inflight = {}
+        try:
+            for fetcher in fetchers:
+                fetcher.start()
+            running = len(fetchers)
+            while running:
+                if len(inflight) >= self._parseworkers * 2 > 0:
+                    done = wait(inflight, timeout = remaining(), return_when = FIRST_COMPLETED)[0]
+                    if not done:
+                        break
+                    self.applyParsed(inflight, done, complete)
+                try:
+                    item = bodies.get(timeout = remaining())
+                except queue.Empty:
+                    break
+                if item is None:
+                    running -= 1
+                    continue
+                if self._metrics is not None:
+                    self._metrics.setQueueDepth("fetch", window)
+                    self._metrics.setQueueDepth("parse", bodies.qsize())
+                    self._metrics.setQueueDepth("parsing", len(inflight))
+                site, content = item
+                if not content:
+                    complete(site)
+                elif parsepool is None:
+                    with self.profiled("parse"):
+                        site.parseResults(content)
+                    complete(site)
+                else:
+                    inflight[parsepool.submit(site.extractAllTimed, site.RegEx, content)] = (site, content)
+                    self.applyParsed(inflight, [future for future in inflight if future.done()], complete)
+            if inflight:
+                self.applyParsed(inflight, wait(inflight, timeout = remaining())[0], complete)
+        finally:
+            stopped.set()
+            if parsepool is self._parsepool:
+                # the shared pool keeps serving the next runs, only the jobs of this run are dropped
+                for future in inflight:
+                    future.cancel()
+            elif parsepool is not None:
+                parsepool.shutdown(wait = not inflight, cancel_futures = True)
+        with lock:
+            # fetchers no longer pull from the source once it is marked exhausted
+            exhausted = True
+            leftovers = list(outstanding.values())
+            outstanding.clear()
+        for site in itertools.chain(leftovers, source):
+            site.markTimedOut()
+            for recorder in self._recorders:
+                recorder.recordCompleted(site)
+            if callback is not None:
+                callback(site)
+
+    def applyParsed(self, inflight, futures, complete):
+        """ Stores the results of completed parse jobs in their sites.
+            A site whose parse job failed is parsed again in the calling thread.
+
+        Argument(s):
+            inflight -- dictionary of parse futures to (site, content) tuples.
+            futures -- iterable of completed futures of inflight to apply.
+            complete -- callable receiving every site whose results were stored.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        for future in futures:
+            site, content = inflight.pop(future)
+            with self.profiled("parse"):
+                try:
+                    found, parsetimes = future.result()
+                except Exception:
+                    site.parseResults(content)
+                else:
+                    site.applyResults(found, parsetimes)
+            complete(site)
@@ -0,0 +1,228 @@
+"""
+The profiling.py module profiles the phases of an Automater run separately: loading the xml
+configuration, expanding the targets, fetching the sites, parsing their content and writing
+the outputs.
+
+Each phase gets its own cProfile statistics, and the phases that run once get the top memory
+allocations made while they ran. Phases entered once per site can be sampled so that only a
+ratio of the sites pays the profiling overhead.
+
+Class(es):
+    PhaseProfiler -- Collects cProfile statistics and memory allocations of each phase of a run.
+
+Function(s):
+    No global exportable functions are defined.
+
+Exception(s):
+    No exceptions exported.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import resource
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+class PhaseProfiler:
+    """ PhaseProfiler collects cProfile statistics of each phase of a run and the memory allocated by
+            the phases entered once.
+        A single cProfile profiler can be enabled at a time in a process, so phase entries take turns:
+            an entry starting while another one is profiled runs unprofiled and is counted as skipped.
+            Since Python 3.12 an enabled profiler records the calls of every thread, so the fetch and
+            parse profiles also hold the work other threads did meanwhile.
+        When every site is profiled, memory is measured with tracemalloc and the top allocations of
+            each phase are kept; when only a ratio of the sites is sampled, tracemalloc is not started
+            and the growth of the peak resident set size is reported instead, so the profiler can stay
+            enabled at low overhead.
+        Statistics are written to the profile directory when the profiler is closed:
+            one <phase>.prof file per phase, readable with pstats or snakeviz, and a summary.txt file.
+
+    Public Method(s):
+        phase
+        wrap
+        close
+        (Property) Directory
+        (Property) SampleRate
+
+    Instance variable(s):
+        _directory
+        _samplerate
+        _top
+        _tracemalloc
+        _profiles
+        _entries
+        _skipped
+        _memory
+        _lock
+        _slot
+        _random
+    """
+    PHASES = ("config", "targets", "sites", "fetch", "parse", "output")
+
+    def __init__(self, directory, samplerate = 1.0, top = 25):
+        """ Class constructor.
+
+        Argument(s):
+            directory -- string directory the statistics are written to.
+            samplerate -- ratio of the per site phase entries profiled, between 0 and 1. by default = 1.0
+            top -- number of allocations kept for each phase. by default = 25
+        """
+        self._directory = directory
+        self._samplerate = samplerate
+        self._top = top
+        self._tracemalloc = samplerate >= 1.0
+        self._profiles = {}
+        self._entries = {}
+        self._skipped = {}
+        self._memory = {}
+        self._lock = threading.Lock()
+        self._slot = threading.Lock()
+        self._random = random.Random()
+        if self._tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @property
+    def Directory(self):
+        """ Returns the directory the statistics are written to.
+
+        Return value(s):
+            string
+        """
+        return self._directory
+
+    @property
+    def SampleRate(self):
+        """ Returns the ratio of the per site phase entries that are profiled.
+
+        Return value(s):
+            float
+        """
+        return self._samplerate
+
+    @classmethod
+    def peakRSS(cls):
+        """ Returns the peak resident set size of the process.
+
+        Return value(s):
+            integer -- bytes.
+        """
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+    @contextmanager
+    def phase(self, name, sampled = False, cpu = True):
+        """ Profiles the code run in the with block as part of a phase.
+
+        Argument(s):
+            name -- string name of the phase.
+            sampled -- true for the phases entered once per site, only profiled for the sample rate.
+                        Their memory is not measured as they overlap each other. by default = False
+            cpu -- false to only measure the memory of the phase. by default = True
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if sampled and (self._samplerate <= 0 or self._random.random() >= self._samplerate):
+            yield
+            return
+        profile = None
+        if cpu:
+            if self._slot.acquire(blocking = False):
+                profile = cProfile.Profile()
+            elif sampled:
+                with self._lock:
+                    self._skipped[name] = self._skipped.get(name, 0) + 1
+                yield
+                return
+        before = None
+        if not sampled:
+            before = tracemalloc.take_snapshot() if self._tracemalloc else self.peakRSS()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._slot.release()
+            after = None
+            if before is not None:
+                after = tracemalloc.take_snapshot() if self._tracemalloc else self.peakRSS()
+            with self._lock:
+                self._entries[name] = self._entries.get(name, 0) + 1
+                if profile is not None:
+                    self._profiles.setdefault(name, []).append(profile)
+                if after is not None:
+                    self._memory.setdefault(name, []).append((before, after))
+
+    def wrap(self, name, function, sampled = False):
+        """ Returns a callable running function as part of a phase.
+
+        Argument(s):
+            name -- string name of the phase.
+            function -- callable to wrap.
+            sampled -- true if the calls are only profiled for the sample rate. by default = False
+
+        Return value(s):
+            callable
+        """
+        def wrapped(*args, **kwargs):
+            with self.phase(name, sampled):
+                return function(*args, **kwargs)
+        return wrapped
+
+    def memoryReport(self, name):
+        """ Formats the memory allocated during a phase.
+
+        Argument(s):
+            name -- string name of the phase.
+
+        Return value(s):
+            list -- of string lines.
+        """
+        lines = []
+        for before, after in self._memory.get(name, []):
+            if not self._tracemalloc:
+                lines.append(f"    peak RSS grew by {(after - before) / (1 << 20):.1f}MB")
+                continue
+            # leaves out the allocations made by the profiler itself
+            filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__)]
+            differences = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+            lines.append(f"    {sum(difference.size_diff for difference in differences) / 1024:.1f}KB allocated")
+            lines.extend(f"    {difference}" for difference in differences[:self._top] if difference.size_diff > 0)
+        return lines
+
+    def close(self):
+        """ Stops tracing memory and writes the statistics of every phase to the profile directory.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if self._tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        os.makedirs(self._directory, exist_ok = True)
+        summary = [f"Sample rate: {self._samplerate}"]
+        seen = self._entries.keys() | self._skipped.keys()
+        names = [name for name in self.PHASES if name in seen]
+        names += sorted(seen.difference(self.PHASES))
+        for name in names:
+            summary.append(f"\n[{name}] {self._entries.get(name, 0)} profiled entries, {self._skipped.get(name, 0)} skipped")
+            profiles = self._profiles.get(name)
+            if profiles:
+                text = io.StringIO()
+                stats = pstats.Stats(profiles[0], stream = text)
+                for profile in profiles[1:]:
+                    stats.add(profile)
+                stats.dump_stats(os.path.join(self._directory, f"{name}.prof"))
+                summary.append(f"    {stats.total_tt:.3f}s CPU in profiled calls, see {name}.prof")
+                stats.sort_stats("cumulative").print_stats(15)
+                summary.extend(f"    {line}" for line in text.getvalue().strip().splitlines())
+            summary.extend(self.memoryReport(name))
+        filename = os.path.join(self._directory, "summary.txt")
+        with open(filename, "w") as f:
+            f.write("\n".join(summary) + "\n")
+        print(f"\n[+] Profiles written to {self._directory}, see {filename}")
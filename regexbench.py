@@ -0,0 +1,422 @@
+#!/usr/bin/python3
+"""
+The regexbench.py module measures the cost of the regex entries of every site of the xml configuration
+files over a corpus of recorded response bodies, and flags the patterns whose cost grows faster than
+the size of their input.
+
+Usage:
+    python regexbench.py [--corpus DIRECTORY] [--sites NAME ...] [--record TARGET ...]
+                         [--growth 1.5] [--timeout 10] [--json FILE]
+
+    --record fetches the sites matching each target and adds the response bodies to the corpus.
+    Every regex runs through Site.findAll, the extraction Site.parseContent uses, over the content
+        as the sites see it, once %TARGET% is replaced by the target the body was recorded for.
+    The cost on the corpus is reported in nanoseconds per KB with the number of matches.
+    Each regex also runs over padded and adversarial inputs of growing size.
+    Both measures run in a separate process that is stopped after --timeout seconds; a regex is flagged
+        when it does not complete on a recorded body or an input, or when its cost grows with an exponent
+        above --growth. The command exits with 1 if a regex is flagged.
+
+Class(es):
+    RegexBenchmark -- Runs the regexs of each site over the corpus and over inputs of growing size.
+
+Function(s):
+    main -- Provides the instantiation point for the regex benchmark.
+
+Exception(s):
+    No exceptions exported.
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+import requests
+
+from benchmark import ResponseCorpus
+from siteinfo import Site, SiteFacade
+from inputs import SitesFile
+
+__SETTINGSXML__ = "settings.xml"
+__SITESXML__ = "sites.xml"
+
+class RegexBenchmark:
+    """ RegexBenchmark runs the regexs of each site of the xml configuration files over a ResponseCorpus
+            and over padded and adversarial inputs of growing size.
+
+    Public Method(s):
+        siteElements
+        buildSite
+        record
+        run
+        report
+        (Class Method) timeRegex
+        (Class Method) adversarialInputs
+        (Class Method) measureGrowth
+        (Class Method) growthWorker
+
+    Instance variable(s):
+        _configdirectory
+        _corpus
+        _growth
+        _timeout
+        _results
+    """
+    DEFAULTTARGETS = {"ip": "8.8.8.8", "hostname": "example.com", "md5": "d41d8cd98f00b204e9800998ecf8427e"}
+    SIZES = (1024, 2048, 4096, 8192, 16384, 32768)
+    MINSECONDS = 0.005                  # shortest measurement, small inputs are repeated to reach it
+
+    def __init__(self, configdirectory, corpus, growth = 1.5, timeout = 10.0):
+        """ Class constructor.
+
+        Argument(s):
+            configdirectory -- string directory holding the sites.xml and settings.xml files.
+            corpus -- ResponseCorpus holding the recorded bodies.
+            growth -- exponent of the cost growth above which a regex is flagged. by default = 1.5
+            timeout -- seconds the corpus and the growth measurements of a regex may each take. by default = 10.0
+        """
+        self._configdirectory = configdirectory
+        self._corpus = corpus
+        self._growth = growth
+        self._timeout = timeout
+        self._results = []
+
+    def siteElements(self, names = None):
+        """ Returns the site elements of the xml configuration files.
+
+        Argument(s):
+            names -- list of site names to keep. by default = None, every site
+
+        Return value(s):
+            list -- of site elements.
+        """
+        elements = []
+        for filename in (__SETTINGSXML__, __SITESXML__):
+            tree = SitesFile.getXMLTree(os.path.join(self._configdirectory, filename))
+            if tree is None:
+                continue
+            elements.extend(element for element in tree.iter(tag = "site")
+                            if not names or element.get("name") in names)
+        return elements
+
+    def buildSite(self, siteelement, target = None):
+        """ Builds the Site of a site element for a target, or for a default target of its first site type.
+
+        Argument(s):
+            siteelement -- site element of the xml configuration files.
+            target -- string target. by default = None
+
+        Return value(s):
+            Site
+        """
+        if target is None:
+            target = self.DEFAULTTARGETS.get(siteelement.find("sitetype").find("entry").text, "example.com")
+        targettype = SiteFacade(False).identifyTargetType(target)
+        return Site.buildSiteFromXML(siteelement, 0, None, targettype, target, "Automater/regexbench", False, False)
+
+    def record(self, targets, names = None):
+        """ Fetches the sites matching each target and adds the response bodies to the corpus.
+
+        Argument(s):
+            targets -- list of string targets.
+            names -- list of site names to record. by default = None, every site
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        facade = SiteFacade(False)
+        for siteelement in self.siteElements(names):
+            for target in targets:
+                matches, targettype, target = facade.getSiteInfoIfSiteTypesMatch("allsources", target, siteelement)
+                if not matches:
+                    continue
+                site = Site.buildSiteFromXML(siteelement, 0, None, targettype, target, "Automater/regexbench"
+                                            , False, False)
+                headers, params, proxy = site.getHeaderParamProxyInfo()
+                try:
+                    if site.Method == "POST":
+                        resp = requests.post(site.FullURL, data = site.PostData, headers = headers, params = params
+                                            , proxies = proxy, verify = False, timeout = 30)
+                    else:
+                        resp = requests.get(site.FullURL, headers = headers, params = params, proxies = proxy
+                                            , verify = False, timeout = 30)
+                    resp.raise_for_status()
+                except Exception as e:
+                    print(f"[-] {site.Name} {target}: {e}")
+                    continue
+                print(f"[+] {site.Name} {target}: {self._corpus.add(site.Name, resp.content, target)}")
+
+    @classmethod
+    def timeRegex(cls, regex, content):
+        """ Times Site.findAll of a regex over content, repeating it until the measurement is long enough.
+
+        Argument(s):
+            regex -- string regex with the %TARGET% keyword already replaced.
+            content -- string content the regex runs over.
+
+        Return value(s):
+            tuple -- (seconds per run, number of matches)
+        """
+        found = Site.findAll(regex, content)
+        runs = 0
+        started = time.perf_counter()
+        elapsed = 0.0
+        while elapsed < cls.MINSECONDS:
+            Site.findAll(regex, content)
+            runs += 1
+            elapsed = time.perf_counter() - started
+        return elapsed / runs, len(found) if found is not None else None
+
+    @classmethod
+    def adversarialInputs(cls, regex, content):
+        """ Returns the repeating units of the inputs a regex is grown over: the sample content itself,
+                single characters many regexs backtrack over, and the literals of the regex,
+                which make greedy groups between them backtrack.
+
+        Argument(s):
+            regex -- string regex.
+            content -- string sample content of the site.
+
+        Return value(s):
+            dict -- of input names to string units.
+        """
+        units = {"padded": content or " ", "spaces": " ", "letters": "a", "digits": "0", "markup": "<a>"}
+        literals = re.findall(r"[A-Za-z0-9:=\"'<>/_&;-]{2,}", re.sub(r"\\[dDwWsSbB]|\\", " ", regex))
+        if literals:
+            units["literals"] = " ".join(literals) + " "
+        return units
+
+    @classmethod
+    def corpusWorker(cls, regexs, contents, results):
+        """ Times each regex over its recorded content and sends the measures through results.
+            Runs in a separate process so a regex that does not complete on a recorded body can be stopped.
+
+        Argument(s):
+            regexs -- list of string regexs, one per content.
+            contents -- list of string contents.
+            results -- sending multiprocessing connection receiving an (index, None) tuple before each content
+                        is measured and an (index, (seconds per run, number of matches)) tuple once it is.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        for index, (regex, content) in enumerate(zip(regexs, contents)):
+            results.send((index, None))
+            results.send((index, cls.timeRegex(regex, content)))
+        results.send(None)
+
+    @classmethod
+    def growthWorker(cls, regex, units, sizes, results):
+        """ Measures a regex over every input unit repeated to each size and sends the times through results.
+            Runs in a separate process so a regex that does not complete can be stopped.
+
+        Argument(s):
+            regex -- string regex.
+            units -- dict returned by adversarialInputs.
+            sizes -- tuple of input sizes in characters.
+            results -- sending multiprocessing connection receiving an (input name, None) tuple before each input
+                        is measured and an (input name, [(size, seconds), ...]) tuple once it is.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        for name, unit in units.items():
+            results.send((name, None))
+            times = []
+            for size in sizes:
+                content = (unit * (size // len(unit) + 1))[:size]
+                times.append((size, cls.timeRegex(regex, content)[0]))
+            results.send((name, times))
+        results.send(None)
+
+    @classmethod
+    def measureInWorker(cls, worker, args, timeout):
+        """ Runs a measurement worker in a separate process, stopping it once the timeout has passed.
+            The worker sends the name of each input before measuring it, so the input it does not complete on is known.
+
+        Argument(s):
+            worker -- class method taking args and a sending connection, like corpusWorker or growthWorker.
+            args -- tuple of the arguments of worker, the connection excluded.
+            timeout -- seconds the measurement may take.
+
+        Return value(s):
+            tuple -- (dict of input names to measures, true if every input was measured,
+                        name of the input that did not complete or None if unknown)
+        """
+        # a pipe sends from the worker thread itself, unlike a queue whose feeder thread
+        # cannot run while the worker is stuck in a regex
+        context = multiprocessing.get_context("spawn")
+        results, sender = context.Pipe(duplex = False)
+        process = context.Process(target = worker, args = args + (sender,), daemon = True)
+        process.start()
+        sender.close()
+        measures = {}
+        measuring = None
+        completed = False
+        deadline = time.monotonic() + timeout
+        try:
+            while True:
+                try:
+                    if not results.poll(max(0.0, deadline - time.monotonic())):
+                        break
+                    item = results.recv()
+                except EOFError:
+                    break
+                if item is None:
+                    completed = True
+                    break
+                name, measure = item
+                if measure is None:
+                    measuring = name
+                    continue
+                measuring = None
+                measures[name] = measure
+        finally:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+            results.close()
+        return measures, completed, measuring
+
+    @classmethod
+    def measureGrowth(cls, regex, units, sizes = SIZES, timeout = 10.0):
+        """ Measures how the cost of a regex grows with the size of each input.
+
+        Argument(s):
+            regex -- string regex.
+            units -- dict returned by adversarialInputs.
+            sizes -- tuple of input sizes in characters. by default = RegexBenchmark.SIZES
+            timeout -- seconds the measurement may take before the regex is reported as not completing.
+                        by default = 10.0
+
+        Return value(s):
+            dict -- of input names to growth exponents, None for the input that did not complete in time.
+        """
+        measures, completed, measuring = cls.measureInWorker(cls.growthWorker, (regex, units, sizes), timeout)
+        growth = {}
+        for name, times in measures.items():
+            (smallest, first), (largest, last) = times[0], times[-1]
+            growth[name] = math.log(max(last, 1e-9) / max(first, 1e-9)) / math.log(largest / smallest)
+        if not completed:
+            # a worker that died between two inputs stopped before the first one left
+            stopped = measuring if measuring is not None else next((name for name in units if name not in growth), None)
+            if stopped is not None:
+                growth[stopped] = None
+        return growth
+
+    def run(self, names = None):
+        """ Measures every regex of every site.
+
+        Argument(s):
+            names -- list of site names to measure. by default = None, every site
+
+        Return value(s):
+            list -- of dictionaries holding the measures of each regex.
+        """
+        for siteelement in self.siteElements(names):
+            name = siteelement.get("name")
+            entries = self._corpus.entries(name)
+            if not entries:
+                entries = [(None, None)]
+            sites = [(self.buildSite(siteelement, target), body) for target, body in entries]
+            regexs = sites[0][0].RegEx
+            for index in range(1 if isinstance(regexs, str) else len(regexs)):
+                # the sites run their regexs over the text of the response bytes
+                bodies = [(site, str(body)) for site, body in sites if body is not None]
+                contents = [content for _, content in bodies]
+                timings, completed, measuring = {}, True, None
+                if bodies:
+                    timings, completed, measuring = self.measureInWorker(self.corpusWorker
+                        , ([site.RegEx if isinstance(site.RegEx, str) else site.RegEx[index] for site, _ in bodies]
+                            , contents), self._timeout)
+                seconds = sum(runseconds for runseconds, _ in timings.values())
+                size = sum(len(contents[body]) for body in timings)
+                matches = sum(found or 0 for _, found in timings.values())
+                # bodies are measured in order, the first one without a measure is the one not completed
+                stopped = measuring if measuring is not None else len(timings)
+                hungtarget = bodies[stopped][0].Target if not completed and stopped < len(bodies) else None
+                regex = sites[0][0].RegEx if isinstance(regexs, str) else sites[0][0].RegEx[index]
+                growth = self.measureGrowth(regex, self.adversarialInputs(regex, contents[0] if contents else "")
+                                            , timeout = self._timeout)
+                worst = (None, None)
+                if growth:
+                    worst = max(growth.items(), key = lambda item: math.inf if item[1] is None else item[1])
+                self._results.append({
+                    "site": name
+                    , "index": index
+                    , "regex": regex
+                    , "bodies": len(bodies)
+                    , "kb": size / 1024
+                    , "nsperkb": seconds * 1e9 / (size / 1024) if size else None
+                    , "matches": matches
+                    , "corpuscompleted": completed
+                    , "hungtarget": hungtarget
+                    , "growth": growth
+                    , "worstinput": worst[0]
+                    , "flagged": not completed or worst[1] is None or worst[1] > self._growth
+                })
+        return self._results
+
+    def report(self):
+        """ Prints the measures of every regex, flagged regexs marked with [!].
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        print("\n____________________     Regex Benchmark     ____________________")
+        for result in self._results:
+            nsperkb = "no corpus" if result["nsperkb"] is None else f"{result["nsperkb"]:.0f} ns/KB"
+            if not result["corpuscompleted"]:
+                nsperkb = f"did not complete on the corpus body of {result["hungtarget"] or "an unknown target"}"
+            growth = result["growth"].get(result["worstinput"])
+            growth = "did not complete" if growth is None else f"growth {growth:.2f}"
+            marker = "[!]" if result["flagged"] else "[+]"
+            worstinput = f"{result["worstinput"]} input" if result["worstinput"] else "any input"
+            print(f"{marker} {result["site"]} regex {result["index"]}: {nsperkb}, {result["matches"]} matches"
+                  f" in {result["bodies"]} bodies, {growth} on {worstinput}")
+            if result["flagged"]:
+                print(f"    {result["regex"]}")
+
+def main():
+    """ Serves as the instantiation point to start the regex benchmark.
+
+    Argument(s):
+        No arguments are required.
+
+    Return value(s):
+        Nothing is returned from this Method.
+    """
+    parser = argparse.ArgumentParser(description = "Micro-benchmark of the regexs of the xml configuration files.")
+    parser.add_argument("--config", default = os.path.dirname(os.path.abspath(__file__))
+        , help = "Directory holding the sites.xml and settings.xml files. Default is the program directory.")
+    parser.add_argument("--corpus", default = "corpus"
+        , help = "Directory of recorded response bodies. Default is corpus.")
+    parser.add_argument("--sites", nargs = "+"
+        , help = "Names of the sites to measure. Default is every site.")
+    parser.add_argument("--record", nargs = "+", metavar = "TARGET"
+        , help = "Fetches the sites matching each target and adds the responses to the corpus first.")
+    parser.add_argument("--growth", type = float, default = 1.5
+        , help = "Cost growth exponent above which a regex is flagged. Default is 1.5.")
+    parser.add_argument("--timeout", type = float, default = 10.0
+        , help = "Seconds the corpus and the growth measurements of a regex may each take. Default is 10.")
+    parser.add_argument("--json"
+        , help = "Writes the measures to a JSON file.")
+    options = parser.parse_args()
+
+    benchmark = RegexBenchmark(options.config, ResponseCorpus(options.corpus), options.growth, options.timeout)
+    if options.record:
+        benchmark.record(options.record, options.sites)
+    results = benchmark.run(options.sites)
+    benchmark.report()
+    if options.json:
+        with open(options.json, "w") as f:
+            json.dump(results, f, indent = 2)
+    if any(result["flagged"] for result in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
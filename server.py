@@ -0,0 +1,386 @@
+"""
+The server.py module provides a local HTTP/JSON enrichment service on top of Automater.GetResults
+so callers can submit batches of targets without implementing their own threading.
+
+Endpoints:
+    GET  /health -- Returns the server status and the number of requests in flight.
+    GET  /metrics -- Returns the metrics of the server in the Prometheus text format.
+    POST /enrich -- Takes a JSON document {"targets": [...], "sources": [...], "stream": false, "deadline": null}
+                    and returns {"results": [[target, type, source, result], ...]}.
+                    When "stream" is true (or ?stream=1 is used) the rows are sent as
+                    newline delimited JSON using a chunked response as soon as each target completes.
+                    "deadline" is an optional time budget in seconds for each target.
+
+Upstream sites are the ones defined in the xml configuration files, so the server can be exercised
+against local stand-in upstreams by pointing a settings.xml site entry at them.
+
+Class(es):
+    EnrichmentServer -- Threaded HTTP server running enrichment jobs on a bounded worker pool.
+    EnrichmentRequestHandler -- Request handler implementing the JSON API.
+    ClientLimiter -- Tracks the number of requests each client has in flight.
+
+Function(s):
+    No global exportable functions are defined.
+
+Exception(s):
+    No exceptions exported.
+"""
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, as_completed, FIRST_COMPLETED
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from operator import itemgetter
+from urllib.parse import urlsplit, parse_qs
+
+from metrics import MetricsRequestHandler
+from siteinfo import ResponseCache
+from utilities import Utils
+
+class ClientLimiter:
+    """ ClientLimiter counts the requests in flight for each client address and refuses
+            new ones once a client reaches its limit.
+
+    Public Method(s):
+        acquire
+        release
+        (Property) InFlight
+
+    Instance variable(s):
+        _limit
+        _clients
+        _lock
+    """
+
+    def __init__(self, limit):
+        """ Class constructor.
+
+        Argument(s):
+            limit -- maximum number of concurrent requests allowed for a single client.
+        """
+        self._limit = limit
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    @property
+    def InFlight(self):
+        """ Returns the total number of requests in flight for all clients.
+
+        Return value(s):
+            integer
+        """
+        with self._lock:
+            return sum(self._clients.values())
+
+    def acquire(self, client):
+        """ Reserves a request slot for client.
+
+        Argument(s):
+            client -- string identifying the client, usually its address.
+
+        Return value(s):
+            Boolean -- True if the slot was reserved, False if the client is at its limit.
+        """
+        with self._lock:
+            count = self._clients.get(client, 0)
+            if count >= self._limit:
+                return False
+            self._clients[client] = count + 1
+            return True
+
+    def release(self, client):
+        """ Frees a request slot previously reserved for client.
+
+        Argument(s):
+            client -- string identifying the client, usually its address.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        with self._lock:
+            count = self._clients.get(client, 0) - 1
+            if count <= 0:
+                self._clients.pop(client, None)
+            else:
+                self._clients[client] = count
+
+class EnrichmentServer(ThreadingHTTPServer):
+    """ EnrichmentServer accepts batch enrichment requests and runs each target through
+            Automater.GetResults on a bounded pool of worker threads.
+        Every job shares the same ResponseCache so overlapping batches only reach upstream sites once.
+
+    Public Method(s):
+        (Class Method) serve
+        enrich
+        runTarget
+        collectMetrics
+        server_close
+        (Property) Automater
+        (Property) Clients
+        (Property) Jobs
+
+    Instance variable(s):
+        _automater
+        _pool
+        _slots
+        _jobs
+        _jobslock
+        _clients
+        _verbose
+    """
+    daemon_threads = True
+
+    def __init__(self, address, automater, workers = 8, clientlimit = 2, backlog = None, verbose = False):
+        """ Class constructor.
+
+        Argument(s):
+            address -- (host, port) tuple the server will listen on.
+            automater -- Automater object holding the delay, proxy and user-agent used for lookups.
+            workers -- number of worker threads running lookups. by default = 8
+            clientlimit -- maximum number of concurrent requests per client. by default = 2
+            backlog -- number of jobs that may wait for a worker before submitters block.
+                        by default = 4 times the number of workers
+            verbose -- boolean representing whether text will be printed to stdout
+        """
+        super().__init__(address, EnrichmentRequestHandler)
+        if automater.ResponseCache is None:
+            automater.ResponseCache = ResponseCache()
+        self._automater = automater
+        self._pool = ThreadPoolExecutor(max_workers = workers, thread_name_prefix = "automater")
+        self._slots = threading.BoundedSemaphore(workers + (workers * 4 if backlog is None else backlog))
+        self._jobs = 0
+        self._jobslock = threading.Lock()
+        self._clients = ClientLimiter(clientlimit)
+        self._verbose = verbose
+        if automater.Metrics is not None:
+            automater.Metrics.watchResponseCache(automater.ResponseCache)
+            if automater.HedgePolicy is not None:
+                automater.Metrics.watchHedgePolicy(automater.HedgePolicy)
+            automater.Metrics.Registry.addCollector(self.collectMetrics)
+
+    @classmethod
+    def serve(cls, hostport, automater, workers = 8, clientlimit = 2, verbose = False):
+        """ Starts an EnrichmentServer and serves requests until interrupted.
+
+        Argument(s):
+            hostport -- string in the [host:]port format. Host defaults to 127.0.0.1.
+            automater -- Automater object holding the lookup settings.
+            workers -- number of worker threads running lookups. by default = 8
+            clientlimit -- maximum number of concurrent requests per client. by default = 2
+            verbose -- boolean representing whether text will be printed to stdout
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        host, _, port = hostport.rpartition(":")
+        server = cls((host or "127.0.0.1", int(port)), automater, workers, clientlimit, verbose = verbose)
+        print(f"[+] Enrichment server listening on http://{server.server_address[0]}:{server.server_address[1]}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+    @property
+    def Automater(self):
+        """ Returns the Automater object used to run lookups.
+
+        Return value(s):
+            Automater
+        """
+        return self._automater
+
+    @property
+    def Clients(self):
+        """ Returns the ClientLimiter tracking requests per client.
+
+        Return value(s):
+            ClientLimiter
+        """
+        return self._clients
+
+    @property
+    def Jobs(self):
+        """ Returns the number of targets submitted to the worker pool that have not completed.
+
+        Return value(s):
+            integer
+        """
+        return self._jobs
+
+    def collectMetrics(self):
+        """ Refreshes the server queue depths of the metrics before they are rendered.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._automater.Metrics.setQueueDepth("server_jobs", self._jobs)
+        self._automater.Metrics.setQueueDepth("server_requests", self._clients.InFlight)
+
+    def server_close(self):
+        """ Stops accepting requests and waits for running jobs to complete.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        super().server_close()
+        self._pool.shutdown(wait = True)
+
+    def runTarget(self, target, sourcelist, deadline):
+        """ Runs a single target on a worker thread and frees its pool slot once done.
+
+        Argument(s):
+            target -- string representing the target to investigate.
+            sourcelist -- list of site names to use or None for every source.
+            deadline -- time budget in seconds or None to use the Automater setting.
+
+        Return value(s):
+            list -- of [target, type, source, result] lists.
+        """
+        try:
+            return self._automater.GetResults([target], sourcelist, deadline)
+        except Exception as e:
+            Utils.PrintStandardOutput(f"[-] Enrichment of {target} failed: {e}", verbose = self._verbose)
+            return []
+        finally:
+            with self._jobslock:
+                self._jobs -= 1
+            self._slots.release()
+
+    def enrich(self, targets, sourcelist = None, deadline = None):
+        """ Submits every target to the worker pool, blocking while the pool backlog is full.
+            Yields the rows of each target as soon as it completes, in completion order.
+
+        Argument(s):
+            targets -- list of strings representing targets to investigate.
+            sourcelist -- list of site names to use or None for every source. by default = None
+            deadline -- time budget in seconds for each target. by default = None, the Automater setting
+
+        Return value(s):
+            Iterator of lists of [target, type, source, result] lists, one list per target.
+        """
+        pending = set()
+        for target in targets:
+            while not self._slots.acquire(timeout = 0 if pending else None):
+                done, pending = wait(pending, return_when = FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            with self._jobslock:
+                self._jobs += 1
+            pending.add(self._pool.submit(self.runTarget, target, sourcelist, deadline))
+        for future in as_completed(pending):
+            yield future.result()
+
+class EnrichmentRequestHandler(BaseHTTPRequestHandler):
+    """ EnrichmentRequestHandler implements the /health, /metrics and /enrich endpoints of the EnrichmentServer.
+
+    Public Method(s):
+        do_GET
+        do_POST
+        sendJSON
+        sendChunked
+
+    Instance variable(s):
+        No instance variables.
+    """
+    protocol_version = "HTTP/1.1"
+    server_version = "Automater"
+
+    def log_message(self, format, *args):
+        Utils.PrintStandardOutput(f"[*] {self.address_string()} {format % args}", verbose = self.server._verbose)
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        if path == "/metrics" and self.server.Automater.Metrics is not None:
+            data = self.server.Automater.Metrics.Registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", MetricsRequestHandler.CONTENTTYPE)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+            return
+        if path != "/health":
+            self.sendJSON(404, {"error": "Not found"})
+            return
+        self.sendJSON(200, {"status": "ok", "inflight": self.server.Clients.InFlight})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path != "/enrich":
+            self.sendJSON(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            targets = body["targets"]
+            sources = body.get("sources")
+            if isinstance(targets, str):
+                targets = [targets]
+            if isinstance(sources, str):
+                sources = sources.split(";")
+            if not isinstance(targets, list) or not all(isinstance(t, str) for t in targets):
+                raise TypeError("targets")
+            if sources is not None and (not isinstance(sources, list) or not all(isinstance(s, str) for s in sources)):
+                raise TypeError("sources")
+            deadline = body.get("deadline")
+            if deadline is not None:
+                deadline = float(deadline)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self.sendJSON(400, {"error": "Expected a JSON object with a list of targets and an optional list of sources"})
+            return
+        stream = bool(body.get("stream")) or parse_qs(url.query).get("stream", ["0"])[0] not in ("", "0", "false")
+
+        client = self.client_address[0]
+        if not self.server.Clients.acquire(client):
+            self.sendJSON(429, {"error": "Too many concurrent requests for this client"})
+            return
+        try:
+            results = self.server.enrich(targets, sources or None, deadline)
+            if stream:
+                self.sendChunked(results)
+            else:
+                rows = sorted((row for rows in results for row in rows), key = itemgetter(0))
+                self.sendJSON(200, {"results": rows})
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+        finally:
+            self.server.Clients.release(client)
+
+    def sendJSON(self, status, document):
+        """ Sends document as a complete JSON response.
+
+        Argument(s):
+            status -- integer HTTP status code.
+            document -- object that will be serialized to JSON.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        data = json.dumps(document).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def sendChunked(self, results):
+        """ Sends results as newline delimited JSON using chunked transfer encoding.
+            One chunk is written for every completed target.
+
+        Argument(s):
+            results -- iterator of lists of [target, type, source, result] lists.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for rows in results:
+            if not rows:
+                continue
+            data = "".join(f"{json.dumps(row)}\n" for row in rows).encode("utf-8")
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+            self.wfile.flush()
+        self.wfile.write(b"0\r\n\r\n")
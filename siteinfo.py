@@ -4,6 +4,7 @@
 Class(es):
     SiteFacade -- Class used to run the automation necessary to retrieve site information and store results.
     Site -- Parent Class used to store sites and information retrieved.
+    ResponseCache -- Class used to share retrieved web site content between lookups.
 
 Function(s):
     No global exportable functions are defined.
@@ -13,11 +14,18 @@ Exception(s):
 """
 import requests
 import re
+import sys
 import time
+import threading
 #import os
+from collections import OrderedDict
+from contextlib import nullcontext
+from operator import attrgetter
+from urllib.parse import urlsplit
 from requests.exceptions import ConnectionError
 from outputs import SiteDetailOutput
 from inputs import SitesFile
+from pipeline import SitePipeline
 from utilities import Utils, VersionChecker
 
 requests.packages.urllib3.disable_warnings()
@@ -30,39 +38,168 @@ class SiteFacade:
 
     Public Method(s):
         runSiteAutomation
+        buildSites
+        buildSite
+        withinBudget
+        reportSkipped
         (Property) Sites
 
     Instance variable(s):
         _sites
+        _responsecache
+        _sharder
+        _pipeline
+        _profiler
+        _tracer
+        _cassette
+        _health
+        _skipped
+        _budget
+        _overbudget
+        _ratecontroller
     """
 
-    def __init__(self, verbose):
+    def __init__(self, verbose, responsecache = None, sharder = None, ioworkers = 1, parseworkers = 0
+                , latencytracker = None, hedgepolicy = None, statistics = None, metrics = None, profiler = None
+                , tracer = None, cassette = None, health = None, budget = None, ratecontroller = None
+                , parsepool = None):
         """ Class constructor.
         Simply creates a blank list and assigns it to
         instance variable _sites that will be filled with retrieved info
         from sites defined in the xml configuration file.
 
         Argument(s):
-            No arguments are required.
+            verbose -- boolean representing whether text will be printed to stdout
+            responsecache -- ResponseCache shared by every site built by this facade. by default = None
+            sharder -- Sharder restricting the work to a single shard. by default = None
+            ioworkers -- number of threads retrieving site content. by default = 1
+            parseworkers -- number of processes running the site regexs, 0 to parse in process. by default = 0
+            latencytracker -- LatencyTracker used to schedule sites by expected latency.
+                                by default = None, a tracker private to this facade
+            hedgepolicy -- HedgePolicy used to hedge requests to slow sites. by default = None, no hedging
+            statistics -- SiteStatistics recording the timings and volumes of each site name. by default = None
+            metrics -- SiteMetrics exposing the requests, cache lookups and queue depths. by default = None
+            profiler -- PhaseProfiler profiling the config load, fetch and parse phases. by default = None
+            tracer -- RequestTracer recording the spans of every site built by this facade. by default = None
+            cassette -- Cassette recording or replaying the requests of every site built by this facade.
+                        by default = None
+            health -- SiteHealth used to skip the chronically failing sources and schedule the failing ones last.
+                        by default = None
+            budget -- maximum number of requests made for each target, spent on the sources with the highest
+                        hit rates in health. by default = None, no budget
+            ratecontroller -- RateController pacing the requests of every site built by this facade.
+                                by default = None, each site sleeps its retrieve delay
+            parsepool -- process pool returned by SitePipeline.createParsePool, running the site regexs
+                            of several facades. by default = None, the pipeline starts its own
         """
 
         self._sites = []
         self._verbose = verbose
+        self._responsecache = responsecache
+        self._sharder = sharder
+        self._profiler = profiler
+        self._tracer = tracer
+        self._cassette = cassette
+        self._health = health
+        self._skipped = set()
+        self._budget = budget
+        self._overbudget = 0
+        self._ratecontroller = ratecontroller
+        self._pipeline = SitePipeline(ioworkers, parseworkers, latencytracker = latencytracker
+                                    , hedgepolicy = hedgepolicy, statistics = statistics, metrics = metrics
+                                    , profiler = profiler, health = health, parsepool = parsepool)
+
+    def buildSites(self, siteelements, webretrievedelay, proxy, targetlist, sourcelist
+                    , useragent, botoutputrequested, keepsites = True, buildcallback = None):
+        """ Builds, one target after the other, the Site object of every site element matching the target.
+            Each site records its (site element, target, source) position as its Sequence.
+            Chronically failing sources are skipped when every source is run, never when named with -s.
+            With a request budget, only the sources most likely to return results are run for each target.
+
+        Argument(s):
+            siteelements -- list of site elements of the xml config files.
+            keepsites -- true if built sites are also appended to the _sites instance variable. by default = True
+            buildcallback -- callable receiving each Site once built, and None once every site is built.
+                                by default = None
+            The other arguments are the ones of runSiteAutomation.
 
-    def runSiteElement(self, webretrievedelay, proxy, siteelement, targetlist, sourcelist
-                    , useragent, botoutputrequested):
-        for targ in targetlist:
-            for source in sourcelist:
-                sitetypematch, targettype, target = self.getSiteInfoIfSiteTypesMatch(source, targ, siteelement)
-                if sitetypematch:
-                    self.buildSiteList(siteelement, webretrievedelay, proxy, targettype, target,
-                                        useragent, botoutputrequested)
+        Return value(s):
+            Iterator of Site objects.
+        """
+        for targetindex, targ in enumerate(targetlist):
+            lookups = []
+            for siteindex, siteelement in enumerate(siteelements):
+                if self._sharder and not self._sharder.includes(targ, siteelement.get("name")):
+                    continue
+                skip = self._health is not None and self._health.skips(siteelement.get("name"))
+                for sourceindex, source in enumerate(sourcelist):
+                    sitetypematch, targettype, target = self.getSiteInfoIfSiteTypesMatch(source, targ, siteelement)
+                    if not sitetypematch:
+                        continue
+                    if skip and source == "allsources":
+                        if not self._health.probe(siteelement.get("name")):
+                            self.reportSkipped(siteelement.get("name"))
+                            continue
+                        print(f"[*] Probing {siteelement.get('name')} with a single lookup to check if it recovered.")
+                    lookups.append((siteelement, targettype, target, source, (siteindex, targetindex, sourceindex)))
+            if self._budget is not None:
+                lookups = self.withinBudget(lookups)
+            for siteelement, targettype, target, source, sequence in lookups:
+                site = self.buildSite(siteelement, webretrievedelay, proxy, targettype, target, useragent
+                                    , botoutputrequested, sequence)
+                if keepsites:
+                    self._sites.append(site)
+                if buildcallback is not None:
+                    buildcallback(site)
+                yield site
+        if buildcallback is not None:
+            buildcallback(None)
+
+    def withinBudget(self, lookups):
+        """ Keeps, out of the lookups of a target, the ones the request budget allows.
+            Sources named with -s are always run; the budget left is spent on the other sources,
+                highest hit rate for the target type first, then fastest first.
 
+        Argument(s):
+            lookups -- list of (site element, target type, target, source, sequence) tuples of a target.
+
+        Return value(s):
+            list -- of the lookups kept, in their original order.
+        """
+        named = [lookup for lookup in lookups if lookup[3] != "allsources"]
+        others = [lookup for lookup in lookups if lookup[3] == "allsources"]
+        remaining = max(0, self._budget - len(named))
+        if len(others) <= remaining:
+            return lookups
+        others.sort(key = lambda lookup: (-self._health.hitRate(lookup[0].get("name"), lookup[1])
+                                        , self._health.expectedLatency(lookup[0].get("name"))))
+        kept = {id(lookup) for lookup in named + others[:remaining]}
+        self._overbudget += len(others) - remaining
+        return [lookup for lookup in lookups if id(lookup) in kept]
+
+    def reportSkipped(self, name):
+        """ Tells, once per run, that a chronically failing source is skipped.
+
+        Argument(s):
+            name -- string name of the site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if name in self._skipped:
+            return
+        self._skipped.add(name)
+        print(f"[!] Skipping {name}: only {self._health.successRate(name):.0%} of its recent requests succeeded."\
+                " Use --includefailing to run it anyway.")
 
     def runSiteAutomation(self, webretrievedelay, proxy, targetlist, sourcelist
-                        , useragent, botoutputrequested, refreshremotexml, versionlocation):
+                        , useragent, botoutputrequested, refreshremotexml, versionlocation, deadline = None
+                        , callback = None, buildcallback = None, keepsites = None):
         """ Builds site objects representative of each site listed in the xml config file.
         Appends a Site object or one of it's subordinate objects to the _sites instance variable so retrieved information can be used.
+        The sites are built as the SitePipeline needs them, then fetched and parsed.
+        When a callback is given, each site is handed to it as soon as it completes instead of being kept,
+            so memory does not grow with the number of targets, unless keepsites asks for both.
 
         Argument(s):
             webretrievedelay -- The amount of seconds to wait between site retrieve calls.
@@ -76,35 +213,57 @@ class SiteFacade:
                             or submitting data to or from a web site.
             botoutputrequested -- true or false representing if a minimalized output will be required for the site.
             refreshremotexml -- true or false representing if Automater will refresh the tekdefense.xml file on each run.
+            deadline -- number of seconds the whole run may take. Sites not completed in time are marked as timed out.
+                            by default = None, no time budget
+            callback -- callable receiving each Site once it is completed or timed out. by default = None
+            buildcallback -- callable receiving each Site as soon as it is built, and None once
+                                every site is built. by default = None
+            keepsites -- true or false representing if the sites are kept for the Sites property.
+                            by default = None, kept only when no callback is given
 
         Return value(s):
             Nothing is returned from this Method.
         """
-        if refreshremotexml:
-            SitesFile.updateSitesDefenseXMLTree(proxy, self._verbose)
-
-        remotesitetree = SitesFile.getXMLTree(__SITESXML__, self._verbose)
-        localsitetree = SitesFile.getXMLTree(__SETTINGSXML__, self._verbose)
-
-        if not localsitetree and not remotesitetree:
-            print(f"Unfortunately there is neither a {__SITESXML__} file nor a {__SETTINGSXML__} file that can be utilized for proper parsing.\n"\
-                  "At least one configuration XML file must be available for Automater to work properly.\n"\
-                  f"Please see {versionlocation} for further instructions.")
-            return
-        if localsitetree:
-            for siteelement in localsitetree.iter(tag="site"):
-                if not self.siteEntryIsValid(siteelement):
-                    print(f"A problem was found in the {__SETTINGSXML__} file. There appears to be a site entry with "\
-                            "unequal numbers of regexs and reporting requirements")
-                    sys.exit(1)
-                self.runSiteElement(webretrievedelay, proxy, siteelement, targetlist, sourcelist, useragent, botoutputrequested)
-        if remotesitetree:
-            for siteelement in remotesitetree.iter(tag="site"):
-                if not self.siteEntryIsValid(siteelement):
-                    print(f"A problem was found in the {__SITESXML__} file. There appears to be a site entry with "\
-                            "unequal numbers of regexs and reporting requirements")
-                    sys.exit(1)
-                self.runSiteElement(webretrievedelay, proxy, siteelement, targetlist, sourcelist, useragent, botoutputrequested)
+        if deadline is not None:
+            deadline = time.monotonic() + deadline
+        with nullcontext() if self._profiler is None else self._profiler.phase("config"):
+            if refreshremotexml:
+                SitesFile.updateSitesDefenseXMLTree(proxy, self._verbose)
+
+            remotesitetree = SitesFile.getXMLTree(__SITESXML__, self._verbose)
+            localsitetree = SitesFile.getXMLTree(__SETTINGSXML__, self._verbose)
+
+            if not localsitetree and not remotesitetree:
+                print(f"Unfortunately there is neither a {__SITESXML__} file nor a {__SETTINGSXML__} file that can be utilized for proper parsing.\n"\
+                      "At least one configuration XML file must be available for Automater to work properly.\n"\
+                      f"Please see {versionlocation} for further instructions.")
+                return
+            siteelements = []
+            if localsitetree:
+                for siteelement in localsitetree.iter(tag="site"):
+                    if not self.siteEntryIsValid(siteelement):
+                        print(f"A problem was found in the {__SETTINGSXML__} file. There appears to be a site entry with "\
+                                "unequal numbers of regexs and reporting requirements")
+                        sys.exit(1)
+                    siteelements.append(siteelement)
+            if remotesitetree:
+                for siteelement in remotesitetree.iter(tag="site"):
+                    if not self.siteEntryIsValid(siteelement):
+                        print(f"A problem was found in the {__SITESXML__} file. There appears to be a site entry with "\
+                                "unequal numbers of regexs and reporting requirements")
+                        sys.exit(1)
+                    siteelements.append(siteelement)
+        # fetches and parses overlap, their memory is measured for the whole run of the sites
+        with nullcontext() if self._profiler is None else self._profiler.phase("sites", cpu = False):
+            self._pipeline.run(self.buildSites(siteelements, webretrievedelay, proxy, targetlist, sourcelist, useragent
+                                            , botoutputrequested
+                                            , keepsites = callback is None if keepsites is None else keepsites
+                                            , buildcallback = buildcallback)
+                                , deadline, callback)
+        # sites are built target by target, the kept list follows the xml config order as it always has
+        self._sites.sort(key = attrgetter("Sequence"))
+        if self._overbudget:
+            print(f"[*] The request budget left out {self._overbudget} lookups of sources unlikely to return results.")
 
     def getSiteInfoIfSiteTypesMatch(self, source, target, siteelement):
         if source == "allsources" or source == siteelement.get("name"):
@@ -125,11 +284,13 @@ class SiteFacade:
             return True
         return False
 
-    def buildSiteList(self, siteelement, webretrievedelay, proxy, targettype, targ, useragent, botoutputrequested):
+    def buildSite(self, siteelement, webretrievedelay, proxy, targettype, targ, useragent, botoutputrequested
+                    , sequence = None):
         site = Site.buildSiteFromXML(siteelement, webretrievedelay, proxy, targettype, targ, useragent
-                                    , botoutputrequested, self._verbose)
-        site.fetchResults()
-        self._sites.append(site)
+                                    , botoutputrequested, self._verbose, self._responsecache, self._tracer
+                                    , self._cassette, self._ratecontroller)
+        site.Sequence = sequence
+        return site
 
     @property
     def Sites(self):
@@ -172,6 +333,7 @@ class Site:
 
     Public Method(s):
         (Class Method) buildSiteFromXML
+        (Class Method) buildSiteFromDict
         (Class Method) buildStringOrListfromXML
         (Class Method) buildDictionaryFromXML
         (Property) WebRetrieveDelay
@@ -194,6 +356,19 @@ class Site:
         (Property) UserAgent
         (Property) Results
         (Property) Method
+        (Property) Sequence
+        (Setter) Sequence
+        (Property) Name
+        (Setter) Name
+        (Property) Latency
+        (Property) CacheStatus
+        (Property) BytesReceived
+        (Property) SleepTime
+        (Property) ErrorType
+        (Property) ParseTimes
+        (Property) TimedOut
+        markTimedOut
+        toDict
         addResults
         postMessage
         getImportantProperty
@@ -201,6 +376,17 @@ class Site:
         getResults
         getFullURL
         getContent
+        getCacheKey
+        tracing
+        sendRequest
+        (Class Method) findAll
+        (Class Method) extractAll
+        (Class Method) extractAllTimed
+        parseContent
+        fetchContent
+        applyResults
+        parseResults
+        fetchResults
 
     Instance variable(s):
         _sites
@@ -220,10 +406,24 @@ class Site:
         _params
         _headers
         _results
+        _responsecache
+        _tracer
+        _cassette
+        _ratecontroller
+        _sequence
+        _name
+        _latency
+        _cachestatus
+        _bytesreceived
+        _sleeptime
+        _errortype
+        _parsetimes
+        _timedout
     """
     def __init__(self, domainurl, webretrievedelay, proxy, targettype,
                  reportstringforresult, target, useragent, friendlyname, regex,
-                 fullurl, boutoutputrequested, importantproperty, params, headers, postdata, verbose):
+                 fullurl, boutoutputrequested, importantproperty, params, headers, postdata, verbose
+                 , responsecache = None, tracer = None, cassette = None, ratecontroller = None):
         """ Class constructor.
             Sets the instance variables based on input from
             the arguments supplied when Automater is run and what the xml config file stores.
@@ -250,6 +450,11 @@ class Site:
             headers -- string or list provided in the entry XML tags within the headers XML tag in the xml configuration file.
             postdata -- dict holding data required for posting values to a site. by default = None
             verbose -- boolean representing whether text will be printed to stdout
+            responsecache -- ResponseCache used to reuse content already retrieved for the same request. by default = None
+            tracer -- RequestTracer recording the spans of the site retrieval. by default = None
+            cassette -- Cassette recording the requests of the site or replaying them. by default = None
+            ratecontroller -- RateController pacing the requests made to the host of the site instead
+                                of the retrieve delay. by default = None
         """
         self._sourceurl = domainurl
         self._webretrievedelay = webretrievedelay
@@ -278,11 +483,25 @@ class Site:
             self.PostData = postdata
         self._results = []
         self._verbose = verbose
+        self._responsecache = responsecache
+        self._tracer = tracer
+        self._cassette = cassette
+        self._ratecontroller = ratecontroller
+        self._sequence = None
+        self._name = None
+        self._latency = None
+        self._cachestatus = None
+        self._bytesreceived = None
+        self._sleeptime = 0.0
+        self._errortype = None
+        self._parsetimes = None
+        self._timedout = False
 
     @classmethod
     def buildSiteFromXML(self, siteelement, webretrievedelay, proxy
                     , targettype, target, useragent
-                    , botoutputrequested, verbose):
+                    , botoutputrequested, verbose, responsecache = None, tracer = None, cassette = None
+                    , ratecontroller = None):
         """ Utilizes the Class Methods within this Class to build the Site object.
             Returns a Site object that defines results returned during the web retrieval investigations.
 
@@ -295,6 +514,12 @@ class Site:
             target -- the target that will be used to gather information on.
             useragent -- the string utilized to represent the user-agent when web requests or submissions are made.
             botoutputrequested -- true or false representing if a minimalized output will be required for the site.
+            verbose -- boolean representing whether text will be printed to stdout
+            responsecache -- ResponseCache shared between sites. by default = None
+            tracer -- RequestTracer shared between sites. by default = None
+            cassette -- Cassette shared between sites. by default = None
+            ratecontroller -- RateController shared between sites, configured with the ratelimit
+                                entries of the site element. by default = None
 
         Return value(s):
             Site object.
@@ -309,9 +534,45 @@ class Site:
         params = Site.buildDictionaryFromXML(siteelement, "params")
         headers = Site.buildDictionaryFromXML(siteelement, "headers")
 
-        return Site(domainurl, webretrievedelay, proxy, targettype, reportstringforresult, target
+        site = Site(domainurl, webretrievedelay, proxy, targettype, reportstringforresult, target
                     , useragent, sitefriendlyname, regex, fullurl, botoutputrequested, importantproperty
-                    , params, headers, postdata, verbose)
+                    , params, headers, postdata, verbose, responsecache, tracer, cassette, ratecontroller)
+        site.Name = siteelement.get("name")
+        if ratecontroller is not None:
+            ratecontroller.configure(site.Host, Site.buildDictionaryFromXML(siteelement, "ratelimit"))
+        return site
+
+    @classmethod
+    def buildSiteFromDict(cls, sitedict, botoutputrequested, verbose):
+        """ Rebuilds a Site object, results included, from the dictionary produced by Site.toDict.
+            Lists found inside the results are turned back into the tuples returned by multi-group regexs.
+
+        Argument(s):
+            sitedict -- dictionary produced by Site.toDict.
+            botoutputrequested -- true or false representing if a minimalized output will be required for the site.
+            verbose -- boolean representing whether text will be printed to stdout
+
+        Return value(s):
+            Site object.
+        """
+        site = Site(sitedict["sourceurl"], 0, None, sitedict["targettype"], sitedict["reportstringforresult"]
+                    , sitedict["target"], None, sitedict["friendlyname"], sitedict["regex"], sitedict["fullurl"]
+                    , botoutputrequested, sitedict["importantproperty"], sitedict.get("params"), sitedict.get("headers")
+                    , sitedict.get("postdata"), verbose)
+        results = sitedict["results"]
+        if results is not None:
+            if isinstance(sitedict["regex"], str):
+                results = [tuple(r) if isinstance(r, list) else r for r in results]
+            else:
+                results = [None if found is None else [tuple(r) if isinstance(r, list) else r for r in found]
+                            for found in results]
+        site._results = results
+        site._timedout = sitedict.get("timedout", False)
+        site._latency = sitedict.get("latency")
+        site._cachestatus = sitedict.get("cachestatus")
+        site.Sequence = None if sitedict["sequence"] is None else tuple(sitedict["sequence"])
+        site.Name = sitedict.get("name")
+        return site
 
     @classmethod
     def buildStringOrListfromXML(self, siteelement, elementstring):
@@ -467,6 +728,15 @@ class Site:
         else:
             self._fullURL = ""
 
+    @property
+    def Host(self):
+        """ Returns the host, with its port if any, that the full URL of the site is requested from.
+
+        Return value(s):
+            string -- lower case host name.
+        """
+        return urlsplit(self._fullURL).netloc.lower()
+
     @property
     def RegEx(self):
         """ Returns string representing the regex being investigated.
@@ -647,6 +917,155 @@ class Site:
         """
         return "GET" if self._postdata is None or len(self._postdata) == 0 else "POST"
 
+    @property
+    def Sequence(self):
+        """ Returns the position of this site in the run that built it.
+            Sorting sites on Sequence reproduces the order in which a single run builds them.
+
+        Return value(s):
+            tuple -- (site element index, target index, source index).
+            None -- if the site was not built by a SiteFacade.
+        """
+        return self._sequence
+
+    @Sequence.setter
+    def Sequence(self, sequence):
+        """ Assigns the position of this site in the run that built it.
+
+        Argument(s):
+            sequence -- tuple of (site element index, target index, source index).
+        """
+        self._sequence = sequence
+
+    @property
+    def Name(self):
+        """ Returns the name attribute of the site element this site was built from.
+
+        Return value(s):
+            string -- name of the site in the xml config file.
+            None -- if the site was not built from the xml config file.
+        """
+        return self._name
+
+    @Name.setter
+    def Name(self, name):
+        """ Assigns the name of the site element this site was built from.
+
+        Argument(s):
+            name -- string name of the site in the xml config file.
+        """
+        self._name = name
+
+    @property
+    def Latency(self):
+        """ Returns the number of seconds the last request to the site took, the retrieve delay excluded.
+
+        Return value(s):
+            float -- seconds spent on the request.
+            None -- if no request was made, either because none was needed or the content came from the cache.
+        """
+        return self._latency
+
+    @property
+    def CacheStatus(self):
+        """ Returns whether the content of the site came from the ResponseCache.
+
+        Return value(s):
+            string -- "hit" if the content came from the cache, "miss" if it had to be retrieved.
+            None -- if no cache is used or no content was requested.
+        """
+        return self._cachestatus
+
+    @property
+    def BytesReceived(self):
+        """ Returns the size of the content received from the site.
+
+        Return value(s):
+            integer -- number of bytes of the response body.
+            None -- if no response was received.
+        """
+        return self._bytesreceived
+
+    @property
+    def SleepTime(self):
+        """ Returns the number of seconds slept on the WebRetrieveDelay before requesting the site.
+
+        Return value(s):
+            float
+        """
+        return self._sleeptime
+
+    @property
+    def ErrorType(self):
+        """ Returns the name of the exception raised by the last request to the site.
+
+        Return value(s):
+            string -- exception class name, such as ConnectionError or ReadTimeout.
+            None -- if the request did not fail.
+        """
+        return self._errortype
+
+    @property
+    def ParseTimes(self):
+        """ Returns the number of seconds each regex of the site took to run over the content.
+
+        Return value(s):
+            list -- of floats, one per regex.
+            None -- if the content was not parsed.
+        """
+        return self._parsetimes
+
+    @property
+    def TimedOut(self):
+        """ Returns True if the run's time budget expired before this site completed.
+
+        Return value(s):
+            Boolean
+        """
+        return self._timedout
+
+    def markTimedOut(self):
+        """ Marks the site as not completed within the run's time budget.
+            Any partial result is discarded so outputs only report the time out.
+
+        Argument(s):
+            No arguments are required.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._timedout = True
+        self._results = None
+
+    def toDict(self):
+        """ Returns a dictionary holding the site definition and its results.
+            The dictionary can be serialized to JSON and turned back into a Site with Site.buildSiteFromDict.
+            The parameters, headers and post data of the requests are left out as they may hold credentials
+                and the rebuilt site is only rendered, never requested again.
+
+        Argument(s):
+            No arguments are required.
+
+        Return value(s):
+            dict
+        """
+        return {
+            "sequence": self.Sequence
+            , "name": self.Name
+            , "target": self.Target
+            , "targettype": self.TargetType
+            , "sourceurl": self.SourceURL
+            , "fullurl": self.FullURL
+            , "reportstringforresult": self.ReportStringForResult
+            , "friendlyname": self.FriendlyName
+            , "regex": self.RegEx
+            , "importantproperty": self.ImportantPropertyString
+            , "results": self._results
+            , "timedout": self.TimedOut
+            , "latency": self.Latency
+            , "cachestatus": self.CacheStatus
+        }
+
     @property
     def Results(self):
         """ Checks the instance variable _results is empty or None.
@@ -787,52 +1206,184 @@ class Site:
             params = None
         return headers, params, proxy
 
-    def getContent(self):
+    def getCacheKey(self):
+        """ Builds a hashable key identifying the request made to the web site.
+            Two sites with the same method, full URL, parameters and post data share the same key.
+
+        Argument(s):
+            No arguments are required.
+
+        Return value(s):
+            tuple
+        """
+        params = tuple(sorted(self.Params.items())) if self.Params else None
+        postdata = tuple(sorted(self.PostData.items())) if self.PostData else None
+        return (self.Method, self.FullURL, params, postdata)
+
+    def tracing(self, name, **args):
+        """ Returns a context manager recording its with block as a span of the site in the RequestTracer.
+
+        Argument(s):
+            name -- string name of the span.
+            args -- values tagging the span besides the site name and target.
+
+        Return value(s):
+            context manager -- giving the dictionary of the span values to the with statement,
+                                or an unrecorded dictionary if the site is not traced.
+        """
+        if self._tracer is None:
+            return nullcontext(args)
+        return self._tracer.span(name, site = self.Name, target = self.Target, **args)
+
+    def sendRequest(self, method, **kwargs):
+        """ Makes an HTTP request to the site's full URL.
+            When the site is traced, the request is recorded as a span split into its connection phases.
+            When the site has a cassette, the request and its response are recorded to it,
+                or the recorded response is returned without any network access.
+            When the site has a rate controller, the outcome of the request adapts the rate of its host.
+
+        Argument(s):
+            method -- string HTTP method.
+            kwargs -- the keyword arguments of requests.request.
+
+        Return value(s):
+            requests.Response
+        """
+        if self._cassette is not None and self._cassette.Replaying:
+            return self._cassette.replay(method, self.FullURL, kwargs)
+        started = time.monotonic()
+        try:
+            if self._tracer is None:
+                resp = requests.request(method, self.FullURL, **kwargs)
+            else:
+                span = self._tracer.span("request", category = "http", request = True, site = self.Name
+                                        , target = self.Target, method = method, url = self.FullURL
+                                        , proxy = bool(kwargs.get("proxies")))
+                with span as args, self._tracer.session() as session:
+                    resp = session.request(method, self.FullURL, **kwargs)
+                    args["status"] = resp.status_code
+                    args["bytes"] = len(resp.content)
+        except requests.exceptions.RequestException as e:
+            if self._cassette is not None:
+                self._cassette.record(method, self.FullURL, kwargs, error = e)
+            if self._ratecontroller is not None:
+                self._ratecontroller.record(self.Host, latency = time.monotonic() - started
+                                            , timedout = isinstance(e, requests.exceptions.Timeout))
+            raise
+        if self._cassette is not None:
+            self._cassette.record(method, self.FullURL, kwargs, resp)
+        if self._ratecontroller is not None:
+            self._ratecontroller.record(self.Host, resp.status_code, time.monotonic() - started
+                                        , retryafter = resp.headers.get("Retry-After"))
+        return resp
+
+    def getContent(self, timeout = 5, hedgepolicy = None):
         """ Attempts to retrieve a string from a web site.
             String retrieved is the entire web site including HTML markup.
             Requests via proxy if --proxy option was chosen during execution of the Automater.
             Returns the string representing the entire web site including the HTML markup retrieved from the site.
 
         Argument(s):
-            No arguments are required.
+            timeout -- number of seconds to wait for the site to answer. by default = 5
+            hedgepolicy -- HedgePolicy used to send a second request when the site is slow. by default = None
 
         Return value(s):
             string
         """
+        cachekey = self.getCacheKey()
+        if self._responsecache is not None:
+            content = self._responsecache.get(cachekey)
+            if content is not None:
+                self._cachestatus = "hit"
+                return content
+            self._cachestatus = "miss"
         delay = self.WebRetrieveDelay
         headers, params, proxy = self.getHeaderParamProxyInfo()
         try:
-            time.sleep(delay)
-            resp = requests.get(self.FullURL, headers=headers, params=params, proxies=proxy, verify=False, timeout=5)
-            resp.raise_for_status()
-            return str(resp.content)
+            def request(proxies):
+                resp = self.sendRequest("GET", headers=headers, params=params, proxies=proxies, verify=False
+                                        , timeout=timeout)
+                resp.raise_for_status()
+                return resp
+
+            answered = threading.Event()
+
+            def hedge(proxies):
+                # a hedge is one more request to the host, paced like the first one,
+                # and not sent if the first one answered while it waited for its turn
+                with self.tracing("sleep"):
+                    self._ratecontroller.acquire(self.Host)
+                if answered.is_set():
+                    raise requests.exceptions.RequestException("Hedge no longer needed")
+                return request(proxies)
+
+            with self.tracing("sleep"):
+                if self._ratecontroller is None:
+                    time.sleep(delay)
+                else:
+                    delay = self._ratecontroller.acquire(self.Host)
+            self._sleeptime = delay
+            started = time.monotonic()
+            if hedgepolicy is None:
+                resp = request(proxy)
+            else:
+                try:
+                    resp = hedgepolicy.race(self.Name, request, proxy
+                                            , hedge if self._ratecontroller is not None else None)
+                finally:
+                    answered.set()
+            self._latency = time.monotonic() - started
+            self._bytesreceived = len(resp.content)
+            content = str(resp.content)
+            if self._responsecache is not None:
+                self._responsecache.put(cachekey, content)
+            return content
         except ConnectionError as ce:
+            self._errortype = type(ce).__name__
             try:
                 self.postErrorMessage(
                     f"[-] Cannot connect to {self.FullURL}. Server response is {ce.message[0]} Server error code is {ce.message[1][0]}")
             except:
                 self.postErrorMessage(f"[-] Cannot connect to {self.FullURL}")
         except:
+            self._errortype = sys.exc_info()[0].__name__
             self.postErrorMessage(f"[-] Cannot connect to {self.FullURL}")
 
-    def postContent(self):
+    def postContent(self, timeout = None):
         """ Submits information to a web site being used as a resource that requires a post of information.
             Submits via proxy if --proxy option was chosen during execution of the Automater.
             Returns a string that contains entire web site being used as a resource including HTML markup information.
 
         Argument(s):
-            raw_params -- string info detailing parameters provided from xml configuration file in the params XML tag.
-            headers -- string info detailing headers provided from xml configuration file in the headers XML tag.
+            timeout -- number of seconds to wait for the site to answer or None to wait indefinitely. by default = None
 
         Return value(s):
             string -- contains entire web site being used as a resource including HTML markup information.
         """
+        cachekey = self.getCacheKey()
+        if self._responsecache is not None:
+            content = self._responsecache.get(cachekey)
+            if content is not None:
+                self._cachestatus = "hit"
+                return content
+            self._cachestatus = "miss"
         headers, params, proxy = self.getHeaderParamProxyInfo()
         try:
-            resp = requests.post(self.FullURL, data=self.PostData, headers=headers, params=params, proxies=proxy, verify=False)
+            if self._ratecontroller is not None:
+                with self.tracing("sleep"):
+                    self._sleeptime = self._ratecontroller.acquire(self.Host)
+            started = time.monotonic()
+            resp = self.sendRequest("POST", data=self.PostData, headers=headers, params=params, proxies=proxy
+                                    , verify=False, timeout=timeout)
+            self._latency = time.monotonic() - started
             resp.raise_for_status()
-            return str(resp.content)
+            self._bytesreceived = len(resp.content)
+            content = str(resp.content)
+            if self._responsecache is not None:
+                self._responsecache.put(cachekey, content)
+            return content
         except ConnectionError as ce:
+            self._errortype = type(ce).__name__
             try:
                 self.postErrorMessage(
                     f"[-] Cannot connect to {self.FullURL}. Server response is {ce.message[0]
@@ -840,8 +1391,63 @@ class Site:
             except:
                 self.postErrorMessage(f"[-] Cannot connect to {self.FullURL}")
         except:
+            self._errortype = sys.exc_info()[0].__name__
             self.postErrorMessage(f"[-] Cannot connect to {self.FullURL}")
 
+    @classmethod
+    def findAll(cls, regex, content):
+        """ Runs a single regex over content.
+            This is the extraction used by every parse path, in process or in a parse worker process.
+
+        Argument(s):
+            regex -- string regex with the %TARGET% keyword already replaced.
+            content -- string representation of the web site being used as a resource.
+
+        Return value(s):
+            list -- information found by the regex.
+            None -- if the regex could not be run.
+        """
+        try:
+            return re.findall(re.compile(regex, re.IGNORECASE), content)
+        except:
+            return None
+
+    @classmethod
+    def extractAll(cls, regex, content):
+        """ Runs a single regex or every regex of a list over content.
+            Only takes picklable arguments so it can run in a parse worker process.
+
+        Argument(s):
+            regex -- string regex or list of string regexs as returned by the RegEx property.
+            content -- string representation of the web site being used as a resource.
+
+        Return value(s):
+            list -- information found by a single regex, or one list (or None) per regex of a list.
+        """
+        if isinstance(regex, str):
+            return cls.findAll(regex, content)
+        return [cls.findAll(r, content) for r in regex]
+
+    @classmethod
+    def extractAllTimed(cls, regex, content):
+        """ Runs a single regex or every regex of a list over content like extractAll, timing each regex.
+            Only takes picklable arguments so it can run in a parse worker process.
+
+        Argument(s):
+            regex -- string regex or list of string regexs as returned by the RegEx property.
+            content -- string representation of the web site being used as a resource.
+
+        Return value(s):
+            tuple -- (return value of extractAll, list of the seconds taken by each regex)
+        """
+        found = []
+        parsetimes = []
+        for r in ([regex] if isinstance(regex, str) else regex):
+            started = time.perf_counter()
+            found.append(cls.findAll(r, content))
+            parsetimes.append(time.perf_counter() - started)
+        return (found[0] if isinstance(regex, str) else found), parsetimes
+
     def parseContent(self, content, index = None):
         """ Retrieves a list of information retrieved from the sites defined in the xml configuration file.
             Returns the list of found information from the sites being used as resources
@@ -854,33 +1460,59 @@ class Site:
         Return value(s):
             list -- information found from a web site being used as a resource.
         """
-        try:
-            repattern = re.compile(self.RegEx if index is None else self.RegEx[index], re.IGNORECASE)
-            return re.findall(repattern, content)
-        except:
+        found = Site.findAll(self.RegEx if index is None else self.RegEx[index], content)
+        if found is None:
             self.postErrorMessage(f"{self.ErrorMessage} {self.FullURL}")
-            return None
+        return found
 
-    def fetchResults(self):
+    def fetchContent(self, timeout = None, hedgepolicy = None):
+        """ Retrieves the content of the site using the site's method, without parsing it.
+
+        Argument(s):
+            timeout -- number of seconds to wait for the site to answer.
+                        by default = None, using the default of getContent or postContent.
+            hedgepolicy -- HedgePolicy used to hedge slow GET requests. by default = None
+
+        Return value(s):
+            string -- content retrieved from the site.
+            None -- if no content was returned.
+        """
         self.postMessage(f"{self.UserMessage} {self.FullURL}")
 
-        if self.Method == "POST":
-            Utils.PrintStandardOutput(
-                f"[-] {self.URL} requires a submission for {self.Target}. "
-                    "Submitting now, this may take a moment."
-                            , verbose = self._verbose)
-            respContent = self.postContent()
-        else:
-            respContent = self.getContent()
+        with self.tracing("fetch", method = self.Method) as args:
+            if self.Method == "POST":
+                Utils.PrintStandardOutput(
+                    f"[-] {self.URL} requires a submission for {self.Target}. "
+                        "Submitting now, this may take a moment."
+                                , verbose = self._verbose)
+                respContent = self.postContent(timeout)
+            else:
+                respContent = self.getContent(5 if timeout is None else min(5, timeout), hedgepolicy)
+            args["cache"] = self._cachestatus
+            if self._errortype:
+                args["error"] = self._errortype
 
         if not respContent:
             self.postErrorMessage(f"No content returned by {self.FullURL}")
-            return
+            return None
+        return respContent
+
+    def applyResults(self, found, parsetimes = None):
+        """ Stores the information extracted from the site content as the site results.
+
+        Argument(s):
+            found -- return value of Site.extractAll for the RegEx of this site.
+            parsetimes -- list of the seconds taken by each regex. by default = None
 
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._parsetimes = parsetimes
         if isinstance(self.RegEx, str): # this is a single instance
-            content = self.parseContent(respContent)
-            if content:
-                self.addResults(content)
+            if found is None:
+                self.postErrorMessage(f"{self.ErrorMessage} {self.FullURL}")
+            if found:
+                self.addResults(found)
             else:
                 self.postErrorMessage(f"No content found at {self.FullURL}")
             return
@@ -888,10 +1520,134 @@ class Site:
         # this is a multi instance
         self._results = [[] for x in range(len(self.RegEx))]
         foundContent = False
-        for index in range(len(self.RegEx)):
-            content = self.parseContent(respContent, index)
+        for index, content in enumerate(found):
+            if content is None:
+                self.postErrorMessage(f"{self.ErrorMessage} {self.FullURL}")
             if content:
                 self.addResults(content, index)
                 foundContent = True
         if not foundContent:
             self.postErrorMessage(f"No content found at {self.FullURL}")
+
+    def parseResults(self, content):
+        """ Extracts the information from the site content in process and stores it as the site results.
+
+        Argument(s):
+            content -- string representation of the web site being used as a resource.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self.applyResults(*Site.extractAllTimed(self.RegEx, content))
+
+    def fetchResults(self):
+        """ Retrieves the site content and extracts its results.
+
+        Argument(s):
+            No arguments are required.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        respContent = self.fetchContent()
+        if respContent:
+            self.parseResults(respContent)
+
+class ResponseCache:
+    """ ResponseCache stores the content retrieved from web sites so that identical lookups
+            made by different callers only reach the site once per time to live period.
+        The cache is safe to share between threads and evicts the least recently used entries first.
+
+    Public Method(s):
+        get
+        put
+        clear
+        (Property) Hits
+        (Property) Misses
+
+    Instance variable(s):
+        _entries
+        _maxentries
+        _ttl
+        _lock
+        _hits
+        _misses
+    """
+
+    def __init__(self, maxentries = 4096, ttl = 300):
+        """ Class constructor.
+
+        Argument(s):
+            maxentries -- maximum number of responses kept in the cache. by default = 4096
+            ttl -- number of seconds a response stays valid. by default = 300
+        """
+        self._entries = OrderedDict()
+        self._maxentries = maxentries
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @property
+    def Hits(self):
+        """ Returns the number of lookups answered from the cache.
+
+        Return value(s):
+            integer
+        """
+        return self._hits
+
+    @property
+    def Misses(self):
+        """ Returns the number of lookups that were not found in the cache.
+
+        Return value(s):
+            integer
+        """
+        return self._misses
+
+    def get(self, key):
+        """ Returns the content stored for key or None if it is missing or expired.
+
+        Argument(s):
+            key -- hashable key built by Site.getCacheKey.
+
+        Return value(s):
+            string -- cached content.
+            None -- if nothing valid is cached for key.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def put(self, key, content):
+        """ Stores content for key, evicting the oldest entries when the cache is full.
+
+        Argument(s):
+            key -- hashable key built by Site.getCacheKey.
+            content -- string content retrieved from the web site.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self._ttl, content)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._maxentries:
+                self._entries.popitem(last = False)
+
+    def clear(self):
+        """ Removes every entry from the cache.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,318 @@
+"""
+The tracing.py module records timed spans of the work done to retrieve each site: the fetch
+of the site, the retrieve delay slept before it and every HTTP request made, split into DNS
+resolution, TCP connect, TLS handshake, time to first byte and body transfer.
+
+Spans are exported as a Chrome trace JSON file that chrome://tracing or https://ui.perfetto.dev
+show on a timeline, one row per thread, so the requests of a whole concurrent run can be compared.
+
+Requests are timed by the urllib3 connections of a TracingAdapter, which find the span of the
+request they serve in a thread local, as the requests library gives them no other context.
+
+Class(es):
+    RequestTracer -- Records the spans of a run and exports them as a Chrome trace.
+    TracingAdapter -- requests transport adapter timing the phases of each connection.
+    TracedHTTPConnection -- urllib3 HTTP connection recording its DNS, connect and time to first byte spans.
+    TracedHTTPSConnection -- urllib3 HTTPS connection also recording its TLS handshake span.
+
+Function(s):
+    No global exportable functions are defined.
+
+Exception(s):
+    No exceptions exported.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
+
+# the request traced by the current thread, set by RequestTracer.span for the connections to find
+_active = threading.local()
+
+class RequestTracer:
+    """ RequestTracer records spans, timed from its creation, in the thread that ran them.
+        Spans opened with request set to true also collect the connection phases timed by the
+            TracingAdapter sessions used while they are open, in the same thread.
+
+    Public Method(s):
+        now
+        record
+        span
+        session
+        export
+        (Property) Spans
+
+    Instance variable(s):
+        _events
+        _threads
+        _lock
+        _origin
+        _pid
+    """
+
+    def __init__(self):
+        """ Class constructor.
+
+        Argument(s):
+            No arguments are required.
+        """
+        self._events = []
+        self._threads = {}
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    @property
+    def Spans(self):
+        """ Returns the number of spans recorded.
+
+        Return value(s):
+            integer
+        """
+        return len(self._events)
+
+    def now(self):
+        """ Returns the microseconds elapsed since the tracer was created.
+
+        Return value(s):
+            float
+        """
+        return (time.perf_counter() - self._origin) * 1e6
+
+    def record(self, name, started, ended = None, category = "http", args = None):
+        """ Records a span of the calling thread.
+
+        Argument(s):
+            name -- string name of the span.
+            started -- now() value at which the span started.
+            ended -- now() value at which the span ended. by default = None, now
+            category -- string category of the span. by default = "http"
+            args -- dictionary of the values tagging the span. by default = None
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        if ended is None:
+            ended = self.now()
+        thread = threading.current_thread()
+        with self._lock:
+            self._threads.setdefault(thread.ident, thread.name)
+            self._events.append((name, category, started, ended - started, thread.ident, args))
+
+    @contextmanager
+    def span(self, name, category = "site", request = False, **args):
+        """ Records the with block as a span tagged with args.
+            The with statement receives the args dictionary, so values known at the end of the block
+                can be added to the span; an exception leaving the block is recorded as its error.
+
+        Argument(s):
+            name -- string name of the span.
+            category -- string category of the span. by default = "site"
+            request -- true if the block makes an HTTP request through a session of this tracer
+                        whose connection phases are recorded. by default = False
+            args -- values tagging the span.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        started = self.now()
+        previous = getattr(_active, "trace", None)
+        if request:
+            _active.trace = self
+            _active.headers = None
+        try:
+            yield args
+        except Exception as e:
+            args["error"] = type(e).__name__
+            raise
+        finally:
+            if request:
+                # requests reads the body once the headers are in, until the response is returned
+                if _active.headers is not None:
+                    self.record("body", _active.headers)
+                _active.trace = previous
+            self.record(name, started, category = category, args = args)
+
+    def session(self):
+        """ Returns a requests Session whose connections record their phases in the current request span.
+
+        Return value(s):
+            requests.Session
+        """
+        session = requests.Session()
+        adapter = TracingAdapter()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def export(self, filename):
+        """ Writes the spans as a Chrome trace JSON file, in microseconds.
+
+        Argument(s):
+            filename -- string name of the file to write.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        traceevents = [{"name": "thread_name", "ph": "M", "pid": self._pid, "tid": tid, "args": {"name": name}}
+                        for tid, name in threads.items()]
+        traceevents.extend({"name": name, "cat": category, "ph": "X", "ts": round(started, 1)
+                            , "dur": round(duration, 1), "pid": self._pid, "tid": tid, "args": args or {}}
+                            for name, category, started, duration, tid, args in events)
+        with open(filename, "w") as f:
+            json.dump({"traceEvents": traceevents, "displayTimeUnit": "ms"}, f)
+        print(f"\n[+] {len(events)} trace spans written to {filename}")
+
+class TracedHTTPConnection(HTTPConnection):
+    """ TracedHTTPConnection records, in the request span of its thread, the DNS resolution, the TCP connect
+            and the time between the request being sent and the response headers being received.
+        The host is resolved once for the DNS span and the connection made to its first address;
+            urllib3 resolves it again and tries every address if that one refuses the connection.
+
+    Public Method(s):
+        request
+        getresponse
+
+    Instance variable(s):
+        _tracedconnect
+        _tracedsent
+    """
+
+    _tracedconnect = None
+    _tracedsent = None
+
+    def _new_conn(self):
+        trace = getattr(_active, "trace", None)
+        if trace is None:
+            return super()._new_conn()
+        started = trace.now()
+        try:
+            addresses = socket.getaddrinfo(self._dns_host, self.port, 0, socket.SOCK_STREAM)
+        except OSError:
+            # urllib3 resolves the host again and reports the failure
+            addresses = None
+        trace.record("dns", started, args = {"host": self._dns_host})
+        started = trace.now()
+        host = self._dns_host
+        try:
+            if addresses:
+                self._dns_host = addresses[0][4][0]
+            try:
+                return super()._new_conn()
+            except NewConnectionError:
+                if not addresses or len(addresses) == 1:
+                    raise
+                self._dns_host = host
+                return super()._new_conn()
+        finally:
+            self._dns_host = host
+            self._tracedconnect = trace.now()
+            trace.record("connect", started, self._tracedconnect, args = {"port": self.port})
+
+    def request(self, *args, **kwargs):
+        """ Sends the request, remembering when it was sent to time the first byte of the response.
+
+        Argument(s):
+            The arguments of urllib3 HTTPConnection.request.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        super().request(*args, **kwargs)
+        trace = getattr(_active, "trace", None)
+        self._tracedsent = trace.now() if trace is not None else None
+
+    def getresponse(self, *args, **kwargs):
+        """ Receives the response headers, recording the time to first byte.
+
+        Argument(s):
+            The arguments of urllib3 HTTPConnection.getresponse.
+
+        Return value(s):
+            urllib3.HTTPResponse
+        """
+        response = super().getresponse(*args, **kwargs)
+        trace = getattr(_active, "trace", None)
+        if trace is not None and self._tracedsent is not None:
+            _active.headers = trace.now()
+            trace.record("ttfb", self._tracedsent, _active.headers, args = {"status": response.status})
+        return response
+
+class TracedHTTPSConnection(TracedHTTPConnection, HTTPSConnection):
+    """ TracedHTTPSConnection is a TracedHTTPConnection that also records the TLS handshake,
+            proxy tunnel included, made once the TCP connection is established.
+
+    Public Method(s):
+        connect
+
+    Instance variable(s):
+        No instance variables are defined.
+    """
+
+    def connect(self):
+        """ Connects to the server and records the TLS handshake.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        self._tracedconnect = None
+        super().connect()
+        trace = getattr(_active, "trace", None)
+        if trace is not None and self._tracedconnect is not None:
+            trace.record("tls", self._tracedconnect)
+
+class TracedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TracedHTTPConnection
+
+class TracedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = TracedHTTPSConnection
+
+class TracingAdapter(HTTPAdapter):
+    """ TracingAdapter is a requests transport adapter whose connection pools use the traced connections.
+        SOCKS proxies keep their own connection classes and are not traced.
+
+    Public Method(s):
+        init_poolmanager
+        proxy_manager_for
+
+    Instance variable(s):
+        No instance variables are defined.
+    """
+    POOLCLASSES = {"http": TracedHTTPConnectionPool, "https": TracedHTTPSConnectionPool}
+
+    def init_poolmanager(self, *args, **kwargs):
+        """ Creates the pool manager of direct connections with the traced connection pools.
+
+        Argument(s):
+            The arguments of requests HTTPAdapter.init_poolmanager.
+
+        Return value(s):
+            Nothing is returned from this Method.
+        """
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = self.POOLCLASSES
+
+    def proxy_manager_for(self, proxy, **proxy_kwargs):
+        """ Returns the pool manager of the connections made through proxy, with the traced connection pools.
+
+        Argument(s):
+            proxy -- string URL of the proxy.
+            proxy_kwargs -- the keyword arguments of requests HTTPAdapter.proxy_manager_for.
+
+        Return value(s):
+            urllib3.ProxyManager
+        """
+        manager = super().proxy_manager_for(proxy, **proxy_kwargs)
+        if not proxy.lower().startswith("socks"):
+            manager.pool_classes_by_scheme = self.POOLCLASSES
+        return manager
@@ -4,6 +4,7 @@ Class(es):
     Parser -- Class to handle standard argparse functions with a class-based structure.
     IPWrapper -- Class to provide IP Address formatting and parsing.
     VersionChecker -- Class to check if modifications to any files are available
+    Sharder -- Class to deterministically split targets between several nodes.
 
 Function(s):
     No global exportable functions are defined.
@@ -33,6 +34,19 @@ class Parser:
         (Property) Source
         (Property) InputFile
         (Property) UserAgent
+        (Property) Serve
+        (Property) Workers
+        (Property) ClientLimit
+        (Property) Shard
+        (Property) ShardBySite
+        (Property) JournalOutFile
+        (Property) Merge
+        (Property) IOWorkers
+        (Property) ParseWorkers
+        (Property) Deadline
+        (Property) Hedge
+        (Property) HedgeRatio
+        (Property) HedgeProxy
 
     Instance variable(s):
         _parser
@@ -47,7 +61,7 @@ class Parser:
             desc -- ArgumentParser description.
         """
         self._parser = argparse.ArgumentParser(description = desc)
-        self._parser.add_argument("target"
+        self._parser.add_argument("target", nargs = "?"
             , help = "List one IP Address (CIDR or dash notation accepted), URL or Hash to query or pass the filename"\
                 " of a file containing IP Address info, URL or Hash to query each separated by a newline.")
         self._parser.add_argument("-o", "--output"
@@ -78,6 +92,111 @@ class Parser:
             , help = "This option refreshes the sites.xml file from the remote GitHub site.")
         self._parser.add_argument("-v", "--verbose", action = "store_true"
             , help = "This option prints debug messages to the screen.")
+        self._parser.add_argument("--serve", metavar = "[HOST:]PORT"
+            , help = "This option starts the HTTP/JSON enrichment server instead of running a target."\
+                    " Host defaults to 127.0.0.1.")
+        self._parser.add_argument("--workers", type = int, default = 8
+            , help = "This option sets the size of the enrichment server worker pool. Default is 8.")
+        self._parser.add_argument("--clientlimit", type = int, default = 2
+            , help = "This option sets the maximum number of concurrent requests per client"\
+                    " of the enrichment server. Default is 2.")
+        self._parser.add_argument("--shard", metavar = "I/N"
+            , help = "This option only processes the I-th of N shards (0 <= I < N), selected by a stable hash"\
+                    " of the normalised target. Every node of a sharded run must use the same N and inputs.")
+        self._parser.add_argument("--shardkey", choices = ["target", "site"], default = "target"
+            , help = "This option selects what the shard hash is computed on: the target alone or the site name"\
+                    " and the target. Default is target.")
+        self._parser.add_argument("-j", "--journal"
+            , help = "This option will output the complete site results to a journal file that can be merged"\
+                    " with --merge.")
+        self._parser.add_argument("--merge", nargs = "+", metavar = "JOURNAL"
+            , help = "This option merges the journal files written by sharded runs and produces the requested"\
+                    " outputs as a single run would have.")
+        self._parser.add_argument("--ioworkers", type = int, default = 1
+            , help = "This option sets the number of threads retrieving site content. Default is 1.")
+        self._parser.add_argument("--parseworkers", type = int, default = 0
+            , help = "This option sets the number of processes running the site regexs."\
+                    " Default is 0, which parses in the main process.")
+        self._parser.add_argument("--deadline", type = float
+            , help = "This option sets a time budget in seconds for the whole run. Sources are run fastest first and"\
+                    " the ones not completed when the budget expires are reported as timed out.")
+        self._parser.add_argument("--hedge", action = "store_true"
+            , help = "This option sends a second request to a source that has not answered by its observed"\
+                    " 95th percentile latency and keeps whichever answers first.")
+        self._parser.add_argument("--hedgeratio", type = float, default = 0.1
+            , help = "This option caps hedged requests to this ratio of the requests made to each source."\
+                    " Default is 0.1.")
+        self._parser.add_argument("--hedgeproxy"
+            , help = "This option sets an alternate proxy used for hedged requests (eg. proxy2.example.com:8080)")
+        self._parser.add_argument("--htmlreport", metavar = "DIRECTORY"
+            , help = "This option will output the results to a multi-page HTML report in DIRECTORY,"\
+                    " with an index page summarizing the results of each source.")
+        self._parser.add_argument("--pagesize", type = int, default = 5000
+            , help = "This option sets the maximum number of rows of each HTML report page. Default is 5000.")
+        self._parser.add_argument("--syslog", metavar = "[udp|tcp://]HOST[:PORT]"
+            , help = "This option will send the results in CEF format to a syslog server while the run"\
+                    " progresses. UDP and port 514 are used by default.")
+        self._parser.add_argument("--jsonl"
+            , help = "This option will output one JSON object per result to a JSON lines file."\
+                    " The file is gzip compressed if its name ends in .gz.")
+        self._parser.add_argument("--db"
+            , help = "This option will store every result in an SQLite database that can be searched with"\
+                    " --query and --pivot.")
+        self._parser.add_argument("--query", metavar = "VALUE"
+            , help = "This option lists the targets of the --db database for which a source returned VALUE.")
+        self._parser.add_argument("--pivot", metavar = "TARGET"
+            , help = "This option lists the targets of the --db database sharing a result with TARGET.")
+        self._parser.add_argument("--diff-against", dest = "diffagainst", metavar = "DB"
+            , help = "This option only outputs the results added, changed or removed since the latest run stored"\
+                    " in the DB result database written with --db.")
+        self._parser.add_argument("--stream", "--unsorted", action = "store_true"
+            , help = "This option writes each site to the outputs as soon as it completes, in completion order.")
+        self._parser.add_argument("--bytarget", action = "store_true"
+            , help = "This option makes --stream write each target as one block, sources in config order,"\
+                    " as soon as every source of the target completed.")
+        self._parser.add_argument("--sortbuffer", type = int, default = 0, metavar = "SITES"
+            , help = "This option keeps at most SITES sites in memory while sorting the outputs by target,"\
+                    " spilling sorted runs to temporary files beyond that. Default is 0 (every site kept in memory).")
+        self._parser.add_argument("--stats", action = "store_true"
+            , help = "This option prints the request, latency, volume, parse time and error statistics of each"\
+                    " site at the end of the run.")
+        self._parser.add_argument("--statsfile"
+            , help = "This option writes the statistics of each site to a JSON file.")
+        self._parser.add_argument("--metrics", metavar = "[HOST:]PORT"
+            , help = "This option serves Prometheus metrics of the run on http://[HOST:]PORT/metrics.")
+        self._parser.add_argument("--metricsfile"
+            , help = "This option writes Prometheus metrics of the run to a node-exporter textfile"\
+                    " every flush interval.")
+        self._parser.add_argument("--profile", metavar = "DIRECTORY"
+            , help = "This option profiles the config load, target expansion, fetch, parse and output phases"\
+                    " separately, writing cProfile statistics and the top memory allocations of each phase to DIRECTORY.")
+        self._parser.add_argument("--profilerate", type = float, default = 1.0, metavar = "RATIO"
+            , help = "This option only profiles this ratio of the site fetches and parses, without tracing memory"\
+                    " allocations, so --profile can stay enabled at low overhead. Default is 1.0.")
+        self._parser.add_argument("--trace"
+            , help = "This option writes timed spans of every site fetch and request, split into DNS, connect, TLS,"\
+                    " time to first byte and body transfer, to a Chrome trace JSON file viewable in Perfetto.")
+        self._parser.add_argument("--record", metavar = "ARCHIVE"
+            , help = "This option records every request made and the response returned, credentials redacted,"\
+                    " to the ARCHIVE zip file.")
+        self._parser.add_argument("--replay", metavar = "ARCHIVE"
+            , help = "This option answers every request with the response recorded in ARCHIVE by --record,"\
+                    " without network access and without the retrieve delay.")
+        self._parser.add_argument("--health", metavar = "FILE"
+            , help = "This option keeps the success rate, latencies and regex hit rates of each source in FILE"\
+                    " from one run to the next. Failing sources are run last and chronically failing ones skipped.")
+        self._parser.add_argument("--includefailing", action = "store_true"
+            , help = "This option runs the sources that --health found chronically failing anyway.")
+        self._parser.add_argument("--budget", type = int, metavar = "REQUESTS"
+            , help = "This option makes at most REQUESTS requests for each target, to the sources that returned"\
+                    " results most often for its type according to --health. Sources named with -s always run.")
+        self._parser.add_argument("--ratecontrol", metavar = "FILE"
+            , help = "This option adapts the request rate of each host instead of using a fixed delay: raised while"\
+                    " responses are healthy, cut on 429, 503, timeouts or latency spikes. The learned rates are kept"\
+                    " in FILE for the next runs and the delay only sets the initial rate.")
+        self._parser.add_argument("--flushinterval", type = float, default = 5.0
+            , help = "This option sets the seconds between output flushes when streaming, writing JSON lines,"\
+                    " committing to the --db database or writing the --metricsfile. Default is 5.")
         self.args = self._parser.parse_args()
 
     def print_help(self):
@@ -180,9 +299,9 @@ class Parser:
 
         Return value(s):
             string -- String containing integer to tell program how long to delay between each site query.
-                        Default delay is 2 seconds.
+                        Default delay is 2 seconds, no delay when replaying an archive.
         """
-        return self.args.delay
+        return 0 if self.args.replay else self.args.delay
 
     @property
     def Proxy(self):
@@ -236,7 +355,7 @@ class Parser:
             string -- String file name based on target filename parameter to program.
             None -- If the target is not a filename.
         """
-        return None if not self.Target or not self.hasInputFile() else self.Target
+        return None if not self.Target or not self.hasInputFile else self.Target
 
     @property
     def UserAgent(self):
@@ -247,6 +366,398 @@ class Parser:
         """
         return self.args.useragent
 
+    @property
+    def Serve(self):
+        """ Checks to determine if the user wants to run the enrichment server.
+            Returns the [host:]port string to listen on or None if the server was not requested.
+
+        Return value(s):
+            string -- Address the enrichment server will listen on.
+            None -- If the --serve parameter is not used.
+        """
+        return self.args.serve if self.args.serve else None
+
+    @property
+    def Workers(self):
+        """ Returns the number of worker threads used by the enrichment server.
+
+        Return value(s):
+            integer -- Size of the worker pool. Default is 8.
+        """
+        return self.args.workers
+
+    @property
+    def ClientLimit(self):
+        """ Returns the number of concurrent requests a single client may have in flight on the enrichment server.
+
+        Return value(s):
+            integer -- Per client concurrency limit. Default is 2.
+        """
+        return self.args.clientlimit
+
+    @property
+    def Shard(self):
+        """ Checks to determine if the user requested a single shard of the work.
+
+        Return value(s):
+            string -- Shard in the I/N format.
+            None -- If the --shard parameter is not used.
+        """
+        return self.args.shard if self.args.shard else None
+
+    @property
+    def ShardBySite(self):
+        """ Checks to determine if the shard hash includes the site name.
+
+        Return value(s):
+            Boolean
+        """
+        return self.args.shardkey == "site"
+
+    @property
+    def JournalOutFile(self):
+        """ Checks if there is a journal output requested.
+            Returns string name of journal output file if requested or None if not requested.
+
+        Return value(s):
+            string -- Name of a journal file to write to system.
+            None -- if journal output was not requested.
+        """
+        return self.args.journal if self.args.journal else None
+
+    @property
+    def Merge(self):
+        """ Checks if journal files should be merged instead of running targets.
+
+        Return value(s):
+            list -- of journal file names to merge.
+            None -- If the --merge parameter is not used.
+        """
+        return self.args.merge if self.args.merge else None
+
+    @property
+    def IOWorkers(self):
+        """ Returns the number of threads retrieving site content.
+
+        Return value(s):
+            integer -- Number of I/O workers. Default is 1.
+        """
+        return self.args.ioworkers
+
+    @property
+    def ParseWorkers(self):
+        """ Returns the number of processes running the site regexs.
+
+        Return value(s):
+            integer -- Number of parse workers. Default is 0, parsing in the main process.
+        """
+        return self.args.parseworkers
+
+    @property
+    def Deadline(self):
+        """ Returns the time budget of the run.
+
+        Return value(s):
+            float -- Number of seconds the run may take.
+            None -- If the --deadline parameter is not used.
+        """
+        return self.args.deadline
+
+    @property
+    def Hedge(self):
+        """ Checks to determine if requests to slow sources should be hedged.
+
+        Return value(s):
+            Boolean
+        """
+        return True if self.args.hedge else False
+
+    @property
+    def HedgeRatio(self):
+        """ Returns the maximum ratio of hedged requests to requests made to each source.
+
+        Return value(s):
+            float -- Ratio of hedged requests. Default is 0.1.
+        """
+        return self.args.hedgeratio
+
+    @property
+    def HedgeProxy(self):
+        """ Returns the alternate proxy used for hedged requests.
+
+        Return value(s):
+            string -- String containing proxy server in format server:port, default is none
+        """
+        return self.args.hedgeproxy if self.args.hedgeproxy else None
+
+    @property
+    def HTMLReportDir(self):
+        """ Checks if there is a multi-page HTML report requested.
+            Returns string name of the report directory if requested
+            or None if not requested.
+
+        Return value(s):
+            string -- Name of the directory that will store the report.
+            None -- if the --htmlreport parameter is not used.
+        """
+        return self.args.htmlreport if self.args.htmlreport else None
+
+    @property
+    def PageSize(self):
+        """ Returns the maximum number of rows of each HTML report page.
+
+        Return value(s):
+            integer -- Number of rows. Default is 5000.
+        """
+        return self.args.pagesize
+
+    @property
+    def SyslogServer(self):
+        """ Checks if the CEF results should be sent to a syslog server.
+            Returns the syslog destination if requested
+            or None if not requested.
+
+        Return value(s):
+            string -- [udp|tcp://]host[:port] of the syslog server.
+            None -- if the --syslog parameter is not used.
+        """
+        return self.args.syslog if self.args.syslog else None
+
+    @property
+    def JSONLOutFile(self):
+        """ Checks if there is a JSON lines output requested.
+            Returns string name of JSON lines output file if requested
+            or None if not requested.
+
+        Return value(s):
+            string -- Name of an output file to write to system.
+            None -- if JSON lines output was not requested.
+        """
+        return self.args.jsonl if self.args.jsonl else None
+
+    @property
+    def DatabaseOutFile(self):
+        """ Checks if results should be stored in an SQLite database.
+            Returns string name of the database file if requested
+            or None if not requested.
+
+        Return value(s):
+            string -- Name of the SQLite database file.
+            None -- if the --db parameter is not used.
+        """
+        return self.args.db if self.args.db else None
+
+    @property
+    def Query(self):
+        """ Returns the result value to look up in the SQLite database.
+
+        Return value(s):
+            string -- result value to look up.
+            None -- if the --query parameter is not used.
+        """
+        return self.args.query if self.args.query else None
+
+    @property
+    def Pivot(self):
+        """ Returns the target to pivot on in the SQLite database.
+
+        Return value(s):
+            string -- target to pivot on.
+            None -- if the --pivot parameter is not used.
+        """
+        return self.args.pivot if self.args.pivot else None
+
+    @property
+    def DiffAgainst(self):
+        """ Returns the result database holding the baseline run the results are compared with.
+
+        Return value(s):
+            string -- Name of the SQLite database file.
+            None -- if the --diff-against parameter is not used.
+        """
+        return self.args.diffagainst if self.args.diffagainst else None
+
+    @property
+    def Stream(self):
+        """ Checks to determine if sites should be written to the outputs as soon as they complete.
+
+        Return value(s):
+            Boolean.
+        """
+        return self.args.stream
+
+    @property
+    def ByTarget(self):
+        """ Checks if streamed sites should be written one complete target block at a time.
+
+        Return value(s):
+            Boolean.
+        """
+        return self.args.bytarget
+
+    @property
+    def SortBuffer(self):
+        """ Returns the maximum number of sites kept in memory while sorting the outputs.
+
+        Return value(s):
+            integer -- Number of sites, 0 keeps every site in memory.
+        """
+        return self.args.sortbuffer
+
+    @property
+    def Stats(self):
+        """ Checks if the statistics of each site should be printed at the end of the run.
+
+        Return value(s):
+            Boolean.
+        """
+        return self.args.stats
+
+    @property
+    def StatsFile(self):
+        """ Checks if the statistics of each site should be written to a JSON file.
+            Returns string name of the statistics file if requested
+            or None if not requested.
+
+        Return value(s):
+            string -- Name of the JSON file to write to system.
+            None -- if the --statsfile parameter is not used.
+        """
+        return self.args.statsfile if self.args.statsfile else None
+
+    @property
+    def ProfileDirectory(self):
+        """ Checks if the phases of the run should be profiled.
+            Returns string name of the directory the profiles are written to if requested
+            or None if not requested.
+
+        Return value(s):
+            string -- Name of the profile directory.
+            None -- if the --profile parameter is not used.
+        """
+        return self.args.profile if self.args.profile else None
+
+    @property
+    def ProfileRate(self):
+        """ Returns the ratio of the site fetches and parses profiled with --profile.
+
+        Return value(s):
+            float
+        """
+        return self.args.profilerate
+
+    @property
+    def TraceFile(self):
+        """ Checks if the spans of the site fetches should be written to a Chrome trace file.
+            Returns string name of the trace file if requested
+            or None if not requested.
+
+        Return value(s):
+            string -- Name of the JSON trace file to write to system.
+            None -- if the --trace parameter is not used.
+        """
+        return self.args.trace if self.args.trace else None
+
+    @property
+    def RecordArchive(self):
+        """ Checks if the requests and responses should be recorded to an archive.
+            Returns string name of the archive if requested
+            or None if not requested.
+
+        Return value(s):
+            string -- Name of the archive to write to system.
+            None -- if the --record parameter is not used.
+        """
+        return self.args.record if self.args.record else None
+
+    @property
+    def ReplayArchive(self):
+        """ Checks if the responses should be replayed from an archive instead of the network.
+            Returns string name of the archive if requested
+            or None if not requested.
+
+        Return value(s):
+            string -- Name of the archive to read.
+            None -- if the --replay parameter is not used.
+        """
+        return self.args.replay if self.args.replay else None
+
+    @property
+    def HealthFile(self):
+        """ Checks if the health of each source should be kept between runs.
+            Returns string name of the health file if requested
+            or None if not requested.
+
+        Return value(s):
+            string -- Name of the JSON health file.
+            None -- if the --health parameter is not used.
+        """
+        return self.args.health if self.args.health else None
+
+    @property
+    def IncludeFailing(self):
+        """ Checks if the chronically failing sources should be run anyway.
+
+        Return value(s):
+            bool
+        """
+        return self.args.includefailing
+
+    @property
+    def Budget(self):
+        """ Returns the maximum number of requests made for each target.
+
+        Return value(s):
+            integer -- Number of requests.
+            None -- if the --budget parameter is not used.
+        """
+        return self.args.budget
+
+    @property
+    def RateControlFile(self):
+        """ Checks if the request rate of each host should be adapted.
+            Returns string name of the file keeping the learned rates if requested
+            or None if not requested.
+
+        Return value(s):
+            string -- Name of the JSON file of the learned rates.
+            None -- if the --ratecontrol parameter is not used.
+        """
+        return self.args.ratecontrol if self.args.ratecontrol else None
+
+    @property
+    def MetricsAddress(self):
+        """ Checks if Prometheus metrics should be served.
+            Returns the [host:]port string to listen on if requested
+            or None if not requested.
+
+        Return value(s):
+            string -- [host:]port the metrics are served on.
+            None -- if the --metrics parameter is not used.
+        """
+        return self.args.metrics if self.args.metrics else None
+
+    @property
+    def MetricsFile(self):
+        """ Checks if Prometheus metrics should be written to a node-exporter textfile.
+            Returns string name of the textfile if requested
+            or None if not requested.
+
+        Return value(s):
+            string -- Name of the textfile to write to system.
+            None -- if the --metricsfile parameter is not used.
+        """
+        return self.args.metricsfile if self.args.metricsfile else None
+
+    @property
+    def FlushInterval(self):
+        """ Returns the number of seconds between output flushes when streaming.
+
+        Return value(s):
+            float -- Seconds between flushes. Default is 5.
+        """
+        return self.args.flushinterval
+
 class Utils:
     """
     """
@@ -328,6 +839,103 @@ class IPWrapper:
         else: # it's just an IP address at this point
             yield target
 
+class Sharder:
+    """ Sharder splits work between several nodes using a stable hash so every node,
+            given the same inputs, agrees on which node owns each target.
+
+    Public Method(s):
+        (Class Method) fromString
+        (Class Method) normaliseTarget
+        includes
+        (Property) Index
+        (Property) Count
+
+    Instance variable(s):
+        _index
+        _count
+        _bysite
+    """
+
+    def __init__(self, index, count, bysite = False):
+        """ Class constructor.
+
+        Argument(s):
+            index -- integer index of the shard processed by this node, 0 <= index < count.
+            count -- integer number of shards.
+            bysite -- true if the site name is hashed together with the target. by default = False
+        """
+        if count < 1 or not 0 <= index < count:
+            raise ValueError(f"Invalid shard {index}/{count}, expected 0 <= I < N")
+        self._index = index
+        self._count = count
+        self._bysite = bysite
+
+    @classmethod
+    def fromString(cls, shard, bysite = False):
+        """ Builds a Sharder from a string in the I/N format.
+
+        Argument(s):
+            shard -- string in the I/N format.
+            bysite -- true if the site name is hashed together with the target. by default = False
+
+        Return value(s):
+            Sharder
+
+        Exception(s):
+            ValueError -- if the string is not a valid shard.
+        """
+        index, sep, count = shard.partition("/")
+        if not sep:
+            raise ValueError(f"Invalid shard {shard}, expected I/N")
+        return cls(int(index), int(count), bysite)
+
+    @classmethod
+    def normaliseTarget(cls, target):
+        """ Returns the form of target used for hashing so that case, surrounding spaces
+                and defanged dots do not change the shard a target belongs to.
+
+        Argument(s):
+            target -- string target.
+
+        Return value(s):
+            string
+        """
+        return target.replace("[.]", ".").replace("{.}", ".").replace("(.)", ".").strip().lower()
+
+    @property
+    def Index(self):
+        """ Returns the index of the shard processed by this node.
+
+        Return value(s):
+            integer
+        """
+        return self._index
+
+    @property
+    def Count(self):
+        """ Returns the number of shards.
+
+        Return value(s):
+            integer
+        """
+        return self._count
+
+    def includes(self, target, sitename = None):
+        """ Checks if the target, or the site and target pair, belongs to this node's shard.
+
+        Argument(s):
+            target -- string target.
+            sitename -- string name of the site. Only used when hashing by site. by default = None
+
+        Return value(s):
+            Boolean
+        """
+        key = Sharder.normaliseTarget(target)
+        if self._bysite:
+            key = f"{sitename}\x00{key}"
+        digest = hashlib.sha1(key.encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") % self._count == self._index
+
 class VersionChecker:
     """ Uses MD5 to indicate if any files needs to be updated.
     Public Method(s):